@@ -0,0 +1,269 @@
+"""
+Verificação dos orçamentos por documento (batch --timeout, --page-timeout, --max-rss-mb,
+--max-images, --max-text-mb) com um corpus sintético de PDFs patológicos.
+
+Uso:
+    python benchmarks/bench_budgets.py
+    python benchmarks/bench_budgets.py --keep-dir /tmp/pdfs-patologicos
+
+Gera os PDFs (escritos byte a byte, sem depender de um gerador de PDF) e processa cada um num
+IsolatedExecutor com o orçamento do caso, seguido de um documento normal no mesmo executor:
+  - texto_enorme: centenas de páginas de texto denso (--max-text-mb);
+  - muitas_imagens: centenas de imagens distintas (--max-images);
+  - pagina_lenta: uma página com formulários aninhados (XObjects que se chamam em cascata),
+    que leva vários segundos para ser interpretada (--page-timeout; o worker é encerrado);
+  - paginas_pesadas: muitas páginas moderadamente lentas (--timeout; parada entre páginas, ou
+    o worker é encerrado se a máquina estiver carregada e a página passar da tolerância);
+  - imagem_gigante: uma imagem de 12000x12000 pixels (412 MB decodificada, ~2 MB comprimida) (--max-rss-mb);
+  - xref_quebrada: centenas de milhares de objetos com a tabela xref inválida, que o MuPDF
+    reconstrói ao abrir o arquivo (--timeout; o worker é encerrado).
+Para cada caso, confere o limite e a ação reportados, o tempo de parede (limite + tolerância de
+encerramento + folga), os resultados parciais e que o documento normal seguinte é processado
+por um worker saudável. Termina com código 1 se algum caso falhar.
+"""
+import argparse
+import pathlib
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Os módulos do projeto são importados a partir de src/, como em src/main.py
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src"))
+
+from pipeline.batch import analyze_document, failed_result
+from pipeline.isolation import KILL_GRACE_S, IsolatedExecutor
+from utils.budget import DocumentBudget, format_budget_reason
+
+# Folga além do limite + KILL_GRACE_S (supervisão a cada 50 ms e encerramento do processo)
+WALL_SLACK_S = 1.0
+
+TEXT_LINE = b"(Relatorio de analise estrutural com palavras repetidas para testar limites) Tj T* "
+
+def write_pdf(
+    path: pathlib.Path,
+    pages: Sequence[Tuple[bytes, Sequence[int]]],
+    images: Sequence[Tuple[int, int, bytes]] = (),
+    forms: Sequence[bytes] = (),
+    filler_objects: int = 0,
+    broken_xref: bool = False
+) -> None:
+    """
+    Escreve um PDF mínimo. pages: (conteúdo, índices das imagens usadas); images: (largura, altura,
+    pixels RGB comprimidos com zlib) -> /Im<i>; forms: conteúdos de XObjects de formulário /Fm<i>,
+    cada um podendo chamar os anteriores. filler_objects acrescenta objetos sem uso; broken_xref
+    aponta startxref para um deslocamento inválido, forçando a reconstrução da tabela.
+    """
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    def stream(header: bytes, data: bytes) -> bytes:
+        return b"<< " + header + b" /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    image_ids = [
+        add(stream(b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+                   b"/BitsPerComponent 8 /Filter /FlateDecode" % (width, height), data))
+        for width, height, data in images
+    ]
+    form_ids: List[int] = []
+    for content in forms:
+        resources = b" ".join(b"/Fm%d %d 0 R" % (i, xref) for i, xref in enumerate(form_ids))
+        form_ids.append(add(stream(
+            b"/Type /XObject /Subtype /Form /BBox [0 0 612 792] /Resources << /XObject << %s >> >>" % resources,
+            content
+        )))
+
+    pages_id = len(objects) + 2 * len(pages) + filler_objects + 1
+    page_ids = []
+    for content, used_images in pages:
+        content_id = add(stream(b"", content))
+        xobjects = b" ".join(
+            [b"/Im%d %d 0 R" % (i, image_ids[i]) for i in used_images]
+            + [b"/Fm%d %d 0 R" % (i, xref) for i, xref in enumerate(form_ids)]
+        )
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> /XObject << %s >> >> >>" % (pages_id, content_id, font, xobjects)
+        ))
+    for i in range(filler_objects):
+        add(b"<< /Filler %d >>" % i)
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.7\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, 9 if broken_xref else xref
+    )
+    path.write_bytes(bytes(out))
+
+def text_page(lines: int) -> bytes:
+    return b"BT /F1 6 Tf 8 TL 20 780 Td " + TEXT_LINE * lines + b"ET"
+
+def compressed_pixels(width: int, height: int, seed: int = 0) -> bytes:
+    # Comprime linha a linha: a imagem decodificada nunca é montada na memória do gerador
+    row = bytes([0]) + bytes((seed + x) % 256 for x in range(width * 3))
+    compressor = zlib.compressobj(9)
+    chunks = [compressor.compress(row) for _ in range(height)]
+    chunks.append(compressor.flush())
+    return b"".join(chunks)
+
+def path_forms(levels: int, fanout: int, leaf_paths: int) -> List[bytes]:
+    # Folha com leaf_paths caminhos; cada nível chama o anterior fanout vezes (custo leaf * fanout^levels)
+    leaf = b"".join(b"%d %d m %d %d l S " % (i % 600, i % 700, (i * 7) % 600, (i * 3) % 700) for i in range(leaf_paths))
+    forms = [leaf]
+    for level in range(1, levels + 1):
+        forms.append(b"q /Fm%d Do Q " % (level - 1) * fanout)
+    return forms
+
+def build_corpus(directory: pathlib.Path) -> Dict[str, pathlib.Path]:
+    paths = {name: directory / f"{name}.pdf" for name in (
+        "normal", "texto_enorme", "muitas_imagens", "pagina_lenta", "paginas_pesadas", "imagem_gigante", "xref_quebrada"
+    )}
+    write_pdf(paths["normal"], [(text_page(40), [0])] * 3, images=[(64, 64, compressed_pixels(64, 64))])
+    write_pdf(paths["texto_enorme"], [(text_page(90), [])] * 400)
+    write_pdf(
+        paths["muitas_imagens"],
+        [(text_page(5) + b"".join(b" q 10 0 0 10 %d %d cm /Im%d Do Q" % (i % 60 * 10, i // 60 * 10, i) for i in range(p, p + 100)),
+          range(p, p + 100)) for p in range(0, 400, 100)],
+        images=[(16, 16, compressed_pixels(16, 16, seed)) for seed in range(400)]
+    )
+    # A página 2 chama o último formulário: ~10^7 operações de desenho
+    slow = path_forms(levels=3, fanout=10, leaf_paths=10000)
+    write_pdf(paths["pagina_lenta"], [(text_page(40), []), (text_page(40) + b" /Fm3 Do", [])], forms=slow)
+    # Cada página chama o segundo formulário (~5 * 10^5 operações)
+    heavy = path_forms(levels=1, fanout=50, leaf_paths=10000)
+    write_pdf(paths["paginas_pesadas"], [(text_page(40) + b" /Fm1 Do", [])] * 30, forms=heavy)
+    write_pdf(
+        paths["imagem_gigante"],
+        [(text_page(40) + b" q 600 0 0 600 6 96 cm /Im0 Do Q", [0])],
+        images=[(12000, 12000, compressed_pixels(12000, 12000))]
+    )
+    write_pdf(paths["xref_quebrada"], [(text_page(40), [])], filler_objects=600000, broken_xref=True)
+    return paths
+
+def check_text(result: Dict[str, Any], budget: DocumentBudget) -> Optional[str]:
+    analysis = result["analysis"]
+    if "error" in analysis:
+        return f"análise sem resultado parcial: {analysis['error']}"
+    if not 0 < analysis["pages_analyzed"] < analysis["total_pages"]:
+        return f"páginas analisadas fora do esperado: {analysis['pages_analyzed']}/{analysis['total_pages']}"
+    return None
+
+def check_images(result: Dict[str, Any], budget: DocumentBudget) -> Optional[str]:
+    images = result["images"]
+    if images.get("images_extracted") != budget.max_images:
+        return f"imagens extraídas: {images.get('images_extracted')} (esperado {budget.max_images})"
+    if "error" in result["analysis"]:
+        return "a análise deveria estar completa"
+    return None
+
+def check_partial_pages(result: Dict[str, Any], budget: DocumentBudget) -> Optional[str]:
+    # Sob carga, uma página pesada pode passar da tolerância e o worker ser encerrado no meio
+    # dela: os dois desfechos respeitam o orçamento, mas só a parada cooperativa tem parcial
+    if result["budget_exceeded"]["action"] == "killed":
+        return None
+    analysis = result["analysis"]
+    if "error" in analysis or not 0 < analysis["pages_analyzed"] < analysis["total_pages"]:
+        return f"esperado resultado parcial da análise: {analysis}"
+    return None
+
+def check_analysis_kept(result: Dict[str, Any], budget: DocumentBudget) -> Optional[str]:
+    # O limite estoura nas imagens: a análise (já concluída) volta como resultado parcial
+    if "error" in result["analysis"] or result["budget_exceeded"]["stage"] != "images":
+        return f"esperada a análise concluída e o limite nas imagens: {result['budget_exceeded']}"
+    return None
+
+def check_nothing(result: Dict[str, Any], budget: DocumentBudget) -> Optional[str]:
+    return None
+
+# (nome, orçamento, limite esperado, ações aceitas, limite de tempo de parede, verificação extra)
+Check = Callable[[Dict[str, Any], DocumentBudget], Optional[str]]
+CASES: List[Tuple[str, DocumentBudget, str, Tuple[str, ...], Optional[float], Check]] = [
+    ("texto_enorme", DocumentBudget(max_text_bytes=2**20), "text_bytes", ("stopped",), None, check_text),
+    ("muitas_imagens", DocumentBudget(max_images=50), "images", ("stopped",), None, check_images),
+    ("pagina_lenta", DocumentBudget(page_timeout_s=1.0), "page_time", ("killed",), 1.0, check_nothing),
+    ("paginas_pesadas", DocumentBudget(timeout_s=2.0), "timeout", ("stopped", "killed"), 2.0, check_partial_pages),
+    ("imagem_gigante", DocumentBudget(max_rss_mb=400), "rss", ("stopped", "killed"), None, check_analysis_kept),
+    ("xref_quebrada", DocumentBudget(timeout_s=0.5), "timeout", ("killed",), 0.5, check_nothing),
+]
+
+def run_document(executor: IsolatedExecutor, pdf_path: pathlib.Path, output_path: pathlib.Path) -> Tuple[Dict[str, Any], float]:
+    start = time.perf_counter()
+    future = executor.submit(analyze_document, pdf_path, output_path, False, None, 0, 2, False, False)
+    try:
+        result = future.result()
+    except Exception as e:
+        result = failed_result(pdf_path, e)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica os orçamentos por documento com PDFs patológicos.")
+    parser.add_argument('--keep-dir', type=str, default=None, help='Mantém os PDFs gerados neste diretório.')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    corpus_dir = pathlib.Path(args.keep_dir) if args.keep_dir else pathlib.Path(tmp) / "pdfs"
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    output_path = pathlib.Path(tmp) / "saida"
+    failures = 0
+    try:
+        start = time.perf_counter()
+        paths = build_corpus(corpus_dir)
+        print(f"Corpus sintético gerado em {time.perf_counter() - start:.1f}s: {corpus_dir}\n")
+        print(f"{'Caso':<16} | {'Tamanho':>9} | {'Tempo (s)':>9} | {'Limite (s)':>10} | Resultado")
+
+        for name, budget, limit, actions, wall_limit, check in CASES:
+            executor = IsolatedExecutor(1, budget)
+            try:
+                result, elapsed = run_document(executor, paths[name], output_path)
+                control, _ = run_document(executor, paths["normal"], output_path)
+            finally:
+                executor.shutdown()
+
+            reason = result.get("budget_exceeded")
+            bound = wall_limit + KILL_GRACE_S + WALL_SLACK_S if wall_limit is not None else None
+            problems = []
+            if reason is None:
+                problems.append("orçamento não foi aplicado")
+            else:
+                if reason["limit"] != limit or reason["action"] not in actions:
+                    problems.append(f"motivo inesperado: {reason}")
+                problem = check(result, budget)
+                if problem:
+                    problems.append(problem)
+            if bound is not None and elapsed > bound:
+                problems.append(f"tempo de parede {elapsed:.2f}s acima de {bound:.2f}s")
+            if "error" in control["analysis"] or "budget_exceeded" in control or "error" in control["images"]:
+                problems.append(f"documento normal seguinte falhou: {control['analysis'].get('error') or control.get('budget_exceeded')}")
+
+            size = paths[name].stat().st_size / 2**20
+            outcome = format_budget_reason(reason) if reason else "-"
+            bound_text = f"{bound:.2f}" if bound is not None else "-"
+            print(f"{name:<16} | {size:>7.1f}MB | {elapsed:>9.2f} | {bound_text:>10} | {outcome}")
+            for problem in problems:
+                print(f"{'':<16}   [FALHA]: {problem}")
+            failures += bool(problems)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if failures:
+        print(f"\n[BENCHMARK]: {failures} casos violaram o orçamento.")
+        sys.exit(1)
+    print("\n[BENCHMARK]: Todos os orçamentos foram respeitados e os workers substituídos continuaram saudáveis.")
+
+if __name__ == '__main__':
+    main()
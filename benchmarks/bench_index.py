@@ -0,0 +1,155 @@
+"""
+Benchmark do índice invertido: construção, tamanho em disco e latência das consultas.
+
+Uso:
+    python benchmarks/bench_index.py
+    python benchmarks/bench_index.py --documents 5000 --pages 40 --max-query-ms 50
+
+Gera frequências de termos por página (lei de Zipf, como analysis["page_terms"]), indexa os
+documentos em lotes (vários segmentos), remove uma parte e reporta:
+  - construção: tempo, postings e tamanho em disco vs. as mesmas frequências em JSON;
+  - consultas: latência (abrir o índice + buscar, como o subcomando "query") para termos raros,
+    médios e comuns, antes e depois da compactação;
+  - corretude: documentos e pontuações iguais aos de uma busca exaustiva em memória.
+Termina com código 1 se algum resultado divergir ou se o p95 passar de --max-query-ms.
+"""
+import argparse
+import bisect
+import itertools
+import json
+import math
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Os módulos do projeto são importados a partir de src/, como em src/main.py
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src"))
+
+from utils.inverted_index import BM25_K1, IndexWriter, InvertedIndex
+
+def generate_documents(args: argparse.Namespace) -> Dict[str, List[Dict[str, int]]]:
+    rng = random.Random(args.seed)
+    cumulative = list(itertools.accumulate(1.0 / (rank ** args.zipf) for rank in range(1, args.vocabulary + 1)))
+    total = cumulative[-1]
+    documents = {}
+    for doc in range(args.documents):
+        pages = []
+        for _ in range(rng.randint(1, 2 * args.pages)):
+            ranks = (bisect.bisect_left(cumulative, rng.random() * total) + 1 for _ in range(args.words_per_page))
+            frequencies: Dict[str, int] = {}
+            for rank in ranks:
+                word = f"termo{rank}"
+                frequencies[word] = frequencies.get(word, 0) + 1
+            pages.append(frequencies)
+        documents[f"/corpus/manual{doc:06d}.pdf"] = pages
+    return documents
+
+def exhaustive_search(documents: Dict[str, List[Dict[str, int]]], terms: List[str]) -> Dict[str, float]:
+    # Mesma pontuação do índice, calculada percorrendo todas as páginas
+    total_pages = sum(len(pages) for pages in documents.values())
+    df = {term: sum(term in page for pages in documents.values() for page in pages) for term in terms}
+    scores = {}
+    for path, pages in documents.items():
+        score = sum(
+            math.log(1 + (total_pages - df[term] + 0.5) / (df[term] + 0.5)) * page[term] * (BM25_K1 + 1) / (page[term] + BM25_K1)
+            for page in pages for term in terms if term in page
+        )
+        if score > 0:
+            scores[path] = score
+    return scores
+
+def measure_queries(index_dir: pathlib.Path, queries: List[str], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            with InvertedIndex(index_dir) as index:
+                index.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do índice invertido (construção e consultas).")
+    parser.add_argument('--documents', type=int, default=2000)
+    parser.add_argument('--pages', type=int, default=20, help='Páginas médias por documento.')
+    parser.add_argument('--words-per-page', type=int, default=300)
+    parser.add_argument('--vocabulary', type=int, default=100000)
+    parser.add_argument('--zipf', type=float, default=1.1)
+    parser.add_argument('--flush-postings', type=int, default=500000, help='Postings por segmento durante a construção.')
+    parser.add_argument('--remove', type=float, default=0.05, help='Fração dos documentos removida após a construção.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-query-ms', type=float, default=None, help='Falha se o p95 das consultas passar deste valor.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    documents = generate_documents(args)
+    raw_bytes = len(json.dumps(documents).encode('utf-8'))
+    postings = sum(len(page) for pages in documents.values() for page in pages)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = pathlib.Path(tmp) / "index"
+        start = time.perf_counter()
+        with IndexWriter(index_dir, flush_postings=args.flush_postings) as writer:
+            for path, pages in documents.items():
+                writer.add_document(path, None, pages)
+        build_time = time.perf_counter() - start
+
+        removed = random.Random(args.seed).sample(sorted(documents), int(len(documents) * args.remove))
+        with IndexWriter(index_dir) as writer:
+            for path in removed:
+                writer.remove_document(path)
+            segments = len(writer.manifest["segments"])
+        for path in removed:
+            del documents[path]
+        disk_bytes = sum(p.stat().st_size for p in index_dir.iterdir())
+
+        queries = {
+            "raros": ["termo50000", "termo20000 termo30000"],
+            "médios": ["termo500", "termo300 termo700"],
+            "comuns": ["termo1", "termo2 termo3 termo5"],
+        }
+        mismatches = 0
+        with InvertedIndex(index_dir) as index:
+            for query in itertools.chain.from_iterable(queries.values()):
+                expected = exhaustive_search(documents, query.split())
+                found = index.search(query, limit=len(documents))
+                got = {hit["file"]: hit["score"] for hit in found["hits"]}
+                if set(got) != set(expected) or any(abs(got[p] - round(expected[p], 4)) > 1e-3 for p in got):
+                    mismatches += 1
+
+        before = {kind: measure_queries(index_dir, qs, args.repeat) for kind, qs in queries.items()}
+        start = time.perf_counter()
+        with IndexWriter(index_dir) as writer:
+            writer.compact()
+        compact_time = time.perf_counter() - start
+        after = {kind: measure_queries(index_dir, qs, args.repeat) for kind, qs in queries.items()}
+
+    def p95(values: List[float]) -> float:
+        return statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+
+    print(f"Corpus: {args.documents:,} documentos, {postings:,} postings (termo, documento, página)\n")
+    print(f"{'Construção (s)':<34} | {build_time:>10.2f} ({segments} segmentos)")
+    print(f"{'Compactação (s)':<34} | {compact_time:>10.2f}")
+    print(f"{'Frequências em JSON (MB)':<34} | {raw_bytes / 2**20:>10.1f}")
+    print(f"{'Índice em disco (MB)':<34} | {disk_bytes / 2**20:>10.1f} ({disk_bytes / max(1, postings):.2f} bytes/posting)")
+    print(f"\n{'Consulta (ms, abrir + buscar)':<34} | {'p50':>8} | {'p95':>8} | {'p50 comp.':>9} | {'p95 comp.':>9}")
+    worst = 0.0
+    for kind in queries:
+        worst = max(worst, p95(before[kind]), p95(after[kind]))
+        print(f"{'Termos ' + kind:<34} | {statistics.median(before[kind]):>8.2f} | {p95(before[kind]):>8.2f} | "
+              f"{statistics.median(after[kind]):>9.2f} | {p95(after[kind]):>9.2f}")
+
+    if mismatches:
+        print(f"\n[BENCHMARK]: {mismatches} consultas divergiram da busca exaustiva.")
+        sys.exit(1)
+    if args.max_query_ms is not None and worst > args.max_query_ms:
+        print(f"\n[BENCHMARK]: p95 das consultas ({worst:.2f} ms) acima do limite de {args.max_query_ms} ms.")
+        sys.exit(1)
+    print("\n[BENCHMARK]: Resultados idênticos aos da busca exaustiva.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark dos perfis de inferência em CPU (quality, balanced, fast) com o modelo minúsculo local.
+
+Uso:
+    python benchmarks/bench_inference.py
+    python benchmarks/bench_inference.py --profiles quality fast --threads 4 --d-model 512 --layers 3
+
+Cada perfil roda num interpretador novo, com apenas os pesos do próprio perfil no registro (o fp32 de
+onde sai a variante int8 é descartado), para que a memória de um não contamine o outro.
+Reporta latência (mediana), tokens gerados por segundo, tamanho do modelo serializado e a memória
+residente após as gerações: total do processo e acréscimo sobre o processo sem modelo.
+Os números medem o custo do pipeline de geração; a qualidade do resumo não é avaliada.
+"""
+import argparse
+import contextlib
+import io
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+# Os módulos do projeto são importados a partir de src/, como em src/main.py
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src"))
+
+from corpus import CORPUS_PROFILES, generate_pdf
+from llm.config import INFERENCE_PROFILES, inference_settings
+from utils.budget import process_rss_mb
+
+def _serialized_size_mb(model: Any) -> float:
+    import torch
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+def measure_profile(profile: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Executado no processo filho: constrói o modelo, aplica o perfil e mede a geração.
+    """
+    from tiny_model import build_tiny_model
+    from pdf.extractor import extract_pdf_analysis
+    from llm.model import get_model, register_model, release_memory
+    from llm.summarize import generate_llm_summary
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        pdf_path = pathlib.Path(tmp) / "small_text.pdf"
+        generate_pdf(pdf_path, CORPUS_PROFILES["small_text"])
+        text = extract_pdf_analysis(pdf_path)["full_text"]
+
+    settings = inference_settings(profile, num_threads=args.threads)
+    # Memória do processo sem modelo (interpretador, torch, transformers e o texto)
+    import torch, transformers  # noqa: F401
+    base_rss = process_rss_mb() or 0.0
+
+    # Só a variante do perfil fica no registro; o fp32 construído aqui é descartado se quantizado
+    model, tokenizer = build_tiny_model([text], d_model=args.d_model, layers=args.layers)
+    register_model(model, tokenizer, quantize=settings["quantize"])
+    del model
+    release_memory()
+
+    # A primeira chamada inclui a quantização e o aquecimento; fica fora das amostras
+    generate_llm_summary(text, inference=settings)
+    model, tokenizer = get_model(quantize=settings["quantize"])
+
+    timings = []
+    generated_tokens = 0
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        summary = generate_llm_summary(text, inference=settings)
+        timings.append(time.perf_counter() - start)
+        generated_tokens = len(tokenizer(summary)["input_ids"])
+
+    latency = statistics.median(timings)
+    rss = process_rss_mb() or 0.0
+    return {
+        "profile": profile,
+        "quantize": settings["quantize"],
+        "num_beams": settings["generation"]["num_beams"],
+        "latency_s": latency,
+        "tokens_per_second": generated_tokens / latency if latency > 0 else 0.0,
+        "model_mb": _serialized_size_mb(model),
+        "rss_mb": rss,
+        "model_rss_mb": rss - base_rss,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos perfis de inferência em CPU.")
+    parser.add_argument('--profiles', nargs='+', default=list(INFERENCE_PROFILES), choices=list(INFERENCE_PROFILES))
+    parser.add_argument('--repeat', type=int, default=3, help='Gerações medidas por perfil (usa a mediana).')
+    parser.add_argument('--threads', type=int, default=None, help='Threads intra-op do torch. Padrão: uma por núcleo.')
+    parser.add_argument('--d-model', type=int, default=256, help='Dimensão do modelo minúsculo.')
+    parser.add_argument('--layers', type=int, default=2, help='Camadas do codificador e do decodificador.')
+    parser.add_argument('--output', type=str, default=None, help='Salva os resultados em JSON.')
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_profile(args.child, args)))
+        return
+
+    forwarded = ['--repeat', str(args.repeat), '--d-model', str(args.d_model), '--layers', str(args.layers)]
+    if args.threads:
+        forwarded += ['--threads', str(args.threads)]
+
+    results = []
+    print(f"{'Perfil':<10} | {'int8':>4} | {'Feixes':>6} | {'Latência (ms)':>13} | {'Tokens/s':>9} | {'Modelo (MB)':>11} | {'RSS (MB)':>8} | {'RSS modelo (MB)':>15}")
+    for profile in args.profiles:
+        completed = subprocess.run(
+            [sys.executable, __file__, '--child', profile] + forwarded,
+            capture_output=True, text=True, check=True
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(
+            f"{profile:<10} | {'sim' if result['quantize'] else 'não':>4} | {result['num_beams']:>6} | "
+            f"{result['latency_s'] * 1000:>13.1f} | {result['tokens_per_second']:>9.1f} | "
+            f"{result['model_mb']:>11.2f} | {result['rss_mb']:>8.1f} | {result['model_rss_mb']:>15.1f}"
+        )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"d_model": args.d_model, "layers": args.layers, "threads": args.threads, "results": results}, f, indent=2)
+        print(f"\n[BENCHMARK]: Resultados salvos em: {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark: análise serial vs. paralela (--workers) em função do número de páginas.
+
+Uso:
+    python benchmarks/bench_parallel.py --pages 50 200 800 --workers 2 4 8
+"""
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+
+# Os módulos do projeto são importados a partir de src/, como em src/main.py
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src"))
+
+from corpus import CORPUS_PROFILES, generate_pdf
+from pdf.extractor import extract_pdf_analysis
+
+# Mesmo texto/fonte do perfil "large_text", com o número de páginas variando
+SPEC = CORPUS_PROFILES["large_text"]
+
+def timed(file_path: pathlib.Path, workers: int):
+    start = time.perf_counter()
+    results = extract_pdf_analysis(file_path, workers=workers)
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da análise paralela de páginas.")
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 200, 800])
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    args = parser.parse_args()
+
+    print(f"{'Páginas':>8} | {'Workers':>7} | {'Tempo (s)':>9} | {'Speedup':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf_path = pathlib.Path(tmp) / f"sintetico_{pages}.pdf"
+            generate_pdf(pdf_path, SPEC._replace(pages=pages))
+
+            serial_time, serial_results = timed(pdf_path, 1)
+            print(f"{pages:>8} | {1:>7} | {serial_time:>9.2f} | {1.0:>6.2f}x")
+
+            for workers in args.workers:
+                elapsed, results = timed(pdf_path, workers)
+                # O modo paralelo deve reproduzir exatamente o resultado serial
+                if results != serial_results:
+                    raise SystemExit(f"ERRO: resultado paralelo difere do serial ({pages} páginas, {workers} workers)")
+                print(f"{pages:>8} | {workers:>7} | {elapsed:>9.2f} | {serial_time / elapsed:>6.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark das estatísticas de corpus: esboços (HeavyHitters + HyperLogLog) vs. contagem exata.
+
+Uso:
+    python benchmarks/bench_sketches.py
+    python benchmarks/bench_sketches.py --documents 5000 --vocabulary 500000 --capacity 2048 --shards 8
+
+Gera um corpus sintético com frequências Zipf (um documento de cada vez, sem montar o texto do
+corpus), acumula as estatísticas exatas (Counter + set) e os esboços por documento combinados em
+shards, e reporta:
+  - vocabulário: estimativa do HyperLogLog, erro relativo e erro padrão teórico;
+  - palavras mais comuns: recall do top-k, maior erro de contagem e o limite garantido;
+  - memória: retida ao final e pico alocado (tracemalloc) do acumulado exato e dos esboços,
+    e o tamanho serializado do esboço do corpus;
+  - combinação: shards combinados em ordens diferentes. O vocabulário estimado é idêntico; os
+    contadores do HeavyHitters podem variar com a ordem, mas sempre dentro do limite garantido.
+Termina com código 1 se alguma contagem violar o limite garantido.
+"""
+import argparse
+import bisect
+import itertools
+import json
+import pathlib
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Iterator, List, Tuple
+
+# Os módulos do projeto são importados a partir de src/, como em src/main.py
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src"))
+
+from utils.sketches import CorpusSketch
+from utils.text import TextStatistics
+
+def iter_documents(args: argparse.Namespace) -> Iterator[str]:
+    """
+    Textos dos documentos: palavras "termoN" sorteadas com peso 1/N^s (lei de Zipf).
+    """
+    rng = random.Random(args.seed)
+    cumulative = list(itertools.accumulate(1.0 / (rank ** args.zipf) for rank in range(1, args.vocabulary + 1)))
+    total = cumulative[-1]
+    for _ in range(args.documents):
+        ranks = (bisect.bisect_left(cumulative, rng.random() * total) + 1 for _ in range(args.words_per_document))
+        yield " ".join(f"termo{rank}" for rank in ranks)
+
+def measured(build: Callable[[], object]) -> Tuple[object, float, int, int]:
+    # Tempo, memória retida pelo resultado e pico de memória alocada durante a construção
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, elapsed, retained, peak
+
+def build_exact(args: argparse.Namespace) -> Tuple[Counter, set]:
+    frequencies: Counter = Counter()
+    vocabulary = set()
+    for text in iter_documents(args):
+        stats = TextStatistics()
+        stats.update(text)
+        frequencies.update(stats.word_frequencies)
+        vocabulary |= stats.vocabulary
+    return frequencies, vocabulary
+
+def build_shards(args: argparse.Namespace) -> List[CorpusSketch]:
+    # Cada documento vira um esboço serializado (como viria de outro processo/máquina) e entra num shard
+    shards = [CorpusSketch(args.capacity, args.precision) for _ in range(args.shards)]
+    for index, text in enumerate(iter_documents(args)):
+        stats = TextStatistics()
+        stats.update(text)
+        document = CorpusSketch.from_text_statistics(stats, args.capacity, args.precision)
+        shards[index % args.shards].merge(CorpusSketch.from_dict(json.loads(json.dumps(document.to_dict()))))
+    return shards
+
+def combine(shards: List[CorpusSketch], order: List[int]) -> CorpusSketch:
+    merged = CorpusSketch.from_dict(shards[order[0]].to_dict())
+    for index in order[1:]:
+        merged.merge(shards[index])
+    return merged
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos esboços de corpus vs. contagem exata.")
+    parser.add_argument('--documents', type=int, default=2000)
+    parser.add_argument('--words-per-document', type=int, default=1000)
+    parser.add_argument('--vocabulary', type=int, default=200000, help='Palavras distintas possíveis no gerador.')
+    parser.add_argument('--zipf', type=float, default=1.1, help='Expoente da lei de Zipf.')
+    parser.add_argument('--capacity', type=int, default=1024, help='Contadores do HeavyHitters.')
+    parser.add_argument('--precision', type=int, default=14, help='Precisão do HyperLogLog (2^p registradores).')
+    parser.add_argument('--shards', type=int, default=4, help='Shards combinados ao final (como máquinas diferentes).')
+    parser.add_argument('--top', type=int, default=100, help='Tamanho do top-k avaliado.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    (frequencies, vocabulary), exact_time, exact_retained, exact_peak = measured(lambda: build_exact(args))
+    shards, sketch_time, sketch_retained, sketch_peak = measured(lambda: build_shards(args))
+
+    merged = combine(shards, list(range(args.shards)))
+    reversed_order = combine(shards, list(reversed(range(args.shards))))
+
+    # Vocabulário
+    true_vocabulary = len(vocabulary)
+    estimated_vocabulary = merged.vocabulary_size
+    vocabulary_error = abs(estimated_vocabulary - true_vocabulary) / true_vocabulary
+
+    # Palavras mais comuns: o contador subestima a frequência real em no máximo error_bound
+    def max_count_error(sketch: CorpusSketch) -> int:
+        return max((frequencies[word] - count for word, count in sketch.heavy_hitters.counters.items()), default=0)
+
+    error_bound = merged.heavy_hitters.error_bound
+    max_error = max_count_error(merged)
+    within_bound = all(
+        max_count_error(sketch) <= sketch.heavy_hitters.error_bound for sketch in (merged, reversed_order)
+    )
+    same_vocabulary = merged.vocabulary_size == reversed_order.vocabulary_size
+    same_top10 = [w for w, _ in merged.top_n_words(10)] == [w for w, _ in reversed_order.top_n_words(10)]
+    exact_top = {word for word, _ in frequencies.most_common(args.top)}
+    sketch_top = {word for word, _ in merged.top_n_words(args.top)}
+    recall = len(exact_top & sketch_top) / max(1, len(exact_top))
+    top10_exact = [word for word, _ in frequencies.most_common(10)]
+    top10_sketch = [word for word, _ in merged.top_n_words(10)]
+
+    serialized = len(json.dumps(merged.to_dict()))
+
+    print(f"Corpus: {args.documents:,} documentos, {merged.total_words:,} palavras, "
+          f"{true_vocabulary:,} palavras distintas (Zipf s={args.zipf})\n")
+    print(f"{'Métrica':<38} | {'Exato':>14} | {'Esboço':>14}")
+    print(f"{'Vocabulário (distinto)':<38} | {true_vocabulary:>14,} | {estimated_vocabulary:>14,}")
+    print(f"{'Erro relativo do vocabulário':<38} | {'-':>14} | {vocabulary_error:>13.2%} "
+          f"(erro padrão {merged.vocabulary.relative_error:.2%})")
+    print(f"{f'Recall do top-{args.top}':<38} | {'100%':>14} | {recall:>14.1%}")
+    print(f"{'Top-10 na mesma ordem':<38} | {'sim':>14} | {'sim' if top10_exact == top10_sketch else 'não':>14}")
+    print(f"{'Maior erro de contagem (limite)':<38} | {0:>14} | {max_error:>7,} ({int(error_bound):,})")
+    print(f"{'Memória retida ao final (MB)':<38} | {exact_retained / 2**20:>14.1f} | {sketch_retained / 2**20:>14.1f}")
+    print(f"{'Pico de memória alocada (MB)':<38} | {exact_peak / 2**20:>14.1f} | {sketch_peak / 2**20:>14.1f}")
+    print(f"{'Tamanho serializado do corpus (KB)':<38} | {'-':>14} | {serialized / 1024:>14.1f}")
+    print(f"{'Tempo de construção (s)':<38} | {exact_time:>14.2f} | {sketch_time:>14.2f}")
+    print(f"{'Ordem inversa: mesmo vocabulário':<38} | {'-':>14} | {'sim' if same_vocabulary else 'não':>14}")
+    print(f"{'Ordem inversa: mesmo top-10':<38} | {'-':>14} | {'sim' if same_top10 else 'não':>14}")
+
+    if not within_bound:
+        print("\n[BENCHMARK]: Garantia dos esboços violada.")
+        sys.exit(1)
+    print("\n[BENCHMARK]: Contagens dentro do limite garantido nas duas ordens de combinação.")
+
+if __name__ == '__main__':
+    main()
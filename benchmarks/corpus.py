@@ -0,0 +1,100 @@
+"""
+Gerador de PDFs sintéticos para os benchmarks (offline, usando apenas fitz).
+
+Cada perfil varia número de páginas, densidade de texto, mistura de tamanhos de fonte
+(para exercitar a heurística de títulos) e quantidade/tamanho de imagens, incluindo duplicadas.
+"""
+import pathlib
+import random
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import fitz
+
+WORDS = (
+    "modelos esforço software teste dados análise sistema processo resultado estudo "
+    "requisitos projeto avaliação métricas qualidade desenvolvimento arquitetura código "
+    "de a o que para com em uma os no na por mais"
+).split()
+
+class CorpusSpec(NamedTuple):
+    pages: int
+    lines_per_page: int # Densidade de texto
+    words_per_line: int
+    # Mistura de fontes: (tamanho, peso relativo). O tamanho mais pesado vira a fonte base.
+    font_mix: Tuple[Tuple[float, int], ...]
+    images_per_page: int = 0
+    image_size: int = 64 # Lado da imagem em pixels
+    duplicate_ratio: float = 0.0 # Fração das imagens que repete uma imagem anterior
+
+# Perfis usados pelo run_benchmarks.py
+CORPUS_PROFILES: Dict[str, CorpusSpec] = {
+    "small_text": CorpusSpec(pages=10, lines_per_page=40, words_per_line=12, font_mix=((10.0, 20), (16.0, 1))),
+    "large_text": CorpusSpec(pages=200, lines_per_page=50, words_per_line=12, font_mix=((10.0, 30), (14.0, 2), (18.0, 1))),
+    "many_headings": CorpusSpec(pages=50, lines_per_page=40, words_per_line=8, font_mix=((10.0, 6), (12.0, 3), (14.0, 2), (20.0, 1))),
+    "images": CorpusSpec(
+        pages=30, lines_per_page=15, words_per_line=10, font_mix=((10.0, 10), (16.0, 1)),
+        images_per_page=4, image_size=128, duplicate_ratio=0.5
+    ),
+}
+
+def _random_png(rng: random.Random, size: int) -> bytes:
+    # Blocos de cor aleatórios: cada imagem tem conteúdo distinto, mesmo com as mesmas dimensões
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, size, size), 0)
+    step = max(1, size // 4)
+    for x in range(0, size, step):
+        for y in range(0, size, step):
+            color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+            pixmap.set_rect(fitz.IRect(x, y, x + step, y + step), color)
+    return pixmap.tobytes("png")
+
+def generate_pdf(path: pathlib.Path, spec: CorpusSpec, seed: int = 0) -> Dict[str, Any]:
+    """
+    Gera o PDF descrito por spec e retorna metadados (páginas, imagens únicas, etc.).
+    """
+    rng = random.Random(seed)
+    sizes = [size for size, _ in spec.font_mix]
+    weights = [weight for _, weight in spec.font_mix]
+    body_size = sizes[weights.index(max(weights))]
+
+    doc = fitz.open()
+    images: List[bytes] = []
+    for page_num in range(spec.pages):
+        page = doc.new_page()
+        y = 50.0
+        for _ in range(spec.lines_per_page):
+            size = rng.choices(sizes, weights)[0]
+            if size > body_size:
+                # Linhas com fonte maior são curtas, como títulos
+                text = f"Seção {page_num + 1} " + " ".join(rng.choice(WORDS) for _ in range(3))
+            else:
+                text = " ".join(rng.choice(WORDS) for _ in range(spec.words_per_line)) + "."
+            if y + size > page.rect.height - 40:
+                break
+            page.insert_text((40, y), text, fontsize=size)
+            y += size * 1.4
+
+        for i in range(spec.images_per_page):
+            if images and rng.random() < spec.duplicate_ratio:
+                stream = rng.choice(images)
+            else:
+                stream = _random_png(rng, spec.image_size)
+                images.append(stream)
+            x = 40 + (i % 4) * 130
+            page.insert_image(fitz.Rect(x, page.rect.height - 160, x + 120, page.rect.height - 40), stream=stream)
+
+    doc.save(path, garbage=0)
+    doc.close()
+    return {"pages": spec.pages, "unique_images": len(images), "file_size_bytes": pathlib.Path(path).stat().st_size}
+
+def build_corpus(directory: pathlib.Path, profiles: Dict[str, CorpusSpec] = CORPUS_PROFILES, seed: int = 0) -> Dict[str, pathlib.Path]:
+    """
+    Gera um PDF por perfil no diretório informado; retorna {perfil: caminho}.
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, spec in profiles.items():
+        path = directory / f"{name}.pdf"
+        generate_pdf(path, spec, seed)
+        paths[name] = path
+    return paths
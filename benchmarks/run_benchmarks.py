@@ -0,0 +1,176 @@
+"""
+Suíte de benchmarks: mede cada etapa separadamente sobre um corpus sintético.
+
+Uso:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --output novo.json --baseline bench.json --threshold 0.15
+
+Com --baseline, cada medição é comparada com a referência e o script termina com código 1
+se alguma etapa ficar mais lenta que o limite de tolerância.
+"""
+import argparse
+import contextlib
+import io
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+# Os módulos do projeto são importados a partir de src/, como em src/main.py
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src"))
+
+from corpus import CORPUS_PROFILES, build_corpus
+from pdf.extractor import extract_pdf_analysis
+from pdf.images import extract_pdf_images
+from utils.report import create_markdown_report
+from utils.text import clean_and_tokenize, count_word_frequencies, calculate_vocabulary_size, get_top_n_words
+
+def _time_calls(func: Callable[[], Any], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return time.perf_counter() - start
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float = 0.05) -> Dict[str, float]:
+    """
+    Mede o tempo por chamada de func (com a saída do console suprimida). Como no timeit, cada
+    amostra repete func até somar pelo menos min_time, para estabilizar etapas curtas.
+    Retorna mediana e mínimo das repeat amostras, em segundos por chamada.
+    """
+    calls = 1
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Calibração: multiplica as chamadas por amostra até atingir min_time
+        elapsed = _time_calls(func, calls)
+        while elapsed < min_time and calls < 1000:
+            calls *= 10
+            elapsed = _time_calls(func, calls)
+
+        timings = [elapsed / calls]
+        for _ in range(repeat - 1):
+            timings.append(_time_calls(func, calls) / calls)
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "repeat": repeat, "calls": calls}
+
+def run_document_benchmarks(name: str, pdf_path: pathlib.Path, work_dir: pathlib.Path, repeat: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+
+    results[f"{name}/extract_pdf_analysis"] = measure(lambda: extract_pdf_analysis(pdf_path), repeat)
+    results[f"{name}/extract_pdf_images"] = measure(lambda: extract_pdf_images(pdf_path, work_dir / "images"), repeat)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        analysis_results = extract_pdf_analysis(pdf_path)
+    full_text = analysis_results["full_text"]
+    tokens = clean_and_tokenize(full_text)
+    frequencies = count_word_frequencies(tokens)
+
+    results[f"{name}/clean_and_tokenize"] = measure(lambda: clean_and_tokenize(full_text), repeat)
+    results[f"{name}/count_word_frequencies"] = measure(lambda: count_word_frequencies(tokens), repeat)
+    results[f"{name}/calculate_vocabulary_size"] = measure(lambda: calculate_vocabulary_size(tokens), repeat)
+    results[f"{name}/get_top_n_words"] = measure(lambda: get_top_n_words(frequencies, n=10), repeat)
+    results[f"{name}/create_markdown_report"] = measure(
+        lambda: create_markdown_report(analysis_results, "Resumo sintético.", work_dir / "reports", pdf_path), repeat
+    )
+    return results
+
+def run_summary_benchmarks(pdf_paths: Dict[str, pathlib.Path], repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Mede o resumo com o modelo minúsculo local (modo padrão e --long-document).
+    """
+    from tiny_model import build_tiny_model
+    from llm.summarize import generate_llm_summary
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        text = extract_pdf_analysis(pdf_paths["small_text"])["full_text"]
+    model, tokenizer = build_tiny_model([text])
+
+    return {
+        "summary/generate_llm_summary": measure(lambda: generate_llm_summary(text, model, tokenizer), repeat),
+        # Chunks pequenos forçam vários lotes e níveis de redução
+        "summary/long_document": measure(
+            lambda: generate_llm_summary(text, model, tokenizer, long_document=True, batch_size=4, max_chunk_tokens=512),
+            repeat
+        ),
+    }
+
+def compare_with_baseline(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Any],
+    threshold: float,
+    min_delta_ms: float = 1.0
+) -> List[str]:
+    """
+    Compara as medianas com a referência; retorna as etapas que regrediram além de threshold.
+    Diferenças absolutas menores que min_delta_ms são tratadas como ruído.
+    """
+    regressions = []
+    print(f"\n{'Etapa':<45} | {'Ref. (ms)':>10} | {'Atual (ms)':>10} | {'Variação':>9}")
+    for key, current in results.items():
+        reference = baseline["results"].get(key)
+        if reference is None:
+            print(f"{key:<45} | {'-':>10} | {current['median_s'] * 1000:>10.2f} | {'nova':>9}")
+            continue
+        change = current["median_s"] / reference["median_s"] - 1 if reference["median_s"] > 0 else 0.0
+        delta_ms = (current["median_s"] - reference["median_s"]) * 1000
+        flag = " <- REGRESSÃO" if change > threshold and delta_ms > min_delta_ms else ""
+        print(
+            f"{key:<45} | {reference['median_s'] * 1000:>10.2f} | "
+            f"{current['median_s'] * 1000:>10.2f} | {change:>+8.1%}{flag}"
+        )
+        if flag:
+            regressions.append(key)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks das etapas do processador de PDF.")
+    parser.add_argument('--output', type=str, default='bench_results.json', help='Arquivo JSON de resultados.')
+    parser.add_argument('--baseline', type=str, default=None, help='JSON de referência para detectar regressões.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Tolerância de regressão (0.2 = 20%% mais lento).')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Diferença mínima (ms) para contar como regressão.')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetições por medição (usa a mediana).')
+    parser.add_argument('--profiles', nargs='+', default=list(CORPUS_PROFILES), help='Perfis do corpus a medir.')
+    parser.add_argument('--skip-summary', action='store_true', help='Não mede o resumo (dispensa torch/transformers).')
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = pathlib.Path(tmp)
+        profiles = {name: CORPUS_PROFILES[name] for name in args.profiles}
+        pdf_paths = build_corpus(work_dir / "corpus", profiles)
+
+        for name, pdf_path in pdf_paths.items():
+            print(f"-> Medindo perfil '{name}'...")
+            results.update(run_document_benchmarks(name, pdf_path, work_dir, args.repeat))
+
+        if not args.skip_summary:
+            print("-> Medindo resumo com modelo local minúsculo...")
+            summary_paths = pdf_paths if "small_text" in pdf_paths else build_corpus(
+                work_dir / "corpus", {"small_text": CORPUS_PROFILES["small_text"]}
+            )
+            results.update(run_summary_benchmarks(summary_paths, args.repeat))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n[BENCHMARK]: Resultados salvos em: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n[BENCHMARK]: {len(regressions)} regressões acima de {args.threshold:.0%}.")
+            sys.exit(1)
+        print("\n[BENCHMARK]: Nenhuma regressão detectada.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Modelo seq2seq minúsculo construído localmente (pesos aleatórios, tokenizer treinado no corpus),
+para medir o caminho do resumo sem baixar o modelo real. Os tempos medem o overhead do
+pipeline de geração, não a qualidade do resumo.
+"""
+from typing import Iterable, Tuple
+
+import torch
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+from tokenizers.processors import TemplateProcessing
+from transformers import BartConfig, BartForConditionalGeneration, PreTrainedTokenizerFast
+
+def build_tiny_model(
+    texts: Iterable[str],
+    vocab_size: int = 1000,
+    seed: int = 0,
+    d_model: int = 64,
+    layers: int = 1
+) -> Tuple[BartForConditionalGeneration, PreTrainedTokenizerFast]:
+    """
+    Treina um tokenizer BPE em texts e cria um BART pequeno (por padrão, 1 camada de dimensão 64)
+    com o mesmo contexto (1024) do distilbart.
+    """
+    tokenizer_backend = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer_backend.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer_backend.decoder = decoders.ByteLevel()
+    tokenizer_backend.train_from_iterator(
+        texts, trainers.BpeTrainer(vocab_size=vocab_size, special_tokens=["<s>", "<pad>", "</s>", "<unk>"])
+    )
+    tokenizer_backend.post_processor = TemplateProcessing(
+        single="<s> $A </s>", special_tokens=[("<s>", 0), ("</s>", 2)]
+    )
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer_backend,
+        bos_token="<s>", eos_token="</s>", pad_token="<pad>", unk_token="<unk>",
+        model_max_length=1024
+    )
+
+    config = BartConfig(
+        vocab_size=len(tokenizer), d_model=d_model,
+        encoder_layers=layers, decoder_layers=layers, encoder_attention_heads=2, decoder_attention_heads=2,
+        encoder_ffn_dim=2 * d_model, decoder_ffn_dim=2 * d_model, max_position_embeddings=1024,
+        pad_token_id=1, bos_token_id=0, eos_token_id=2, decoder_start_token_id=2, forced_eos_token_id=2
+    )
+    torch.manual_seed(seed)
+    model = BartForConditionalGeneration(config).eval()
+    return model, tokenizer
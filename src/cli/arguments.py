@@ -1,6 +1,239 @@
 import argparse
+from typing import Optional
 
-def parse_arguments():
+from llm.config import INFERENCE_PROFILES, DEFAULT_INFERENCE_PROFILE, inference_settings
+from utils.budget import DocumentBudget
+
+def add_image_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Argumentos da extração de imagens, comuns ao modo de arquivo único e ao modo em lote.
+    """
+    parser.add_argument(
+        '--min-image-size',
+        type=int,
+        default=0,
+        help='Ignora imagens com largura ou altura menor que este valor, em pixels. Padrão: 0 (todas).'
+    )
+    parser.add_argument(
+        '--image-threads',
+        type=int,
+        default=4,
+        help='Threads para gravar as imagens extraídas em disco. Padrão: 4.'
+    )
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Argumentos de instrumentação por etapa.
+    """
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Mede cada etapa (tempo de parede, CPU da thread e do processo, pico de RSS, contagens) e imprime a tabela ao final.'
+    )
+    parser.add_argument(
+        '--trace-file',
+        type=str,
+        default=None,
+        help='Exporta as etapas medidas em JSON no formato Chrome Trace/Perfetto (implica --profile).'
+    )
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Argumentos do cache de resultados em disco, comuns ao modo de arquivo único e ao modo em lote.
+    """
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Desativa o cache de resultados (análise, imagens e resumo).'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        default=None,
+        help='Diretório do cache de resultados. Padrão: ~/.cache/pdf-processor-llm.'
+    )
+    parser.add_argument(
+        '--cache-max-mb',
+        type=int,
+        default=512,
+        help='Tamanho máximo do cache em MB; as entradas menos usadas são removidas. Padrão: 512.'
+    )
+    parser.add_argument(
+        '--no-page-cache',
+        action='store_true',
+        help='Desativa o cache por página (revisões do PDF reprocessam todas as páginas).'
+    )
+
+def add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Saídas legíveis por máquina, além do relatório Markdown (comuns ao modo de arquivo único e ao modo em lote).
+    """
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Salva um JSON por documento (análise, títulos, imagens, resumo e tempos) em <saída>/<nome do PDF>/analise.json.'
+    )
+    parser.add_argument(
+        '--jsonl',
+        type=str,
+        default=None,
+        metavar='ARQUIVO',
+        help='Acrescenta um registro JSON por documento a este arquivo JSONL, assim que cada documento termina.'
+    )
+
+def add_index_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Argumentos do índice invertido de palavras-chave, comuns ao modo de arquivo único e ao modo em lote.
+    """
+    parser.add_argument(
+        '--index',
+        action='store_true',
+        help='Grava as frequências de termos de cada página no índice invertido (consultado com o subcomando "query").'
+    )
+    parser.add_argument(
+        '--index-dir',
+        type=str,
+        default=None,
+        help='Diretório do índice invertido. Padrão: ".index" dentro do diretório de saída.'
+    )
+
+def add_budget_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Orçamento por documento do modo em lote: com qualquer limite, cada documento roda num worker
+    isolado, encerrado e substituído se exceder o orçamento (ver pipeline/isolation.py).
+    """
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=None,
+        metavar='SEGUNDOS',
+        help='Tempo máximo por documento (análise e imagens); o documento volta com os resultados parciais.'
+    )
+    parser.add_argument(
+        '--page-timeout',
+        type=float,
+        default=None,
+        metavar='SEGUNDOS',
+        help='Tempo máximo por página, na análise ou na extração de imagens.'
+    )
+    parser.add_argument(
+        '--max-rss-mb',
+        type=float,
+        default=None,
+        help='Memória residente máxima do worker durante um documento (Linux).'
+    )
+    parser.add_argument(
+        '--max-images',
+        type=int,
+        default=None,
+        help='Máximo de imagens extraídas por documento.'
+    )
+    parser.add_argument(
+        '--max-text-mb',
+        type=float,
+        default=None,
+        help='Máximo de texto extraído por documento, em MB (UTF-8).'
+    )
+
+def budget_from_args(args) -> Optional[DocumentBudget]:
+    """
+    Orçamento por documento a partir dos argumentos processados; None sem nenhum limite.
+    """
+    budget = DocumentBudget(
+        timeout_s=args.timeout,
+        page_timeout_s=args.page_timeout,
+        max_rss_mb=args.max_rss_mb,
+        max_images=args.max_images,
+        max_text_bytes=int(args.max_text_mb * 2**20) if args.max_text_mb is not None else None
+    )
+    return budget if budget.enabled else None
+
+def add_inference_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Argumentos de inferência em CPU (perfil, quantização, threads e decodificação).
+    """
+    parser.add_argument(
+        '--inference-profile',
+        choices=list(INFERENCE_PROFILES),
+        default=DEFAULT_INFERENCE_PROFILE,
+        help='Perfil de inferência: quality (fp32, 4 feixes), balanced (int8, 2 feixes) ou fast (int8, guloso). '
+             f'Padrão: {DEFAULT_INFERENCE_PROFILE}.'
+    )
+    parser.add_argument(
+        '--quantize',
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help='Força (ou desativa, com --no-quantize) a quantização int8 dinâmica das camadas lineares. Padrão: a do perfil.'
+    )
+    parser.add_argument(
+        '--inference-threads',
+        type=int,
+        default=None,
+        help='Threads intra-op do torch na geração. Padrão: uma por núcleo.'
+    )
+    parser.add_argument(
+        '--num-beams',
+        type=int,
+        default=None,
+        help='Feixes da busca na geração (1 = decodificação gulosa). Padrão: o do perfil.'
+    )
+    parser.add_argument(
+        '--max-summary-length',
+        type=int,
+        default=None,
+        help='Máximo de tokens gerados no resumo. Padrão: o do perfil.'
+    )
+    parser.add_argument(
+        '--min-summary-length',
+        type=int,
+        default=None,
+        help='Mínimo de tokens gerados no resumo. Padrão: o do perfil.'
+    )
+
+def inference_from_args(args) -> dict:
+    """
+    Configuração de inferência (llm.config.inference_settings) a partir dos argumentos processados.
+    """
+    return inference_settings(
+        args.inference_profile,
+        num_beams=args.num_beams,
+        max_length=args.max_summary_length,
+        min_length=args.min_summary_length,
+        quantize=args.quantize,
+        num_threads=args.inference_threads
+    )
+
+def add_summary_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Argumentos do resumo LLM, comuns ao modo de arquivo único e ao modo em lote.
+    """
+    parser.add_argument(
+        '--long-document',
+        action='store_true',
+        help='Resume o documento inteiro em chunks (map-reduce), em vez de truncar no contexto do modelo.'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=4,
+        help='Chunks resumidos por chamada ao modelo no modo --long-document. Padrão: 4.'
+    )
+    parser.add_argument(
+        '--max-chunk-tokens',
+        type=int,
+        default=None,
+        help='Máximo de tokens por chunk no modo --long-document. Padrão: contexto do modelo.'
+    )
+    parser.add_argument(
+        '--llm-server',
+        type=str,
+        default=None,
+        metavar='URL',
+        help='Usa o servidor de resumo local (subcomando "serve") em vez de carregar o modelo. Ex.: http://127.0.0.1:8765'
+    )
+    add_inference_arguments(parser)
+
+def parse_arguments(argv=None):
     """
     Define e processa os argumentos de linha de comando usando argparse.
     """
@@ -19,7 +252,14 @@ def parse_arguments():
         '-f','--file',
         type=str, # Espera uma string
         required=True, # Torna o argumento obrigatório
-        help='Caminho para o arquivo PDF em português a ser processado.'
+        help='Caminho para o arquivo PDF em português a ser processado ("-" lê o PDF da entrada padrão).'
+    )
+    # Opcional: Nome do Documento Lido da Entrada Padrão
+    parser.add_argument(
+        '--input-name',
+        type=str,
+        default=None,
+        help='Nome do documento lido com "-f -" (define os diretórios de saída). Padrão: "stdin.pdf".'
     )
     # Argumento Opcional: Diretório de Saída
     parser.add_argument(
@@ -34,6 +274,220 @@ def parse_arguments():
         action='store_true', # Define o valor como True se a flag estiver presente
         help='Ativa a geração do resumo do conteúdo do PDF usando a LLM local.'
     )
+    # Opcional: Processos para a Análise do PDF
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=1,
+        help='Número de processos para analisar as páginas em paralelo. Padrão: 1 (serial).'
+    )
+    add_image_arguments(parser)
+    add_summary_arguments(parser)
+    add_cache_arguments(parser)
+    add_output_arguments(parser)
+    add_index_arguments(parser)
+    add_profile_arguments(parser)
 
     # 3. Retornar o Objeto de Argumentos Processados
-    return parser.parse_args()
\ No newline at end of file
+    return parser.parse_args(argv)
+
+def parse_batch_arguments(argv=None):
+    """
+    Define e processa os argumentos do modo em lote (subcomando 'batch').
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py batch",
+        description="Processa vários PDFs em lote, com um único modelo LLM residente."
+    )
+    # Entradas: arquivos, diretórios (busca recursiva por *.pdf) ou padrões glob
+    parser.add_argument(
+        'inputs',
+        nargs='*',
+        help='Arquivos PDF, diretórios ou padrões glob (ex.: "docs/**/*.pdf").'
+    )
+    parser.add_argument(
+        '-m', '--manifest',
+        type=str,
+        help='Arquivo texto com um caminho de PDF por linha.'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=str,
+        default='output/',
+        help='Diretório de saída para salvar os relatórios e as imagens. Padrão: "output/".'
+    )
+    parser.add_argument(
+        '--summarize',
+        action='store_true',
+        help='Ativa a geração do resumo e do relatório de cada PDF usando a LLM local.'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Número de processos para análise e extração de imagens. Padrão: 1.'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Mede as etapas de cada documento e imprime os percentis por etapa ao final do lote.'
+    )
+    parser.add_argument(
+        '--profile-output',
+        type=str,
+        default=None,
+        help='Salva os percentis por etapa do lote em JSON (implica --profile).'
+    )
+    parser.add_argument(
+        '--corpus-stats',
+        type=str,
+        default=None,
+        help='Calcula estatísticas do corpus com esboços de memória limitada (palavras mais comuns e '
+             'vocabulário estimado) e salva o esboço combinado neste arquivo JSON.'
+    )
+    # Pipeline assíncrono: análise, imagens, resumo e relatório sobrepostos entre documentos
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='Processa o lote como pipeline assíncrono com filas limitadas entre as etapas '
+             '(análise, imagens, resumo, relatório) e reporta a vazão em documentos/minuto.'
+    )
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=4,
+        help='Capacidade de cada fila do pipeline; filas cheias pausam a etapa anterior. Padrão: 4.'
+    )
+    parser.add_argument(
+        '--summary-batch',
+        type=int,
+        default=4,
+        help='Máximo de documentos por chamada ao modelo no pipeline (micro-lote). Padrão: 4.'
+    )
+    parser.add_argument(
+        '--summary-wait-ms',
+        type=float,
+        default=50.0,
+        help='Tempo máximo de espera para completar um micro-lote de resumos. Padrão: 50 ms.'
+    )
+    add_image_arguments(parser)
+    add_summary_arguments(parser)
+    add_cache_arguments(parser)
+    add_output_arguments(parser)
+    add_index_arguments(parser)
+    add_budget_arguments(parser)
+    return parser.parse_args(argv)
+
+def parse_serve_arguments(argv=None):
+    """
+    Define e processa os argumentos do servidor de resumo (subcomando 'serve').
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        description="Servidor local de resumo: mantém o modelo LLM residente e agrupa requisições em micro-lotes."
+    )
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Endereço de escuta. Padrão: 127.0.0.1.')
+    parser.add_argument('--port', type=int, default=8765, help='Porta HTTP. Padrão: 8765.')
+    parser.add_argument(
+        '--max-batch',
+        type=int,
+        default=8,
+        help='Máximo de requisições por chamada ao modelo. Padrão: 8.'
+    )
+    parser.add_argument(
+        '--max-wait-ms',
+        type=float,
+        default=20.0,
+        help='Tempo máximo de espera para completar um micro-lote. Padrão: 20 ms.'
+    )
+    add_inference_arguments(parser)
+    return parser.parse_args(argv)
+
+def parse_corpus_arguments(argv=None):
+    """
+    Define e processa os argumentos da combinação de esboços de corpus (subcomando 'corpus').
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py corpus",
+        description="Combina esboços de estatísticas de corpus (de documentos ou de shards) e imprime o resultado."
+    )
+    parser.add_argument(
+        'sketches',
+        nargs='+',
+        help='Arquivos JSON de esboço (gerados por "batch --corpus-stats" ou por este subcomando).'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=str,
+        default=None,
+        help='Salva o esboço combinado neste arquivo JSON.'
+    )
+    parser.add_argument(
+        '-n', '--top',
+        type=int,
+        default=10,
+        help='Quantidade de palavras mais comuns exibidas. Padrão: 10.'
+    )
+    return parser.parse_args(argv)
+
+def parse_query_arguments(argv=None):
+    """
+    Define e processa os argumentos da busca por palavras-chave (subcomando 'query').
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py query",
+        description="Busca por palavras-chave no índice invertido (gerado com --index), sem abrir os PDFs."
+    )
+    parser.add_argument('terms', nargs='+', help='Palavras-chave da consulta.')
+    parser.add_argument(
+        '--index-dir',
+        type=str,
+        default='output/.index',
+        help='Diretório do índice invertido. Padrão: "output/.index".'
+    )
+    parser.add_argument(
+        '-n', '--top',
+        type=int,
+        default=10,
+        help='Quantidade de documentos retornados. Padrão: 10.'
+    )
+    parser.add_argument(
+        '--pages',
+        type=int,
+        default=3,
+        help='Melhores páginas exibidas por documento. Padrão: 3.'
+    )
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Só considera as páginas que contêm todos os termos.'
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Imprime o resultado em JSON.'
+    )
+    return parser.parse_args(argv)
+
+def parse_index_arguments(argv=None):
+    """
+    Define e processa os argumentos da manutenção do índice invertido (subcomando 'index').
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py index",
+        description="Manutenção do índice invertido: estatísticas, remoção de documentos e compactação."
+    )
+    parser.add_argument(
+        'action',
+        choices=['stats', 'remove', 'compact'],
+        help='stats: contagens do índice; remove: remove os PDFs informados; compact: reescreve os segmentos '
+             'num só, descartando os documentos removidos.'
+    )
+    parser.add_argument('paths', nargs='*', help='PDFs removidos do índice (ação "remove").')
+    parser.add_argument(
+        '--index-dir',
+        type=str,
+        default='output/.index',
+        help='Diretório do índice invertido. Padrão: "output/.index".'
+    )
+    return parser.parse_args(argv)
@@ -0,0 +1,42 @@
+import json
+import urllib.request
+import urllib.error
+from typing import Any, Dict
+
+# Endereço padrão do servidor de resumo (ver llm/server.py)
+DEFAULT_SERVER_URL = "http://127.0.0.1:8765"
+
+def request_summary(server_url: str, full_text: str, timeout: float = 600.0, **options: Any) -> str:
+    """
+    Envia o texto ao servidor de resumo local e retorna o resumo gerado.
+    As opções (long_document, batch_size, max_chunk_tokens) são repassadas ao servidor.
+    """
+    payload: Dict[str, Any] = {"text": full_text, **options}
+    request = urllib.request.Request(
+        server_url.rstrip('/') + "/summarize",
+        data=json.dumps(payload).encode('utf-8'),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        # O servidor devolve o erro em JSON (ex.: modelo não carregado)
+        try:
+            message = json.loads(e.read().decode('utf-8')).get("error", str(e))
+        except ValueError:
+            message = str(e)
+        return f"Erro: Servidor de resumo retornou falha: {message}"
+    except (urllib.error.URLError, OSError) as e:
+        return f"Erro: Servidor de resumo indisponível em {server_url}: {e}"
+
+    return body.get("summary", "")
+
+def server_health(server_url: str, timeout: float = 2.0) -> Dict[str, Any]:
+    """
+    Consulta o estado do servidor (modelo carregado, tamanho da fila).
+    """
+    with urllib.request.urlopen(server_url.rstrip('/') + "/health", timeout=timeout) as response:
+        return json.loads(response.read().decode('utf-8'))
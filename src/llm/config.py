@@ -0,0 +1,83 @@
+from typing import Any, Dict, Optional
+
+# Configuração do resumo sem dependências pesadas: importar este módulo não carrega torch/transformers
+
+# Define o modelo que será carregado
+MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
+
+# Contexto (em tokens) assumido quando nem o modelo nem o tokenizer informam o seu limite
+DEFAULT_CONTEXT_TOKENS = 1024
+
+# Parâmetros de geração usados no resumo final
+GENERATION_PARAMS: Dict[str, Any] = {
+    "max_length": 500,
+    "min_length": 50,
+    "length_penalty": 2.0,
+    "num_beams": 4,
+    "early_stopping": True,
+}
+
+# Parâmetros que só têm efeito na busca em feixe (num_beams > 1)
+BEAM_ONLY_PARAMS = ("early_stopping", "length_penalty")
+
+# Perfis de inferência em CPU: quantização int8 dinâmica das camadas lineares e decodificação.
+# "quality" reproduz o comportamento original (fp32, busca em feixe com 4 feixes).
+INFERENCE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "quality": {"quantize": False, "generation": GENERATION_PARAMS},
+    "balanced": {"quantize": True, "generation": {**GENERATION_PARAMS, "num_beams": 2}},
+    "fast": {"quantize": True, "generation": {**GENERATION_PARAMS, "num_beams": 1, "max_length": 200, "min_length": 30}},
+}
+DEFAULT_INFERENCE_PROFILE = "quality"
+
+def inference_settings(
+    profile: str = DEFAULT_INFERENCE_PROFILE,
+    num_beams: Optional[int] = None,
+    max_length: Optional[int] = None,
+    min_length: Optional[int] = None,
+    quantize: Optional[bool] = None,
+    num_threads: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Resolve o perfil de inferência com os ajustes informados (None mantém o valor do perfil).
+    Retorna {"profile", "quantize", "num_threads", "generation"}; num_threads None mantém o padrão do torch.
+    """
+    if profile not in INFERENCE_PROFILES:
+        raise ValueError(f"Perfil de inferência desconhecido: '{profile}'. Perfis: {', '.join(INFERENCE_PROFILES)}")
+    base = INFERENCE_PROFILES[profile]
+
+    generation = dict(base["generation"])
+    overrides = {"num_beams": num_beams, "max_length": max_length, "min_length": min_length}
+    generation.update({key: value for key, value in overrides.items() if value is not None})
+    generation["min_length"] = min(generation["min_length"], generation["max_length"])
+    if generation["num_beams"] == 1:
+        # Decodificação gulosa: remove parâmetros da busca em feixe (o transformers avisa se presentes)
+        for key in BEAM_ONLY_PARAMS:
+            generation.pop(key, None)
+
+    return {
+        "profile": profile,
+        "quantize": base["quantize"] if quantize is None else quantize,
+        "num_threads": num_threads,
+        "generation": generation,
+    }
+
+def summary_config(
+    long_document: bool = False,
+    batch_size: int = 4,
+    max_chunk_tokens: Optional[int] = None,
+    inference: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Configuração que determina o resumo gerado (usada como parte da chave do cache de resultados).
+    O número de threads não altera o resumo e fica de fora.
+    """
+    settings = inference or inference_settings()
+    config: Dict[str, Any] = {
+        "model": MODEL_NAME,
+        "generation": settings["generation"],
+        "quantize": settings["quantize"],
+        "long_document": long_document,
+    }
+    if long_document:
+        config.update({"batch_size": batch_size, "max_chunk_tokens": max_chunk_tokens})
+    return config
@@ -1,26 +1,155 @@
+import ctypes
+import gc
+import threading
+import warnings
 import torch
 from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, PreTrainedModel, PreTrainedTokenizer
-from typing import Tuple
-# Define o modelo que será carregado (
-MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
+from typing import Tuple, Dict, Optional
 
-def load_model() -> Tuple[PreTrainedModel, PreTrainedTokenizer]:
+from utils.profiling import profile_stage
+from .config import MODEL_NAME
+
+# Registro de modelos carregados no processo, por nome do modelo (variantes quantizadas com sufixo)
+_MODEL_CACHE: Dict[str, Tuple[PreTrainedModel, PreTrainedTokenizer]] = {}
+_CACHE_LOCK = threading.Lock()
+
+# Sufixo da variante int8 no registro
+_QUANTIZED_SUFFIX = "#int8"
+
+def load_model(model_name: str = MODEL_NAME) -> Tuple[PreTrainedModel, PreTrainedTokenizer]:
     """
     Carrega o modelo LLM local e o tokenizer do Hugging Face.
+    Sempre lê os pesos do disco; para reutilizar o modelo no processo, use get_model.
     """
-    print(f"-> Carregando modelo local: {MODEL_NAME}...")
-    
+    print(f"-> Carregando modelo local: {model_name}...")
+
     try:
         # 1. Carregar o Tokenizer
-        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-        
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+
         # 2. Carregar o Modelo
-        model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
-        
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+
         print("-> Modelo carregado com sucesso.")
         return model, tokenizer
-        
+
     except Exception as e:
-        print(f"ERRO: Falha ao carregar o modelo '{MODEL_NAME}'. Verifique sua conexão e instalação.")
+        print(f"ERRO: Falha ao carregar o modelo '{model_name}'. Verifique sua conexão e instalação.")
         print(f"Detalhes do erro: {e}")
-        return None, None
\ No newline at end of file
+        return None, None
+
+def get_model(model_name: str = MODEL_NAME, quantize: bool = False) -> Tuple[PreTrainedModel, PreTrainedTokenizer]:
+    """
+    Retorna o modelo do registro do processo, carregando-o apenas na primeira chamada.
+    Com quantize=True, retorna a variante int8. Ela é derivada do modelo fp32 já residente, se
+    houver; caso contrário, o fp32 é lido do disco só para a quantização e não entra no registro,
+    de modo que o processo mantém apenas os pesos int8.
+    Falhas de carregamento não são armazenadas, para permitir nova tentativa.
+    """
+    quantized_name = model_name + _QUANTIZED_SUFFIX
+    with _CACHE_LOCK:
+        name = quantized_name if quantize else model_name
+        if name in _MODEL_CACHE:
+            return _MODEL_CACHE[name]
+
+        if model_name in _MODEL_CACHE:
+            model, tokenizer = _MODEL_CACHE[model_name]
+        else:
+            with profile_stage("summary/model_load"):
+                model, tokenizer = load_model(model_name)
+            if model is None:
+                return None, None
+            if not quantize:
+                _MODEL_CACHE[model_name] = (model, tokenizer)
+                return _MODEL_CACHE[model_name]
+
+        with profile_stage("summary/quantize"):
+            _MODEL_CACHE[quantized_name] = (quantize_model(model), tokenizer)
+        # Libera o fp32 lido só para a quantização (o registrado continua no registro)
+        del model
+        release_memory()
+        return _MODEL_CACHE[quantized_name]
+
+def release_memory() -> None:
+    """
+    Coleta os objetos sem referência e devolve ao sistema a memória livre do heap (glibc), para
+    que a memória residente caia de fato após descartar pesos (o malloc mantém as páginas livres).
+    """
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        # Fora da glibc (macOS, musl): só a coleta
+        pass
+
+def quantize_model(model: PreTrainedModel) -> PreTrainedModel:
+    """
+    Quantização dinâmica int8 das camadas lineares (pesos em int8, ativações quantizadas em tempo
+    de execução). Retorna uma cópia; o modelo fp32 original não é alterado.
+    """
+    with warnings.catch_warnings():
+        # A API de quantização eager está marcada como obsoleta nas versões recentes do torch
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def set_inference_threads(num_threads: Optional[int]) -> None:
+    """
+    Ajusta o número de threads intra-op do torch (None mantém o padrão: um por núcleo).
+    """
+    if num_threads and num_threads != torch.get_num_threads():
+        torch.set_num_threads(num_threads)
+
+def inference_mode():
+    """
+    Contexto de inferência sem rastreamento de gradientes nem de versões de tensores.
+    """
+    return torch.inference_mode()
+
+def register_model(
+    model: PreTrainedModel,
+    tokenizer: PreTrainedTokenizer,
+    model_name: str = MODEL_NAME,
+    quantize: bool = False
+) -> None:
+    """
+    Registra um modelo já construído (ex.: um modelo local de testes) sob o nome informado.
+    Com quantize=True, registra apenas a variante int8 (a usada por get_model(quantize=True));
+    o modelo fp32 não fica no registro.
+    """
+    if quantize:
+        model = quantize_model(model)
+        model_name += _QUANTIZED_SUFFIX
+    with _CACHE_LOCK:
+        _MODEL_CACHE[model_name] = (model, tokenizer)
+
+def warm_up(model_name: str = MODEL_NAME, quantize: bool = False) -> bool:
+    """
+    Carrega o modelo no registro e executa uma geração curta, para que a primeira
+    requisição real não pague a inicialização. Retorna False se o modelo não carregar.
+    """
+    model, tokenizer = get_model(model_name, quantize)
+    if model is None:
+        return False
+
+    with torch.inference_mode():
+        inputs = tokenizer("Aquecimento do modelo.", return_tensors='pt')
+        model.generate(**inputs, max_length=8, num_beams=1)
+    return True
+
+def unload_model(model_name: Optional[str] = None) -> None:
+    """
+    Remove o modelo do registro (ou todos, se model_name for None) e libera a memória.
+    """
+    with _CACHE_LOCK:
+        if model_name is None:
+            _MODEL_CACHE.clear()
+        else:
+            _MODEL_CACHE.pop(model_name, None)
+            _MODEL_CACHE.pop(model_name + _QUANTIZED_SUFFIX, None)
+    release_memory()
+
+def is_model_loaded(model_name: str = MODEL_NAME, quantize: bool = False) -> bool:
+    """
+    Indica se o modelo (ou sua variante int8) já está residente no registro do processo.
+    """
+    return (model_name + _QUANTIZED_SUFFIX if quantize else model_name) in _MODEL_CACHE
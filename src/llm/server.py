@@ -0,0 +1,273 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .config import BEAM_ONLY_PARAMS, INFERENCE_PROFILES, inference_settings
+from .model import MODEL_NAME, get_model, warm_up, unload_model, is_model_loaded, set_inference_threads
+from .summarize import context_token_budget, generate_llm_summary, summarize_batch
+
+# Opções de resumo aceitas nas requisições (repassadas a generate_llm_summary)
+ALLOWED_OPTIONS = {"long_document", "batch_size", "max_chunk_tokens", "inference"}
+
+# Campos aceitos em "inference" (o formato de config.inference_settings) e em "inference.generation"
+ALLOWED_INFERENCE_KEYS = {"profile", "quantize", "num_threads", "generation"}
+ALLOWED_GENERATION_KEYS = {"num_beams", "max_length", "min_length", "length_penalty", "early_stopping"}
+
+def _check_type(name: str, value: Any, expected: tuple) -> None:
+    # bool é subclasse de int: não vale como número
+    if isinstance(value, bool) and bool not in expected or not isinstance(value, expected):
+        raise ValueError(f"Campo '{name}' inválido: {value!r}.")
+
+def clamp_inference(requested: Any, server: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida o "inference" de uma requisição e o limita ao perfil do servidor: feixes e comprimento
+    máximo não passam dos do servidor (o mínimo, do máximo), e quantização e threads são sempre as
+    do servidor (os pesos residentes). Campos desconhecidos ou com tipo inválido levantam ValueError.
+    """
+    if not isinstance(requested, dict):
+        raise ValueError("Campo 'inference' inválido: esperado um objeto.")
+    unknown = set(requested) - ALLOWED_INFERENCE_KEYS
+    generation = requested.get("generation", {})
+    if not isinstance(generation, dict):
+        raise ValueError("Campo 'inference.generation' inválido: esperado um objeto.")
+    unknown |= {f"generation.{key}" for key in set(generation) - ALLOWED_GENERATION_KEYS}
+    if unknown:
+        raise ValueError(f"Campos não permitidos em 'inference': {', '.join(sorted(unknown))}.")
+
+    profile = requested.get("profile", server["profile"])
+    if profile not in INFERENCE_PROFILES:
+        raise ValueError(f"Perfil de inferência desconhecido: {profile!r}.")
+    if "quantize" in requested:
+        _check_type("quantize", requested["quantize"], (bool,))
+    if requested.get("num_threads") is not None:
+        _check_type("num_threads", requested["num_threads"], (int,))
+    for key in ("num_beams", "max_length", "min_length"):
+        if key in generation:
+            _check_type(key, generation[key], (int,))
+            if generation[key] < (0 if key == "min_length" else 1):
+                raise ValueError(f"Campo '{key}' inválido: {generation[key]!r}.")
+    if "length_penalty" in generation:
+        _check_type("length_penalty", generation["length_penalty"], (int, float))
+    if "early_stopping" in generation:
+        _check_type("early_stopping", generation["early_stopping"], (bool,))
+
+    # Valores ausentes vêm do perfil pedido; todos ficam limitados aos do servidor
+    wanted = {**INFERENCE_PROFILES[profile]["generation"], **generation}
+    limits = server["generation"]
+    settings = inference_settings(
+        server["profile"],
+        num_beams=min(wanted["num_beams"], limits["num_beams"]),
+        max_length=min(wanted["max_length"], limits["max_length"]),
+        min_length=wanted["min_length"],
+        quantize=server["quantize"],
+        num_threads=server["num_threads"]
+    )
+    if settings["generation"]["num_beams"] > 1:
+        settings["generation"].update({key: wanted[key] for key in BEAM_ONLY_PARAMS if key in wanted})
+    return settings
+
+class SummaryRequest(NamedTuple):
+    text: str
+    options: Dict[str, Any]
+    future: Future
+
+class SummaryBatcher:
+    """
+    Fila de requisições consumida por uma única thread dona do modelo.
+    Requisições que chegam juntas são agrupadas em micro-lotes (uma chamada a model.generate
+    por combinação de quantização e parâmetros de geração). Requisições sem "inference" usam o
+    perfil do servidor; as demais chegam já limitadas a ele (ver clamp_inference).
+    """
+
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        max_batch: int = 8,
+        max_wait_ms: float = 20.0,
+        inference: Optional[Dict[str, Any]] = None
+    ):
+        self.model_name = model_name
+        self.inference = inference or inference_settings()
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: "queue.Queue[Optional[SummaryRequest]]" = queue.Queue()
+        self.thread = threading.Thread(target=self._loop, name="summary-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, text: str, options: Dict[str, Any]) -> Future:
+        future: Future = Future()
+        self.queue.put(SummaryRequest(text, options, future))
+        return future
+
+    def stop(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+    def _collect_batch(self, first: SummaryRequest) -> List[Optional[SummaryRequest]]:
+        # Espera até max_wait por mais requisições para completar o lote
+        batch: List[Optional[SummaryRequest]] = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is None:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = self._collect_batch(first)
+            stop = batch[-1] is None
+            self._run([request for request in batch if request is not None])
+            if stop:
+                return
+
+    def _settings(self, request: SummaryRequest) -> Dict[str, Any]:
+        return request.options.get("inference") or self.inference
+
+    def _run(self, batch: List[SummaryRequest]) -> None:
+        # Resumos simples com as mesmas configurações compartilham uma chamada a generate;
+        # documentos longos já agrupam seus chunks
+        groups: Dict[str, List[SummaryRequest]] = {}
+        long_documents: List[SummaryRequest] = []
+        for request in batch:
+            if request.options.get("long_document"):
+                long_documents.append(request)
+                continue
+            settings = self._settings(request)
+            key = json.dumps([settings["quantize"], settings["generation"]], sort_keys=True)
+            groups.setdefault(key, []).append(request)
+
+        for requests in groups.values():
+            settings = self._settings(requests[0])
+            try:
+                model, tokenizer = get_model(self.model_name, settings["quantize"])
+                if model is None:
+                    raise RuntimeError("Modelo LLM não pôde ser carregado.")
+                summaries, _, _ = summarize_batch(
+                    [request.text for request in requests], model, tokenizer,
+                    context_token_budget(tokenizer, model=model), settings["generation"]
+                )
+                for request, summary in zip(requests, summaries):
+                    request.future.set_result(summary)
+            except Exception as e:
+                for request in requests:
+                    request.future.set_exception(e)
+
+        for request in long_documents:
+            settings = self._settings(request)
+            options = {key: value for key, value in request.options.items() if key != "inference"}
+            try:
+                model, tokenizer = get_model(self.model_name, settings["quantize"])
+                if model is None:
+                    raise RuntimeError("Modelo LLM não pôde ser carregado.")
+                request.future.set_result(
+                    generate_llm_summary(request.text, model, tokenizer, inference=settings, **options)
+                )
+            except Exception as e:
+                request.future.set_exception(e)
+
+class SummaryRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /summarize {"text": ..., "long_document": ...} -> {"summary": ...}
+    GET /health -> estado do servidor
+    """
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": "Rota não encontrada."})
+            return
+        batcher: SummaryBatcher = self.server.batcher
+        self._send_json(200, {
+            "status": "ok",
+            "model": batcher.model_name,
+            "model_loaded": is_model_loaded(batcher.model_name, batcher.inference["quantize"]),
+            "inference_profile": batcher.inference["profile"],
+            "queue_size": batcher.queue.qsize(),
+        })
+
+    def do_POST(self):
+        if self.path != "/summarize":
+            self._send_json(404, {"error": "Rota não encontrada."})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+            text = payload["text"]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": "Corpo inválido: esperado JSON com o campo 'text'."})
+            return
+
+        options = {key: value for key, value in payload.items() if key in ALLOWED_OPTIONS}
+        if options.get("inference") is not None:
+            try:
+                options["inference"] = clamp_inference(options["inference"], self.server.batcher.inference)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+        try:
+            summary = self.server.batcher.submit(text, options).result()
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"summary": summary})
+
+    def log_message(self, format, *args):
+        # Silencia o log por requisição do http.server
+        pass
+
+def run_server(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    model_name: str = MODEL_NAME,
+    max_batch: int = 8,
+    max_wait_ms: float = 20.0,
+    inference: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Mantém o modelo residente e atende requisições de resumo até ser interrompido (Ctrl+C).
+    """
+    inference = inference or inference_settings()
+    set_inference_threads(inference["num_threads"])
+
+    print(f"[SERVIDOR LLM]: Aquecendo modelo {model_name} (perfil '{inference['profile']}')...")
+    if not warm_up(model_name, inference["quantize"]):
+        print("[ERRO SERVIDOR LLM]: Modelo LLM não pôde ser carregado.")
+        return 1
+
+    batcher = SummaryBatcher(model_name, max_batch=max_batch, max_wait_ms=max_wait_ms, inference=inference)
+    server = ThreadingHTTPServer((host, port), SummaryRequestHandler)
+    server.batcher = batcher
+
+    print(f"[SERVIDOR LLM]: Atendendo em http://{host}:{port} (lotes de até {max_batch}, espera {max_wait_ms:.0f} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[SERVIDOR LLM]: Encerrando...")
+    finally:
+        server.server_close()
+        batcher.stop()
+        unload_model(model_name)
+    return 0
@@ -1,31 +1,223 @@
-from typing import Tuple, Any, Dict
-from .model import load_model 
+from typing import Tuple, Any, Dict, Optional, List
+import re
+import time
+from .config import DEFAULT_CONTEXT_TOKENS, GENERATION_PARAMS, inference_settings
+from utils.profiling import profile_stage
 
-def generate_llm_summary(full_text: str) -> str:
+# Limite de segurança de níveis de redução no modo de documento longo
+MAX_REDUCE_LEVELS = 8
+
+# Fronteira de sentença: pontuação final seguida de espaço (inclui quebras de linha/página)
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+def generate_llm_summary(
+    full_text: str,
+    model: Optional[Any] = None,
+    tokenizer: Optional[Any] = None,
+    long_document: bool = False,
+    batch_size: int = 4,
+    max_chunk_tokens: Optional[int] = None,
+    server_url: Optional[str] = None,
+    inference: Optional[Dict[str, Any]] = None
+) -> str:
     """
     Gera um resumo do texto completo usando o LLM local.
+    Modelo e tokenizer já carregados podem ser passados; sem eles, usa o registro do processo (get_model).
+    Com server_url, o resumo é pedido ao servidor local (llm/server.py), sem carregar o modelo aqui.
+    Com long_document=True, o texto inteiro é resumido em map-reduce (ver summarize_long_text);
+    caso contrário, apenas o início do texto que cabe no contexto do modelo é considerado.
+    inference (ver config.inference_settings) define quantização, threads e parâmetros de geração;
+    sem ele, usa o perfil padrão.
     """
-    # 1. Carregar o Modelo e Tokenizer (ou passá-los como argumentos se for mais eficiente)
-    model, tokenizer = load_model()
-    
+    settings = inference or inference_settings()
+
+    # Modo cliente: o servidor mantém o modelo residente
+    if server_url:
+        from .client import request_summary
+        options: Dict[str, Any] = {"long_document": long_document, "batch_size": batch_size, "inference": settings}
+        if max_chunk_tokens:
+            options["max_chunk_tokens"] = max_chunk_tokens
+        return request_summary(server_url, full_text, **options)
+
+    # Import tardio: torch/transformers só são carregados quando o modelo local é usado
+    from .model import get_model, inference_mode, set_inference_threads
+    set_inference_threads(settings["num_threads"])
+
+    # 1. Obter o Modelo e Tokenizer (se não foram passados como argumentos)
+    if model is None or tokenizer is None:
+        model, tokenizer = get_model(quantize=settings["quantize"])
+
     if model is None:
         return "Erro: Modelo LLM não pôde ser carregado."
-    
+
+    if long_document:
+        summary, stats = summarize_long_text(
+            full_text, model, tokenizer, batch_size, max_chunk_tokens, settings["generation"]
+        )
+        print(
+            f"[LLM]: {stats['chunks']} chunks, {stats['levels']} níveis, {stats['batches']} lotes | "
+            f"{stats['input_tokens']:,} tokens de entrada, {stats['generated_tokens']:,} gerados | "
+            f"{stats['tokens_per_second']:,.1f} tokens/s"
+        )
+        return summary
+
     # 2. Preparar a Entrada (Tokenizar)
-    inputs = tokenizer.encode(full_text, return_tensors='pt', truncation=True) 
+    inputs = tokenizer.encode(
+        full_text, return_tensors='pt', truncation=True, max_length=model_context_length(tokenizer, model)
+    )
 
     # 3. Gerar o Resumo
-    summary_ids = model.generate(
-        inputs, 
-        max_length=500, 
-        min_length=50, 
-        length_penalty=2.0, 
-        num_beams=4, 
-        early_stopping=True
-    )
+    with profile_stage("summary/generate") as counts, inference_mode():
+        summary_ids = model.generate(inputs, **settings["generation"])
+        counts["input_tokens"] = inputs.numel()
+        counts["generated_tokens"] = summary_ids.numel()
 
     # 4. Decodificar e Retornar
-    # Usa o tokenizer.decode para converter os IDs de volta para texto.
-    summary = tokenizer.decode(summary_ids.squeeze(), skip_special_tokens=True)
-    
-    return summary
\ No newline at end of file
+    return decode_summaries(tokenizer, summary_ids)[0]
+
+def decode_summaries(tokenizer: Any, summary_ids: Any) -> List[str]:
+    """
+    Converte os IDs gerados de volta para texto. Único ponto de decodificação de todos os caminhos
+    (chamada única, lotes, documentos longos, servidor e streaming), para que o mesmo documento
+    produza o mesmo resumo, e a mesma entrada de cache, em qualquer modo.
+    """
+    return [s.strip() for s in tokenizer.batch_decode(summary_ids, skip_special_tokens=True)]
+
+def model_context_length(tokenizer: Any, model: Optional[Any] = None) -> int:
+    """
+    Contexto do modelo em tokens (com os especiais): o menor entre as posições do modelo
+    (config.max_position_embeddings) e o model_max_length do tokenizer; DEFAULT_CONTEXT_TOKENS se
+    nenhum dos dois o informar.
+    """
+    from transformers.tokenization_utils_base import VERY_LARGE_INTEGER
+    limits = [getattr(getattr(model, "config", None), "max_position_embeddings", None)]
+    # model_max_length é um valor sentinela enorme quando o tokenizer não o define
+    if tokenizer.model_max_length < VERY_LARGE_INTEGER:
+        limits.append(tokenizer.model_max_length)
+    limits = [limit for limit in limits if limit]
+    return min(limits) if limits else DEFAULT_CONTEXT_TOKENS
+
+def context_token_budget(tokenizer: Any, max_chunk_tokens: Optional[int] = None, model: Optional[Any] = None) -> int:
+    """
+    Número máximo de tokens de texto por chunk: o contexto do modelo menos os tokens especiais.
+    """
+    model_limit = model_context_length(tokenizer, model) - tokenizer.num_special_tokens_to_add()
+    if max_chunk_tokens:
+        return max(1, min(max_chunk_tokens, model_limit))
+    return model_limit
+
+def split_into_chunks(text: str, tokenizer: Any, max_chunk_tokens: int) -> List[str]:
+    """
+    Divide o texto em chunks de até max_chunk_tokens, respeitando fronteiras de sentença.
+    Sentenças maiores que o limite são cortadas em janelas de tokens.
+    """
+    sentences = [s for s in _SENTENCE_BOUNDARY.split(text) if s.strip()]
+    if not sentences:
+        return []
+
+    # Uma única chamada ao tokenizer para todas as sentenças
+    sentence_ids = tokenizer(sentences, add_special_tokens=False)["input_ids"]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence, ids in zip(sentences, sentence_ids):
+        if len(ids) > max_chunk_tokens:
+            if current:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            for i in range(0, len(ids), max_chunk_tokens):
+                chunks.append(tokenizer.decode(ids[i:i + max_chunk_tokens]))
+            continue
+
+        if current_tokens + len(ids) > max_chunk_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence.strip())
+        current_tokens += len(ids)
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def summarize_batch(
+    texts: List[str],
+    model: Any,
+    tokenizer: Any,
+    max_input_tokens: int,
+    generation_params: Dict[str, Any]
+) -> Tuple[List[str], int, int]:
+    """
+    Resume um lote de textos com uma única chamada a model.generate (entradas com padding).
+    Retorna os resumos, o total de tokens de entrada e o total de tokens gerados.
+    """
+    from .model import inference_mode
+    inputs = tokenizer(
+        texts,
+        return_tensors='pt',
+        padding=True,
+        truncation=True,
+        max_length=max_input_tokens + tokenizer.num_special_tokens_to_add()
+    )
+    with profile_stage("summary/generate") as counts, inference_mode():
+        summary_ids = model.generate(**inputs, **generation_params)
+
+        input_tokens = int(inputs["attention_mask"].sum())
+        generated_tokens = int((summary_ids != tokenizer.pad_token_id).sum())
+        counts["input_tokens"] = input_tokens
+        counts["generated_tokens"] = generated_tokens
+    return decode_summaries(tokenizer, summary_ids), input_tokens, generated_tokens
+
+def summarize_long_text(
+    full_text: str,
+    model: Any,
+    tokenizer: Any,
+    batch_size: int = 4,
+    max_chunk_tokens: Optional[int] = None,
+    generation_params: Dict[str, Any] = GENERATION_PARAMS
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Resumo map-reduce: divide o texto em chunks, resume os chunks em lotes e resume
+    recursivamente os resumos combinados até que caibam no contexto do modelo.
+    """
+    budget = context_token_budget(tokenizer, max_chunk_tokens, model)
+
+    # Nos níveis intermediários, cada resumo ocupa no máximo metade do chunk, garantindo a convergência
+    map_params = dict(generation_params)
+    map_params["max_length"] = max(2, min(generation_params["max_length"], budget // 2))
+    map_params["min_length"] = min(generation_params["min_length"], map_params["max_length"] // 2)
+
+    stats = {"chunks": 0, "levels": 0, "batches": 0, "input_tokens": 0, "generated_tokens": 0}
+    start = time.perf_counter()
+
+    def run(texts: List[str], params: Dict[str, Any]) -> List[str]:
+        summaries: List[str] = []
+        for i in range(0, len(texts), batch_size):
+            batch, input_tokens, generated_tokens = summarize_batch(
+                texts[i:i + batch_size], model, tokenizer, budget, params
+            )
+            summaries.extend(batch)
+            stats["batches"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["generated_tokens"] += generated_tokens
+        return summaries
+
+    chunks = split_into_chunks(full_text, tokenizer, budget)
+    stats["chunks"] = len(chunks)
+
+    summary = ""
+    while chunks:
+        stats["levels"] += 1
+        # Último nível: tudo cabe em um chunk, então gera o resumo final com os parâmetros completos
+        if len(chunks) == 1 or stats["levels"] >= MAX_REDUCE_LEVELS:
+            summary = run([" ".join(chunks)], generation_params)[0]
+            break
+
+        combined = " ".join(run(chunks, map_params))
+        chunks = split_into_chunks(combined, tokenizer, budget)
+
+    elapsed = time.perf_counter() - start
+    total_tokens = stats["input_tokens"] + stats["generated_tokens"]
+    stats["elapsed"] = elapsed
+    stats["tokens_per_second"] = total_tokens / elapsed if elapsed > 0 else 0.0
+    return summary, stats
@@ -1,13 +1,19 @@
 import sys
 import pathlib
+import time
 from typing import Dict, Any
 
 # Importa os módulos principais
-from cli.arguments import parse_arguments
-from pdf.extractor import extract_pdf_analysis
-from pdf.images import extract_pdf_images
-from llm.summarize import generate_llm_summary
-from utils.report import create_markdown_report
+from cli.arguments import (
+    parse_arguments, parse_batch_arguments, parse_serve_arguments, parse_corpus_arguments,
+    parse_query_arguments, parse_index_arguments, inference_from_args
+)
+from pipeline.stages import run_stage
+from llm.config import summary_config
+from utils.cache import (
+    open_cache, cached_call, analysis_cache_key, images_cache_key, summary_cache_key, images_files_exist
+)
+from utils.profiling import Profiler, profile_stage
 
 def format_analysis_output(analysis_results: Dict[str, Any]):
     """
@@ -39,34 +45,150 @@ def format_analysis_output(analysis_results: Dict[str, Any]):
     pass
 
 def main():
+    # Subcomando 'batch': processa vários PDFs com um único modelo residente
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from pipeline.batch import run_batch
+        sys.exit(run_batch(parse_batch_arguments(sys.argv[2:])))
+
+    # Subcomando 'corpus': combina esboços de estatísticas de corpus (shards de outras máquinas)
+    if len(sys.argv) > 1 and sys.argv[1] == 'corpus':
+        from pipeline.corpus import run_corpus
+        sys.exit(run_corpus(parse_corpus_arguments(sys.argv[2:])))
+
+    # Subcomandos 'query' e 'index': busca e manutenção do índice invertido (sem abrir PDFs)
+    if len(sys.argv) > 1 and sys.argv[1] == 'query':
+        from pipeline.search import run_query
+        sys.exit(run_query(parse_query_arguments(sys.argv[2:])))
+    if len(sys.argv) > 1 and sys.argv[1] == 'index':
+        from pipeline.search import run_index
+        sys.exit(run_index(parse_index_arguments(sys.argv[2:])))
+
+    # Subcomando 'serve': servidor de resumo com o modelo residente
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from llm.server import run_server
+        serve_args = parse_serve_arguments(sys.argv[2:])
+        sys.exit(run_server(
+            serve_args.host, serve_args.port,
+            max_batch=serve_args.max_batch,
+            max_wait_ms=serve_args.max_wait_ms,
+            inference=inference_from_args(serve_args)
+        ))
+
     # 1. Obter e Validar Argumentos
     args = parse_arguments()
-    
+
+    # Sem --profile/--trace-file, as etapas não são medidas (profile_stage vira um contexto vazio)
+    if not (args.profile or args.trace_file):
+        process_file(args)
+        return
+
+    profiler = Profiler()
+    with profiler.activate():
+        process_file(args)
+
+    print("\n================ PERFIL POR ETAPA =================")
+    print(profiler.format_table())
+    if args.trace_file:
+        profiler.export_chrome_trace(args.trace_file)
+        print(f"[PERFIL]: Trace salvo em: {args.trace_file} (abra em ui.perfetto.dev ou chrome://tracing)")
+
+def process_file(args):
+    """
+    Processa um único PDF: análise, imagens e, com --summarize, resumo e relatório.
+    O arquivo (ou a entrada padrão, com "-f -") é lido uma única vez e compartilhado pelas etapas.
+    """
     # Conversão de strings de argumento para objetos Path
     pdf_path = pathlib.Path(args.file)
-    output_path = pathlib.Path(args.output)
-    
+
     # Exemplo de verificação simples de existência
-    if not pdf_path.exists():
+    if args.file != '-' and not pdf_path.exists():
         print(f"Erro: O arquivo PDF não foi encontrado no caminho: {pdf_path}")
         sys.exit(1)
-        
+
+    # Import tardio: o PyMuPDF só é carregado quando há um documento a processar
+    from pdf.session import DocumentSession
+    with profile_stage("read"):
+        session = DocumentSession.open(args.file, args.input_name)
+    with session:
+        process_session(session, args)
+
+def index_document(analysis_results: Dict[str, Any], pdf_path: str, pdf_digest, args):
+    """
+    Grava as frequências de termos por página do documento no índice invertido (--index).
+    """
+    from pipeline.search import absorb_page_terms, open_index_writer
+    try:
+        with open_index_writer(args) as index:
+            absorb_page_terms({"file": pdf_path, "pdf_digest": pdf_digest, "analysis": analysis_results}, index)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"[ERRO ÍNDICE]: {e}")
+        return
+    print(f"[ÍNDICE]: Documento indexado em: {index.index_dir}")
+
+def process_session(session, args):
+    """
+    Executa as etapas sobre a sessão do documento (um único buffer e um único documento fitz).
+    """
+    start = time.perf_counter()
+    pdf_path = session.path
+    output_path = pathlib.Path(args.output)
+
     print(f"\n--- Iniciando Processamento do Arquivo: {pdf_path.name} ---\n")
-    
+
+    # Cache de resultados endereçado pelo conteúdo do PDF (desativado com --no-cache)
+    cache = open_cache(args.cache_dir, args.cache_max_mb, enabled=not args.no_cache)
+    # O índice usa o hash para reconhecer arquivos já indexados com o mesmo conteúdo
+    with profile_stage("digest"):
+        pdf_digest = session.digest if cache or args.index else None
+
+    # Cache por página: numa revisão do PDF, só as páginas alteradas são reprocessadas
+    from pdf.incremental import open_page_cache
+    page_cache = open_page_cache(cache, enabled=not args.no_page_cache)
+
     # 2. Executar Análise do PDF
-    analysis_results = extract_pdf_analysis(pdf_path)
+    with profile_stage("analysis") as counts:
+        analysis_results = cached_call(
+            cache, pdf_digest and analysis_cache_key(pdf_digest, args.summarize, page_terms=args.index),
+            lambda: run_stage(
+                "analysis", session, workers=args.workers, keep_full_text=args.summarize, page_cache=page_cache,
+                page_terms=args.index
+            ),
+            should_store=lambda r: "error" not in r
+        )
+        counts["pages"] = analysis_results.get("total_pages", 0)
+        counts["tokens"] = analysis_results.get("total_words", 0)
     
     # 3. Exibir Resultados da Análise
     format_analysis_output(analysis_results)
+    if args.index and "error" not in analysis_results:
+        index_document(analysis_results, str(pdf_path), pdf_digest, args)
     
     # 4. Executar Extração de Imagens
-    images_results = extract_pdf_images(pdf_path, output_path)
+    with profile_stage("images") as counts:
+        images_results = cached_call(
+            cache, pdf_digest and images_cache_key(pdf_digest, output_path, args.min_image_size),
+            lambda: run_stage(
+                "images", session, output_path, args.min_image_size, args.image_threads, page_cache=page_cache
+            ),
+            is_valid=images_files_exist,
+            should_store=lambda r: "error" not in r
+        )
+        counts["images"] = images_results.get("images_extracted", 0)
     
     if "error" in images_results:
          print(f"[AVISO/ERRO IMAGENS]: {images_results['error']}")
     else:
          print(f"[IMAGENS]: {images_results['images_extracted']} imagens extraídas para: {images_results['output_directory']}")
 
+    # Sem contagens, o documento inteiro veio do cache de resultados
+    if page_cache is not None and page_cache.stats:
+        print(f"[CACHE DE PÁGINAS]: {page_cache.format_stats()}")
+
+    # Resultado no mesmo formato do modo em lote, para os sinks de saída (--json, --jsonl)
+    result = {"file": str(pdf_path), "pdf_digest": pdf_digest, "analysis": analysis_results, "images": images_results}
+    if page_cache is not None and page_cache.stats:
+        result["page_cache"] = page_cache.stats
+
     # 5. Executar LLM Condicionalmente
     if args.summarize:
         summary = ""
@@ -78,25 +200,50 @@ def main():
         if analysis_results.get("error"):
             print("[AVISO LLM]: Análise falhou, resumo LLM não será gerado.")
         elif full_text:
-            summary = generate_llm_summary(full_text)
+            inference = inference_from_args(args)
+            config = summary_config(args.long_document, args.batch_size, args.max_chunk_tokens, inference)
+            with profile_stage("summary"):
+                summary = cached_call(
+                    cache, pdf_digest and summary_cache_key(pdf_digest, config),
+                    lambda: {"summary": run_stage(
+                        "summary",
+                        full_text,
+                        long_document=args.long_document,
+                        batch_size=args.batch_size,
+                        max_chunk_tokens=args.max_chunk_tokens,
+                        server_url=args.llm_server,
+                        inference=inference
+                    )},
+                    should_store=lambda r: not r["summary"].startswith("Erro:")
+                )["summary"]
             
             print("\n================== RESUMO (LLM) ===================")
             print(summary)
             print("===================================================\n")
         else:
             print("[AVISO LLM]: O PDF não contém texto para sumarização.")
-        print("\n[RELATÓRIO]: Gerando relatório final em Markdown...")
-        report_results = create_markdown_report(
-            analysis_results, 
-            summary, 
-            output_path, 
-            pdf_path
-        )
-        
-        if report_results['status'] == 'success':
-            print(f"[RELATÓRIO]: Salvo com sucesso em: {report_results['file_path']}")
-        else:
-            print(f"[ERRO RELATÓRIO]: {report_results['message']}")
+        result["summary"] = summary
+
+    result["elapsed"] = time.perf_counter() - start
+    with profile_stage("outputs"):
+        write_outputs(result, args, output_path)
+
+def write_outputs(result: Dict[str, Any], args, output_path: pathlib.Path):
+    """
+    Grava o documento nos sinks de saída pedidos: o relatório Markdown (--summarize), --json e --jsonl.
+    """
+    if not (args.summarize or args.json or args.jsonl):
+        return
+    from utils.sinks import open_sinks
+    try:
+        with open_sinks(args, output_path) as sinks:
+            error = sinks.write(result)
+    except OSError as e:
+        error = str(e)
+    if error:
+        print(f"[ERRO SAÍDA]: {error}")
+    elif sinks.destinations(result):
+        print(f"[SAÍDA]: Documento salvo em: {', '.join(sinks.destinations(result))}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
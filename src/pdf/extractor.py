@@ -1,92 +1,255 @@
-from typing import Dict, Any, List, Tuple
-import pathlib
+from typing import Dict, Any, List, Iterator, Iterable, NamedTuple, Optional
 import fitz
 
 # Importa as funções auxiliares
-from utils.text import clean_and_tokenize, count_word_frequencies, calculate_vocabulary_size, get_top_n_words
-from utils.files import get_file_size_bytes 
+from utils.text import TextStatistics
+from pdf.session import PdfSource, session_scope
+from pdf.spans import Span, SpanTable, base_font_size, font_histogram, select_headings
+from utils.profiling import profile_stage
+from utils.budget import BudgetExceeded, budget_page, budget_text, format_budget_reason
 
-def extract_pdf_analysis(file_path: pathlib.Path) -> Dict[str,Any]:
+class PageRecord(NamedTuple):
+    """
+    Registro compacto de uma página, produzido por uma única análise do conteúdo.
+    """
+    page_number: int
+    text: str
+    spans: List[Span]
+
+def parse_page(page: fitz.Page) -> PageRecord:
+    """
+    Analisa a página uma única vez (um único TextPage) e extrai dele o texto
+    simples e os spans com tamanho de fonte, flags e bbox.
+    """
+    with budget_page("analysis", page.number), profile_stage("analysis/parse") as counts:
+        # O TextPage é o resultado da análise do conteúdo; os dois formatos são lidos dele.
+        # Mesmas flags do get_text() padrão (tabulações, espaços e ligaduras como antes); o "dict"
+        # padrão só acrescenta os blocos de imagem, que não são usados aqui
+        textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+        text = page.get_text(textpage=textpage)
+        text_dict = page.get_text("dict", textpage=textpage)
+
+        spans: List[Span] = []
+        for block in text_dict.get("blocks", []):
+            if block["type"] == 0:
+                for line in block.get("lines", []):
+                    for span in line.get("spans", []):
+                        # Arredonda o tamanho para evitar flutuantes minúsculos
+                        spans.append((round(span["size"], 1), span["flags"], tuple(span["bbox"]), span["text"]))
+
+        counts["pages"] = 1
+        counts["spans"] = len(spans)
+
+    return PageRecord(page.number, text, spans)
+
+def iter_page_records(doc: fitz.Document) -> Iterator[PageRecord]:
+    """
+    Gera os registros das páginas em ordem, carregando cada página uma única vez.
+    """
+    for page_num in range(doc.page_count):
+        page = doc.load_page(page_num)
+        yield parse_page(page)
+
+def is_title_candidate(text: str) -> bool:
+    """
+    Filtros de limpeza de títulos (min length, max words). Espera o texto já sem espaços nas bordas.
+    """
+    return len(text) > 5 and len(text.split()) < 15
+
+def add_record_spans(table: SpanTable, record: PageRecord) -> None:
+    """
+    Acrescenta os spans da página à tabela colunar. Só os candidatos a título guardam texto:
+    o limiar de tamanho depende da fonte base do documento inteiro, aqui só os filtros de texto.
+    """
+    for size, flags, bbox, span_text in record.spans:
+        text = span_text.strip()
+        table.append(record.page_number, size, flags, bbox, text if is_title_candidate(text) else "")
+
+def build_span_table(records: Iterable[PageRecord]) -> SpanTable:
+    table = SpanTable()
+    for record in records:
+        add_record_spans(table, record)
+    return table
+
+def count_font_sizes(records: Iterable[PageRecord]) -> Dict[float, int]:
+    """
+    Histograma de tamanhos de fonte, na ordem da primeira aparição no documento.
+    """
+    return font_histogram(build_span_table(records))
+
+def detect_base_font_size(records: Iterable[PageRecord]) -> float:
+    """
+    Detecta a fonte base a partir dos spans coletados.
+    """
+    return base_font_size(build_span_table(records))
+
+def detect_titles(records: Iterable[PageRecord], base_font_size: float) -> List[str]:
+    """
+    Detecta títulos nos registros, em ordem de página.
+    """
+    return [heading["text"] for heading in select_headings(build_span_table(records), base_font_size)]
+
+class AnalysisPartial:
+    """
+    Resultado parcial da análise de um intervalo contínuo de páginas, alimentado página a página.
+    Guarda apenas o que a etapa final precisa: a tabela colunar de spans (fontes e candidatos
+    a título, ver pdf/spans.py), estatísticas de texto e, se solicitado, os textos das páginas (para o resumo LLM)
+    e as frequências de termos de cada página (para o índice invertido, ver utils/inverted_index.py e pipeline/search.py).
+    Parciais de intervalos consecutivos podem ser combinados com merge, em ordem de página.
+    """
+
+    def __init__(self, keep_text: bool = True, keep_page_terms: bool = False):
+        self.page_count = 0
+        self.spans = SpanTable() # Em ordem de página (a ordem decide os desempates)
+        self.text_stats = TextStatistics()
+        self.has_text = False
+        self.page_texts: Optional[List[str]] = [] if keep_text else None
+        self.page_terms: Optional[List[Dict[str, int]]] = [] if keep_page_terms else None
+        # Motivo da parada antecipada por orçamento (ver utils/budget.py); None = todas as páginas
+        self.budget_exceeded: Optional[Dict[str, Any]] = None
+
+    def add_page(self, record: PageRecord, stats: Optional[TextStatistics] = None) -> None:
+        """
+        Adiciona a próxima página. stats são as estatísticas de texto da página já calculadas
+        (ex.: vindas do cache de páginas); sem elas, o texto é tokenizado aqui.
+        """
+        budget_text("analysis", record.page_number, record.text)
+        self.page_count += 1
+        add_record_spans(self.spans, record)
+
+        # Para o índice, a página é tokenizada à parte (mesma normalização) e somada ao acumulado
+        if stats is None and self.page_terms is not None:
+            with profile_stage("analysis/tokenize") as counts:
+                stats = TextStatistics()
+                stats.update(record.text)
+                counts["tokens"] = stats.total_words
+
+        # As páginas são unidas por espaço, então as estatísticas por página somam as do texto todo
+        if stats is not None:
+            self.text_stats.merge(stats)
+        else:
+            with profile_stage("analysis/tokenize") as counts:
+                words_before = self.text_stats.total_words
+                self.text_stats.update(record.text)
+                counts["tokens"] = self.text_stats.total_words - words_before
+        self.has_text = self.has_text or bool(record.text.strip())
+        if self.page_texts is not None:
+            self.page_texts.append(record.text)
+        if self.page_terms is not None:
+            self.page_terms.append(dict(stats.word_frequencies))
+
+    def merge(self, other: "AnalysisPartial") -> None:
+        """
+        Combina o parcial das páginas seguintes a este. Um parcial interrompido por orçamento não
+        recebe mais páginas (as seguintes não seriam contíguas); o primeiro motivo é mantido.
+        """
+        if self.budget_exceeded is not None:
+            return
+        self.budget_exceeded = other.budget_exceeded
+        self.page_count += other.page_count
+        self.spans.extend(other.spans)
+        self.text_stats.merge(other.text_stats)
+        self.has_text = self.has_text or other.has_text
+        if self.page_texts is not None and other.page_texts is not None:
+            self.page_texts.extend(other.page_texts)
+        if self.page_terms is not None and other.page_terms is not None:
+            self.page_terms.extend(other.page_terms)
+
+def build_partial(records: Iterable[PageRecord], keep_text: bool = True, keep_page_terms: bool = False) -> AnalysisPartial:
+    """
+    Consome os registros de página (sem guardá-los) num parcial de análise.
+    """
+    partial = AnalysisPartial(keep_text, keep_page_terms)
+    try:
+        for record in records:
+            partial.add_page(record)
+    except BudgetExceeded as e:
+        # Orçamento excedido: o parcial fica com as páginas anteriores
+        partial.budget_exceeded = e.reason
+    return partial
+
+def extract_pdf_analysis(
+    file_path: PdfSource,
+    workers: int = 1,
+    keep_full_text: bool = True,
+    page_cache: Optional["PageCache"] = None,
+    corpus_sketch: bool = False,
+    page_terms: bool = False
+) -> Dict[str,Any]:
+    """
+    Analisa o PDF: métricas, texto completo e títulos detectados.
+    Cada página é analisada uma única vez e descartada após alimentar o parcial de análise;
+    a heurística de títulos roda sobre a tabela colunar de spans coletada (ver pdf/spans.py).
+    Com workers > 1, as páginas são divididas em shards processados em paralelo (ver pdf/parallel.py).
+    Com keep_full_text=False, o texto completo não é montado nem retornado (só é necessário para o resumo).
+    file_path pode ser um caminho, bytes ou uma DocumentSession já aberta (compartilhada com as outras etapas).
+    Com page_cache (ver pdf/incremental.py), só as páginas novas ou alteradas são analisadas.
+    Com corpus_sketch=True, o esboço serializável do documento para as estatísticas de corpus
+    (ver utils/sketches.py) volta em "corpus_sketch".
+    Sob um orçamento ativo (utils/budget.py), a análise para na página que excede um limite e
+    retorna o resultado das páginas anteriores, com "budget_exceeded" e "pages_analyzed".
+    Com page_terms=True, "page_terms" traz as frequências de termos de cada página (mesmo critério
+    das palavras mais comuns), usadas para alimentar o índice invertido (ver utils/inverted_index.py e pipeline/search.py).
+    """
     results: Dict[str, Any] = {}
-    full_text = ""
-    detected_titles = [] 
-    
-    #Variável para contar a frequência de cada tamanho de fonte
-    font_size_counts: Dict[float, int] = {} 
-    base_font_size = 0.0
-    
-    # 1. Obter Tamanho do Arquivo (continua o mesmo)
-    file_size_bytes = get_file_size_bytes(file_path)
-    results["file_size_bytes"] = file_size_bytes
-
-    # 2. Abrir o PDF e Processar
+
     try:
-        doc = fitz.open(file_path)
-        results["total_pages"] = doc.page_count
-        
-        # --- FASE 1: Encontrar o Tamanho de Fonte Mais Comum (Tamanho Base) ---
-        for page_num in range(results["total_pages"]):
-            page = doc.load_page(page_num)
-            text_dict = page.get_text("dict") 
-            
-            for block in text_dict.get("blocks", []):
-                if block["type"] == 0: 
-                    for line in block.get("lines", []):
-                        for span in line.get("spans", []):
-                            size = round(span["size"], 1) # Arredonda o tamanho para evitar flutuantes minúsculos
-                            font_size_counts[size] = font_size_counts.get(size, 0) + 1
-
-        # Encontra o tamanho de fonte mais frequente, que é a fonte do corpo do texto.
-        if font_size_counts:
-            base_font_size = max(font_size_counts, key=font_size_counts.get)
-            print(f"[DEBUG HEURÍSTICA]: Fonte base (mais comum) detectada: {base_font_size:.1f} pts") # Log para debug
-        
-        # --- FASE 2: Extração de Texto e Detecção de Títulos ---
-        for page_num in range(results["total_pages"]):
-            page = doc.load_page(page_num)
-            full_text += page.get_text() + " "
-            
-            text_dict = page.get_text("dict") # Recarrega para extração detalhada
-            
-            for block in text_dict.get("blocks", []):
-                if block["type"] == 0:
-                    for line in block.get("lines", []):
-                        for span in line.get("spans", []):
-                            current_size = round(span["size"], 1)
-                            
-                            # Regra robusta: a fonte é um título se for claramente maior que a fonte base
-                            # (Maior que a base E não é a base)
-                            if current_size > base_font_size + 0.1: # +0.1 para evitar erros de arredondamento
-                                text = span["text"].strip()
-                                
-                                # Filtros de limpeza (min length, max words)
-                                if len(text) > 5 and len(text.split()) < 15: 
-                                    if text not in detected_titles:
-                                        detected_titles.append(text)
-        
-        doc.close()
+        with session_scope(file_path) as session:
+            # 1. Obter Tamanho do Arquivo (do buffer já lido)
+            results["file_size_bytes"] = session.size_bytes
+
+            # 2. Alimentar o parcial de análise (ou combinar os shards)
+            doc = session.document
+            results["total_pages"] = doc.page_count
+            if page_cache is not None:
+                from pdf.incremental import build_partial_incremental
+                partial = build_partial_incremental(session, page_cache, keep_full_text, workers, page_terms)
+            elif workers > 1 and doc.page_count > 1:
+                from pdf.parallel import extract_partial_parallel
+                partial = extract_partial_parallel(
+                    session.worker_source(), doc.page_count, workers, keep_full_text, page_terms
+                )
+            else:
+                partial = build_partial(iter_page_records(doc), keep_full_text, page_terms)
 
     except FileNotFoundError:
+        print(f"ERRO: Arquivo não encontrado no caminho: {file_path}")
         return {"error": "FileNotFound"}
     except Exception as e:
         return {"error": str(e)}
-    
 
-    # 3. Processamento de Texto e Análise (usa o full_text extraído no loop)
-    # Garante que full_text não esteja vazio
-    if not full_text.strip():
+    # 3. Heurística de títulos sobre a tabela de spans (vetorizada, sem reabrir o documento)
+    base_size = base_font_size(partial.spans)
+    if len(partial.spans):
+        print(f"[DEBUG HEURÍSTICA]: Fonte base (mais comum) detectada: {base_size:.1f} pts") # Log para debug
+    headings = select_headings(partial.spans, base_size)
+
+    # 4. Processamento de Texto e Análise (estatísticas acumuladas página a página)
+    if partial.budget_exceeded is not None and not partial.has_text:
+        return {"error": f"Orçamento excedido: {format_budget_reason(partial.budget_exceeded)}",
+                "budget_exceeded": partial.budget_exceeded}
+    # Garante que o texto não esteja vazio
+    if not partial.has_text:
         return {"error": "O PDF está vazio ou não contém texto legível."}
 
-    tokens: List[str] = clean_and_tokenize(full_text)
+    text_stats = partial.text_stats
+    results["total_words"] = text_stats.total_words
+    results["vocabulary_size"] = text_stats.vocabulary_size
+    results["top_10_words"] = text_stats.top_n_words(n=10)
 
-    results["total_words"] = len(tokens)
-    word_frequencies: Dict[str, int] = count_word_frequencies(tokens)
-    results["vocabulary_size"] = calculate_vocabulary_size(tokens)
-    results["top_10_words"] = get_top_n_words(word_frequencies, n=10)
-    
     # Adiciona os resultados finais (Obrigatório e Opcional)
-    results["full_text"] = full_text
-    results["detected_titles"] = detected_titles # títulos
+    if keep_full_text:
+        results["full_text"] = "".join(text + " " for text in partial.page_texts)
+    results["detected_titles"] = [heading["text"] for heading in headings] # títulos
+    results["title_outline"] = headings # títulos com nível (1-3) e página, na mesma ordem
+    if corpus_sketch:
+        from utils.sketches import CorpusSketch
+        results["corpus_sketch"] = CorpusSketch.from_text_statistics(text_stats).to_dict()
+    if page_terms:
+        results["page_terms"] = partial.page_terms
+    if partial.budget_exceeded is not None:
+        results["budget_exceeded"] = partial.budget_exceeded
+        results["pages_analyzed"] = partial.page_count
 
-    # 4. Retornar os Resultados
-    return results
\ No newline at end of file
+    # 5. Retornar os Resultados
+    return results
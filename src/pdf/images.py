@@ -1,62 +1,188 @@
 import pathlib
-import fitz
-import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 from typing import Dict, Any, List, Optional
 
-def extract_pdf_images(file_path: pathlib.Path, output_dir_base: pathlib.Path) -> Dict[str, Any]:
+from utils.profiling import profile_stage
+from utils.budget import BudgetExceeded, budget_image, budget_page
+from pdf.session import PdfSource, session_scope
+
+# Gravações pendentes por thread de escrita (limita a memória de imagens decodificadas em espera)
+PENDING_WRITES_PER_THREAD = 2
+
+def _write_image(output_path: pathlib.Path, img_data: bytes) -> None:
+    with profile_stage("images/write") as counts:
+        with open(output_path, "wb") as img_file:
+            img_file.write(img_data)
+        counts["images"] = 1
+        counts["bytes"] = len(img_data)
+
+def _file_matches(path: pathlib.Path, file_digest: Optional[str]) -> bool:
+    # Um arquivo de uma execução anterior só é reaproveitado se o conteúdo for o mesmo
+    if not file_digest:
+        return False
+    try:
+        return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest() == file_digest
+    except OSError:
+        return False
+
+def _scan_page(session, page) -> List[Dict[str, Any]]:
+    # Imagens referenciadas pela página; hash, extensão e hash do arquivo são preenchidos sob demanda
+    with profile_stage("images/xref_scan") as counts:
+        page_images = page.get_images(full=True)
+        counts["pages"] = 1
+        counts["xrefs"] = len(page_images)
+    return [{"xref": img[0], "width": img[2], "height": img[3]} for img in page_images]
+
+def extract_pdf_images(
+    file_path: PdfSource,
+    output_dir_base: pathlib.Path,
+    min_size: int = 0,
+    write_threads: int = 4,
+    page_cache: Optional["PageCache"] = None
+) -> Dict[str, Any]:
     """
-    Identifica e extrai todas as imagens contidas no PDF.
+    Identifica e extrai as imagens referenciadas pelas páginas do PDF.
     Cria um subdiretório baseado no nome do arquivo PDF para armazenar as imagens.
+
+    Imagens repetidas são detectadas pelo hash do conteúdo (stream) e gravadas uma única vez;
+    imagens com largura ou altura menor que min_size pixels são ignoradas. A gravação dos
+    arquivos roda num pool de threads limitado, em paralelo à decodificação.
+    Retorna também o manifesto página -> imagem -> arquivo.
+    file_path pode ser um caminho, bytes ou uma DocumentSession já aberta (compartilhada com as outras etapas).
+    Com page_cache (ver pdf/incremental.py), as imagens de páginas inalteradas cujos arquivos já
+    existem (com o mesmo conteúdo) não são decodificadas nem gravadas de novo.
+    Sob um orçamento ativo (utils/budget.py), a extração para na página que excede um limite e
+    retorna as imagens já extraídas, com "budget_exceeded".
     """
-    image_count = 0
-    # 1. Definir o Diretório de Saída (imagens/<nome-arquivo-pdf>/)
-    pdf_name_stem = file_path.stem # Nome do arquivo sem extensão
-    output_dir = output_dir_base / pdf_name_stem
-    
-    # 2. Iterar sobre os objetos internos do PDF (XREF) para encontrar imagens
+    from pdf.incremental import image_digest, page_fingerprint
+
+    image_files: List[str] = []
+    manifest: List[Dict[str, Any]] = []
+    files_by_digest: Dict[str, str] = {} # hash do conteúdo -> arquivo gravado
+    failed_xrefs = set() # xrefs que não puderam ser decodificados
+    budget_exceeded = None # motivo da parada antecipada por orçamento (ver utils/budget.py)
+
+    max_pending = max(1, write_threads) * PENDING_WRITES_PER_THREAD
+    pending = threading.BoundedSemaphore(max_pending)
+    futures: List[Future] = []
+
     try:
-        with fitz.open(file_path) as doc:
-            lenXREF = doc.xref_length()
-            processed_images = set()
-
-            # 2. Iterar sobre os objetos internos do PDF (XREF) para encontrar imagens
-            for xref in range(1, lenXREF):
-                
-                imgdict = None # Inicializa o dicionário de imagem
-                
-                # Bloco TRY/EXCEPT para isolar a extração de imagem problemática
-                try:
-                    imgdict = doc.extract_image(xref) 
-                except Exception as e:
-                    # Captura erros como "not an image" ou "corrupted stream"
-                    continue # Pula para o próximo XREF
-
-                if imgdict and 'image' in imgdict: # Se for um objeto de imagem válido
-                    
-                    image_id = (imgdict.get('width'), imgdict.get('height'), imgdict.get('colorspace'))
-                    
-                    if image_id in processed_images:
-                        continue
-                    
-                    processed_images.add(image_id)
-                    
-                    img_data = imgdict["image"]
-                    # Use .get('ext', 'png') para lidar com 'ext' faltante/vazio de forma mais limpa
-                    img_ext = imgdict.get('ext', 'png')
-                    
-                    # 3. Salvar a imagem com um nome único
-                    image_filename = f"{pdf_name_stem}_img_{xref}.{img_ext}"
-                    output_path = output_dir / image_filename
-                    
-                    with open(output_path, "wb") as img_file:
-                        img_file.write(img_data)
-                        
-                    image_count += 1
-            
+        with session_scope(file_path) as session, ThreadPoolExecutor(max_workers=max(1, write_threads)) as executor:
+            # 1. Definir o Diretório de Saída (imagens/<nome-arquivo-pdf>/)
+            pdf_name_stem = session.stem # Nome do arquivo sem extensão
+            output_dir = output_dir_base / pdf_name_stem
+            doc = session.document
+
+            # 2. Percorrer as páginas e apenas os XREFs de imagem que elas referenciam
+            try:
+                for page_num in range(doc.page_count):
+                    with budget_page("images", page_num):
+                        fingerprint = entries = None
+                        if page_cache is not None:
+                            fingerprint = page_fingerprint(session, page_num)
+                            entries = page_cache.get(fingerprint, "images")
+                            page_cache.count("images", reused=entries is not None)
+                        page_reused = entries is not None
+                        page_changed = not page_reused
+                        if entries is None:
+                            entries = _scan_page(session, doc.load_page(page_num))
+
+                        for entry in entries:
+                            xref, width, height = entry["xref"], entry["width"], entry["height"]
+
+                            # Filtro de tamanho mínimo usando as dimensões declaradas (sem decodificar)
+                            if width < min_size or height < min_size:
+                                continue
+
+                            if "digest" not in entry:
+                                with profile_stage("images/hash") as counts:
+                                    entry["digest"] = image_digest(session, xref)
+                                    counts["images"] = 1
+
+                            digest = entry["digest"]
+                            if digest is None or xref in failed_xrefs:
+                                continue
+
+                            if digest not in files_by_digest:
+                                output_path = output_dir / f"{pdf_name_stem}_img_{xref}.{entry.get('ext') or 'png'}"
+
+                                # Página inalterada e arquivo já gravado por uma execução anterior: reaproveita
+                                if page_reused and _file_matches(output_path, entry.get("file_digest")):
+                                    files_by_digest[digest] = str(output_path)
+                                    image_files.append(str(output_path))
+                                else:
+                                    # 3. Decodificar e agendar a gravação com um nome único
+                                    budget_image("images", page_num)
+                                    try:
+                                        with profile_stage("images/decode") as counts:
+                                            imgdict = doc.extract_image(xref)
+                                            counts["images"] = 1
+                                    except Exception:
+                                        # Captura erros como "not an image" ou "corrupted stream"
+                                        imgdict = None
+                                    if not imgdict or 'image' not in imgdict:
+                                        failed_xrefs.add(xref)
+                                        continue
+
+                                    # Use .get('ext', 'png') para lidar com 'ext' faltante/vazio de forma mais limpa
+                                    img_ext = imgdict.get('ext') or 'png'
+                                    output_path = output_dir / f"{pdf_name_stem}_img_{xref}.{img_ext}"
+                                    if not image_files:
+                                        output_dir.mkdir(parents=True, exist_ok=True)
+                                    if page_cache is not None:
+                                        page_changed = True
+                                        entry["ext"] = img_ext
+                                        entry["file_digest"] = hashlib.blake2b(imgdict["image"], digest_size=16).hexdigest()
+
+                                    # Bloqueia quando há gravações demais pendentes (backpressure)
+                                    pending.acquire()
+                                    future = executor.submit(_write_image, output_path, imgdict["image"])
+                                    future.add_done_callback(lambda _: pending.release())
+                                    futures.append(future)
+
+                                    files_by_digest[digest] = str(output_path)
+                                    image_files.append(str(output_path))
+
+                            manifest.append({
+                                "page": page_num + 1,
+                                "xref": xref,
+                                "width": width,
+                                "height": height,
+                                "digest": digest,
+                                "file": files_by_digest[digest],
+                            })
+
+                        if page_cache is not None and page_changed:
+                            # Completa os hashes (já calculados pela impressão digital) antes de guardar a página
+                            for entry in entries:
+                                entry.setdefault("digest", image_digest(session, entry["xref"]))
+                            page_cache.put(fingerprint, "images", entries)
+            except BudgetExceeded as e:
+                # Orçamento excedido: mantém as imagens e o manifesto das páginas anteriores
+                budget_exceeded = e.reason
+
+            # Propaga erros de gravação (ex.: disco cheio)
+            for future in futures:
+                future.result()
+
+            if page_cache is not None:
+                page_cache.flush()
+
     except FileNotFoundError:
         return {"error": "FileNotFound"}
     except Exception as e:
-        # Este é o catch para erros mais amplos (abrir o arquivo, etc.)
+        # Este é o catch para erros mais amplos (abrir o arquivo, gravar imagens, etc.)
         return {"error": f"Erro fatal durante o processamento do PDF: {e}"}
-        
-    return {"status": "success", "images_extracted": image_count, "output_directory": str(output_dir)}
\ No newline at end of file
+
+    results = {
+        "status": "success",
+        "images_extracted": len(image_files),
+        "output_directory": str(output_dir),
+        "image_files": image_files,
+        "manifest": manifest,
+    }
+    if budget_exceeded is not None:
+        results["budget_exceeded"] = budget_exceeded
+    return results
@@ -0,0 +1,194 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import fitz
+
+from pdf.extractor import AnalysisPartial, PageRecord, Span, parse_page
+from pdf.session import DocumentSession
+from utils.cache import ResultCache, make_cache_key, stopwords_fingerprint
+from utils.text import TextStatistics
+from utils.profiling import profile_stage
+from utils.budget import BudgetExceeded
+
+# Versão do formato das entradas por página; mudar invalida apenas o cache de páginas
+PAGE_CACHE_VERSION = 2
+
+def image_digest(session: DocumentSession, xref: int) -> Optional[str]:
+    """
+    Hash (blake2b) do stream bruto da imagem, calculado uma vez por xref no documento.
+    None se o stream estiver corrompido ou ilegível.
+    """
+    if xref not in session.image_digests:
+        try:
+            raw_stream = session.document.xref_stream_raw(xref)
+        except Exception:
+            raw_stream = None
+        session.image_digests[xref] = hashlib.blake2b(raw_stream, digest_size=16).hexdigest() if raw_stream else None
+    return session.image_digests[xref]
+
+def _object_source(doc: fitz.Document, kind: str, value: str) -> str:
+    # Valores indiretos ("12 0 R") são resolvidos para o texto do objeto
+    if kind == "xref":
+        return doc.xref_object(int(value.split()[0]), compressed=True)
+    return value
+
+def page_fingerprint(session: DocumentSession, page_number: int) -> str:
+    """
+    Impressão digital do que determina o resultado da página: o dicionário da página (geometria,
+    rotação, anotações), os streams de conteúdo, o dicionário de recursos, as fontes (com o mapa
+    ToUnicode), os Form XObjects e o conteúdo de cada imagem referenciada.
+    Páginas iguais em revisões diferentes do PDF têm a mesma impressão digital.
+    """
+    if page_number in session.page_fingerprints:
+        return session.page_fingerprints[page_number]
+
+    doc = session.document
+    page = doc.load_page(page_number)
+    digest = hashlib.blake2b(digest_size=16)
+
+    def feed(label: str, data: bytes) -> None:
+        # Rótulo + tamanho evitam ambiguidade entre partes concatenadas
+        digest.update(label.encode() + len(data).to_bytes(8, "little") + data)
+
+    feed("page", doc.xref_object(page.xref, compressed=True).encode())
+    # Todos os streams de conteúdo da página, concatenados numa única chamada
+    feed("contents", page.read_contents())
+    feed("resources", _object_source(doc, *doc.xref_get_key(page.xref, "Resources")).encode())
+
+    for font in page.get_fonts(full=True):
+        font_xref = font[0]
+        if font_xref <= 0:
+            continue
+        feed("font", doc.xref_object(font_xref, compressed=True).encode())
+        kind, value = doc.xref_get_key(font_xref, "ToUnicode")
+        if kind == "xref":
+            feed("tounicode", doc.xref_stream_raw(int(value.split()[0])) or b"")
+
+    for xobject in page.get_xobjects():
+        feed("xobject", doc.xref_stream_raw(xobject[0]) or b"")
+
+    for img in page.get_images(full=True):
+        feed("image", f"{img[0]}:{img[7]}:{image_digest(session, img[0])}".encode())
+
+    fingerprint = digest.hexdigest()
+    session.page_fingerprints[page_number] = fingerprint
+    return fingerprint
+
+class PageCache:
+    """
+    Cache de resultados por página, endereçado pela impressão digital da página.
+    Guarda, para cada página, os spans, o texto e as estatísticas de tokens (análise) e as
+    imagens referenciadas (extração). Usa o mesmo armazenamento do ResultCache.
+    Conta, por etapa, as páginas reaproveitadas e as reprocessadas.
+    """
+
+    def __init__(self, cache: ResultCache):
+        self.cache = cache
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._dirty = False
+
+    def _key(self, fingerprint: str, stage: str) -> str:
+        config: Dict[str, Any] = {"version": PAGE_CACHE_VERSION}
+        if stage == "analysis":
+            config["stopwords"] = stopwords_fingerprint()
+            # Texto e spans lidos com as flags padrão do get_text() (ver pdf/extractor.parse_page)
+            config["text_flags"] = True
+        return make_cache_key(fingerprint, f"page/{stage}", config)
+
+    def count(self, stage: str, reused: bool) -> None:
+        counts = self.stats.setdefault(stage, {"reused": 0, "parsed": 0})
+        counts["reused" if reused else "parsed"] += 1
+
+    def contains(self, fingerprint: str, stage: str) -> bool:
+        return self.cache.contains(self._key(fingerprint, stage))
+
+    def get(self, fingerprint: str, stage: str) -> Optional[Any]:
+        return self.cache.get(self._key(fingerprint, stage))
+
+    def put(self, fingerprint: str, stage: str, value: Any) -> None:
+        # A limpeza LRU roda uma vez por documento (flush), não a cada página
+        self.cache.put(self._key(fingerprint, stage), value, evict=False)
+        self._dirty = True
+
+    def get_analysis(self, fingerprint: str) -> Optional[Tuple[str, List[Span], TextStatistics]]:
+        value = self.get(fingerprint, "analysis")
+        if value is None:
+            return None
+        # No JSON, a tupla (size, flags, bbox, text) volta como lista, e o bbox também
+        spans = [(size, flags, tuple(bbox), text) for size, flags, bbox, text in value["spans"]]
+        return value["text"], spans, TextStatistics.from_dict(value["stats"])
+
+    def put_analysis(self, fingerprint: str, record: PageRecord, stats: TextStatistics) -> None:
+        self.put(fingerprint, "analysis", {"text": record.text, "spans": record.spans, "stats": stats.to_dict()})
+
+    def flush(self) -> None:
+        if self._dirty:
+            self.cache.evict()
+            self._dirty = False
+
+    def format_stats(self) -> str:
+        """
+        Ex.: "análise: 195 páginas reaproveitadas, 5 reprocessadas | imagens: ..."
+        """
+        labels = {"analysis": "análise", "images": "imagens"}
+        return " | ".join(
+            f"{labels.get(stage, stage)}: {counts['reused']} páginas reaproveitadas, {counts['parsed']} reprocessadas"
+            for stage, counts in self.stats.items()
+        )
+
+def open_page_cache(cache: Optional[ResultCache], enabled: bool = True) -> Optional[PageCache]:
+    """
+    Cache de páginas sobre o cache de resultados; None se algum dos dois estiver desativado.
+    """
+    if cache is None or not enabled:
+        return None
+    return PageCache(cache)
+
+def build_partial_incremental(
+    session: DocumentSession,
+    page_cache: PageCache,
+    keep_text: bool = True,
+    workers: int = 1,
+    keep_page_terms: bool = False
+) -> AnalysisPartial:
+    """
+    Parcial de análise do documento, reaproveitando as páginas em cache e analisando só as
+    páginas novas ou alteradas (em paralelo, com workers > 1). Os parciais entram em ordem de
+    página, então fonte base, títulos, top palavras e vocabulário são idênticos aos da análise completa.
+    """
+    doc = session.document
+    with profile_stage("analysis/fingerprint") as counts:
+        fingerprints = [page_fingerprint(session, page_num) for page_num in range(doc.page_count)]
+        counts["pages"] = len(fingerprints)
+
+    # Páginas ausentes do cache: com vários workers, são analisadas antes, em paralelo
+    parsed: Dict[int, PageRecord] = {}
+    missing = [page_num for page_num, fp in enumerate(fingerprints) if not page_cache.contains(fp, "analysis")]
+    if workers > 1 and len(missing) > 1:
+        from pdf.parallel import parse_pages_parallel
+        parsed = {record.page_number: record for record in parse_pages_parallel(session.worker_source(), missing, workers)}
+
+    partial = AnalysisPartial(keep_text, keep_page_terms)
+    try:
+        for page_num, fingerprint in enumerate(fingerprints):
+            cached = None if page_num in parsed else page_cache.get_analysis(fingerprint)
+            if cached is not None:
+                text, spans, stats = cached
+                partial.add_page(PageRecord(page_num, text, spans), stats)
+                page_cache.count("analysis", reused=True)
+                continue
+
+            record = parsed.pop(page_num, None) or parse_page(doc.load_page(page_num))
+            with profile_stage("analysis/tokenize") as counts:
+                stats = TextStatistics()
+                stats.update(record.text)
+                counts["tokens"] = stats.total_words
+            page_cache.put_analysis(fingerprint, record, stats)
+            partial.add_page(record, stats)
+            page_cache.count("analysis", reused=False)
+    except BudgetExceeded as e:
+        # Orçamento excedido: as páginas já analisadas ficam no cache e no parcial
+        partial.budget_exceeded = e.reason
+
+    page_cache.flush()
+    return partial
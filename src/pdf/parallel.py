@@ -0,0 +1,96 @@
+from typing import List, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+import pathlib
+
+from pdf.extractor import AnalysisPartial, PageRecord, parse_page
+from pdf.session import DocumentSession
+from utils.budget import BudgetExceeded
+
+# Quantidade de shards por worker: shards menores equilibram melhor a carga entre processos
+SHARDS_PER_WORKER = 4
+
+def plan_shards(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Divide o intervalo de páginas em shards contíguos de tamanho aproximadamente igual.
+    """
+    shard_count = max(1, min(page_count, workers * SHARDS_PER_WORKER))
+    base, extra = divmod(page_count, shard_count)
+
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        stop = start + base + (1 if i < extra else 0)
+        shards.append((start, stop))
+        start = stop
+    return shards
+
+def extract_shard(
+    file_path: Union[pathlib.Path, bytes],
+    start: int,
+    stop: int,
+    keep_text: bool = True,
+    keep_page_terms: bool = False
+) -> AnalysisPartial:
+    """
+    Executado no processo worker: abre seu próprio documento (do caminho ou dos bytes recebidos)
+    e analisa as páginas [start, stop).
+    Retorna o parcial do shard: histograma de fontes, candidatos a título e contagens de tokens.
+    """
+    partial = AnalysisPartial(keep_text, keep_page_terms)
+    with DocumentSession.open(file_path) as session:
+        doc = session.document
+        try:
+            for page_num in range(start, stop):
+                partial.add_page(parse_page(doc.load_page(page_num)))
+        except BudgetExceeded as e:
+            # Orçamento excedido: o parcial do shard fica com as páginas anteriores
+            partial.budget_exceeded = e.reason
+    return partial
+
+def merge_shards(shards: List[AnalysisPartial]) -> AnalysisPartial:
+    """
+    Combina os parciais na ordem das páginas. A ordem de inserção dos dicionários é preservada,
+    então desempates (fonte base, top palavras) e a ordem dos títulos são iguais aos do modo serial.
+    Um shard interrompido por orçamento encerra a combinação: o resultado cobre as páginas até ele.
+    """
+    merged = shards[0]
+    for shard in shards[1:]:
+        if merged.budget_exceeded is not None:
+            break
+        merged.merge(shard)
+    return merged
+
+def extract_partial_parallel(
+    file_path: Union[pathlib.Path, bytes],
+    page_count: int,
+    workers: int,
+    keep_text: bool = True,
+    keep_page_terms: bool = False
+) -> AnalysisPartial:
+    """
+    Distribui os shards de páginas num pool de processos e retorna o parcial combinado.
+    """
+    shards = plan_shards(page_count, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(extract_shard, file_path, start, stop, keep_text, keep_page_terms) for start, stop in shards]
+        # Os resultados são coletados na ordem dos shards, não na ordem de conclusão
+        results = [future.result() for future in futures]
+    return merge_shards(results)
+
+def parse_pages(file_path: Union[pathlib.Path, bytes], page_numbers: List[int]) -> List[PageRecord]:
+    """
+    Executado no processo worker: analisa as páginas indicadas (não necessariamente contíguas)
+    e retorna seus registros. Usado para as páginas ausentes do cache de páginas.
+    """
+    with DocumentSession.open(file_path) as session:
+        doc = session.document
+        return [parse_page(doc.load_page(page_num)) for page_num in page_numbers]
+
+def parse_pages_parallel(file_path: Union[pathlib.Path, bytes], page_numbers: List[int], workers: int) -> List[PageRecord]:
+    """
+    Distribui a lista de páginas em shards num pool de processos; os registros voltam em ordem.
+    """
+    shards = plan_shards(len(page_numbers), workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parse_pages, file_path, page_numbers[start:stop]) for start, stop in shards]
+        return [record for future in futures for record in future.result()]
@@ -0,0 +1,135 @@
+import contextlib
+import hashlib
+import mmap
+import pathlib
+import sys
+from typing import Dict, Iterator, Optional, Union
+
+import fitz
+
+# Nome usado para documentos lidos da entrada padrão (define os nomes dos diretórios de saída)
+STDIN_NAME = "stdin.pdf"
+
+# Origens aceitas pelas etapas: caminho em disco, bytes em memória ou uma sessão já aberta
+PdfSource = Union[str, pathlib.Path, bytes, "DocumentSession"]
+
+class DocumentSession:
+    """
+    PDF lido uma única vez e compartilhado por todas as etapas (análise, imagens, hash do cache).
+    O arquivo é mapeado em memória (ou recebido como bytes / lido da entrada padrão) e um único
+    documento fitz é aberto a partir desse buffer, sem reler o arquivo nem a tabela xref.
+
+    path é o caminho usado para nomear as saídas (para bytes/stdin, apenas o nome informado);
+    source_path é o arquivo real em disco, ou None quando o PDF veio da memória.
+    """
+
+    def __init__(self, data: Union[bytes, memoryview], name: str, source_path: Optional[pathlib.Path] = None, _mapping: Optional[mmap.mmap] = None):
+        self.data = data
+        self.path = source_path if source_path is not None else pathlib.Path(name)
+        self.source_path = source_path
+        self._mapping = _mapping
+        self._document: Optional[fitz.Document] = None
+        self._digest: Optional[str] = None
+        # Memos do documento usados pelo cache de páginas (pdf/incremental.py)
+        self.page_fingerprints: Dict[int, str] = {}
+        self.image_digests: Dict[int, Optional[str]] = {}
+
+    @classmethod
+    def from_path(cls, file_path: Union[str, pathlib.Path]) -> "DocumentSession":
+        """
+        Mapeia o arquivo em memória (somente leitura). Lança FileNotFoundError se não existir.
+        """
+        file_path = pathlib.Path(file_path)
+        with open(file_path, 'rb') as f:
+            try:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Arquivo vazio não pode ser mapeado; o fitz reporta o erro ao abrir
+                return cls(b"", file_path.name, file_path)
+        return cls(memoryview(mapping), file_path.name, file_path, _mapping=mapping)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str = "documento.pdf") -> "DocumentSession":
+        return cls(bytes(data), name)
+
+    @classmethod
+    def from_stdin(cls, name: Optional[str] = None) -> "DocumentSession":
+        return cls(sys.stdin.buffer.read(), name or STDIN_NAME)
+
+    @classmethod
+    def open(cls, source: PdfSource, name: Optional[str] = None) -> "DocumentSession":
+        """
+        Abre a sessão a partir de um caminho, de bytes ou de '-' (entrada padrão).
+        """
+        if isinstance(source, DocumentSession):
+            return source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return cls.from_bytes(source, name or "documento.pdf")
+        if str(source) == "-":
+            return cls.from_stdin(name)
+        return cls.from_path(source)
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def stem(self) -> str:
+        return self.path.stem
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.data)
+
+    @property
+    def digest(self) -> str:
+        """
+        SHA-256 (hex) do conteúdo, calculado sobre o buffer já em memória, sem reler o arquivo.
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    @property
+    def document(self) -> fitz.Document:
+        """
+        Documento fitz aberto a partir do buffer na primeira chamada e reutilizado depois.
+        """
+        if self._document is None:
+            self._document = fitz.open(stream=self.data, filetype="pdf")
+        return self._document
+
+    def worker_source(self) -> Union[pathlib.Path, bytes]:
+        """
+        Origem a enviar a processos worker: o caminho em disco, ou os próprios bytes.
+        """
+        return self.source_path if self.source_path is not None else bytes(self.data)
+
+    def close(self) -> None:
+        # O documento referencia o buffer, e o mmap só pode ser fechado sem views exportadas
+        if self._document is not None:
+            self._document.close()
+            self._document = None
+        if self._mapping is not None:
+            self.data.release()
+            self.data = b""
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self) -> "DocumentSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+@contextlib.contextmanager
+def session_scope(source: PdfSource, name: Optional[str] = None) -> Iterator[DocumentSession]:
+    """
+    Usa a sessão recebida ou abre uma nova para a origem; só fecha a sessão que ela mesma abriu.
+    Permite que as etapas aceitem tanto uma sessão compartilhada quanto um caminho avulso.
+    """
+    if isinstance(source, DocumentSession):
+        yield source
+        return
+    with DocumentSession.open(source, name) as session:
+        yield session
@@ -0,0 +1,149 @@
+import array
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Um span compacto: (tamanho da fonte arredondado, flags, bbox (x0, y0, x1, y1), texto)
+BBox = Tuple[float, float, float, float]
+Span = Tuple[float, int, BBox, str]
+
+# Níveis da hierarquia de títulos (H1, H2, H3)
+HEADING_LEVELS = 3
+
+# Margem acima da fonte base para um span contar como título (+0.1 evita erros de arredondamento)
+TITLE_MARGIN = 0.1
+
+class SpanTable:
+    """
+    Tabela colunar dos spans do documento, em ordem de página.
+    Colunas: size (float64), flags (int32), page (int32), bbox (float32, 4 por span) e os
+    deslocamentos de cada span num buffer de texto único. Só os spans candidatos a título guardam
+    texto; os demais entram apenas nas colunas numéricas (usadas no histograma de fontes).
+    As colunas crescem página a página (array.array) e são lidas como arrays NumPy sem cópia.
+    """
+
+    def __init__(self):
+        self._size = array.array('d')
+        self._flags = array.array('i')
+        self._page = array.array('i')
+        self._bbox = array.array('f')
+        self._offsets = array.array('q', [0])
+        self._chunks: List[str] = []
+        self._buffer: Optional[str] = ""
+
+    def __len__(self) -> int:
+        return len(self._size)
+
+    def append(self, page: int, size: float, flags: int, bbox: BBox, text: str = "") -> None:
+        self._size.append(size)
+        self._flags.append(flags)
+        self._page.append(page)
+        self._bbox.extend(bbox)
+        if text:
+            self._chunks.append(text)
+            self._buffer = None
+        self._offsets.append(self._offsets[-1] + len(text))
+
+    def extend(self, other: "SpanTable") -> None:
+        """
+        Acrescenta a tabela das páginas seguintes a esta (ex.: outro shard de páginas).
+        """
+        base = self._offsets[-1]
+        self._size.extend(other._size)
+        self._flags.extend(other._flags)
+        self._page.extend(other._page)
+        self._bbox.extend(other._bbox)
+        self._offsets.extend(offset + base for offset in other._offsets[1:])
+        if other._chunks:
+            self._chunks.extend(other._chunks)
+            self._buffer = None
+
+    @property
+    def size(self) -> np.ndarray:
+        return np.frombuffer(self._size, dtype=np.float64)
+
+    @property
+    def flags(self) -> np.ndarray:
+        return np.frombuffer(self._flags, dtype=np.int32)
+
+    @property
+    def page(self) -> np.ndarray:
+        return np.frombuffer(self._page, dtype=np.int32)
+
+    @property
+    def bbox(self) -> np.ndarray:
+        return np.frombuffer(self._bbox, dtype=np.float32).reshape(-1, 4)
+
+    @property
+    def text_offsets(self) -> np.ndarray:
+        return np.frombuffer(self._offsets, dtype=np.int64)
+
+    @property
+    def text_buffer(self) -> str:
+        if self._buffer is None:
+            self._buffer = "".join(self._chunks)
+            self._chunks = [self._buffer]
+        return self._buffer
+
+    def text(self, row: int) -> str:
+        return self.text_buffer[self._offsets[row]:self._offsets[row + 1]]
+
+def font_histogram(table: SpanTable) -> Dict[float, int]:
+    """
+    Histograma de tamanhos de fonte, na ordem da primeira aparição no documento.
+    """
+    if not len(table):
+        return {}
+    sizes, first_index, counts = np.unique(table.size, return_index=True, return_counts=True)
+    order = np.argsort(first_index, kind="stable")
+    return {float(sizes[i]): int(counts[i]) for i in order}
+
+def base_font_size(table: SpanTable) -> float:
+    """
+    Tamanho de fonte mais frequente (fonte do corpo do texto).
+    Em caso de empate, vence o tamanho que apareceu primeiro no documento.
+    """
+    if not len(table):
+        return 0.0
+    sizes, first_index, counts = np.unique(table.size, return_index=True, return_counts=True)
+    tied = np.flatnonzero(counts == counts.max())
+    return float(sizes[tied[np.argmin(first_index[tied])]])
+
+def heading_level_bounds(heading_sizes: np.ndarray, levels: int = HEADING_LEVELS) -> np.ndarray:
+    """
+    Agrupa os tamanhos de título distintos em até `levels` níveis (quebras naturais): os tamanhos,
+    em ordem decrescente, são separados nas maiores diferenças entre vizinhos.
+    Retorna, para cada nível (H1 primeiro), o menor tamanho que pertence a ele.
+    """
+    distinct = np.unique(heading_sizes)[::-1]
+    if len(distinct) <= levels:
+        return distinct
+    gaps = distinct[:-1] - distinct[1:]
+    # As levels-1 maiores diferenças, em ordem de tamanho (desempate: a maior fonte primeiro)
+    breaks = np.sort(np.argsort(-gaps, kind="stable")[:levels - 1])
+    return np.append(distinct[breaks], distinct[-1])
+
+def select_headings(table: SpanTable, base_size: float, levels: int = HEADING_LEVELS) -> List[Dict[str, Any]]:
+    """
+    Títulos: spans candidatos com fonte claramente maior que a fonte base, sem repetição de texto
+    (vence a primeira ocorrência), em ordem de página. Cada título recebe o nível (1 = maior fonte)
+    e a página (1-based).
+    """
+    offsets = table.text_offsets
+    has_text = offsets[1:] > offsets[:-1]
+    rows = np.flatnonzero(has_text & (table.size > base_size + TITLE_MARGIN))
+    if not len(rows):
+        return []
+
+    sizes = table.size[rows]
+    bounds = heading_level_bounds(sizes, levels)
+    # Nível = quantidade de limites (do maior para o menor) acima do tamanho do span
+    level_of_row = np.searchsorted(-bounds, -sizes, side="left") + 1
+    pages = table.page[rows]
+
+    headings: Dict[str, Dict[str, Any]] = {}
+    for row, level, page in zip(rows.tolist(), level_of_row.tolist(), pages.tolist()):
+        text = table.text(row)
+        if text not in headings:
+            headings[text] = {"text": text, "level": level, "page": page + 1}
+    return list(headings.values())
@@ -0,0 +1,473 @@
+import glob
+import json
+import pathlib
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Iterable, Optional
+
+from pipeline.stages import run_stage
+from llm.config import summary_config
+from cli.arguments import budget_from_args, inference_from_args
+from pdf.session import DocumentSession
+from pdf.incremental import open_page_cache
+from pipeline.corpus import absorb_corpus_sketch, format_corpus_summary, save_corpus_sketch
+from pipeline.search import absorb_page_terms, open_index_writer
+from utils.files import atomic_write_text
+from utils.sinks import OutputSinks, open_sinks
+from utils.sketches import CorpusSketch
+from utils.budget import BudgetExceeded, format_budget_reason, report_partial
+from utils.profiling import Profiler, profile_stage, aggregate_profiles, format_aggregate_table
+from utils.cache import (
+    ResultCache, open_cache, cached_call, analysis_cache_key, images_cache_key, summary_cache_key, images_files_exist
+)
+
+def resolve_inputs(sources: Iterable[str], manifest: Optional[str] = None) -> List[pathlib.Path]:
+    """
+    Expande diretórios, padrões glob e um arquivo manifesto (um caminho por linha)
+    numa lista de PDFs sem repetição, preservando a ordem.
+    """
+    entries = list(sources)
+    if manifest:
+        with open(manifest, 'r', encoding='utf-8') as f:
+            # Linhas vazias e comentários (#) são ignorados
+            entries.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith('#'))
+
+    pdf_paths: List[pathlib.Path] = []
+    seen = set()
+    for entry in entries:
+        path = pathlib.Path(entry)
+        if path.is_dir():
+            candidates = sorted(p for p in path.rglob('*') if p.suffix.lower() == '.pdf')
+        elif glob.has_magic(entry):
+            candidates = [pathlib.Path(p) for p in sorted(glob.glob(entry, recursive=True))]
+        else:
+            # Arquivos inexistentes seguem adiante e são reportados como falha do documento
+            candidates = [path]
+
+        for candidate in candidates:
+            key = candidate.resolve()
+            if key not in seen:
+                seen.add(key)
+                pdf_paths.append(candidate)
+    return pdf_paths
+
+def analyze_document(
+    pdf_path: pathlib.Path,
+    output_path: pathlib.Path,
+    keep_text: bool,
+    cache: Optional[ResultCache] = None,
+    min_image_size: int = 0,
+    image_threads: int = 4,
+    profile: bool = False,
+    use_page_cache: bool = True,
+    extract_images: bool = True,
+    corpus_sketch: bool = False,
+    page_terms: bool = False
+) -> Dict[str, Any]:
+    """
+    Executado no processo worker: análise estrutural e extração de imagens de um documento.
+    Com profile=True, o resumo por etapa (Profiler.to_dict) volta no campo "profile".
+    Com o cache ativo (e use_page_cache), as contagens do cache de páginas voltam em "page_cache".
+    Com extract_images=False, só a análise roda e o resultado volta sem "images"
+    (o pipeline assíncrono extrai as imagens no processo principal, ver extract_document_images).
+    Com corpus_sketch=True, a análise traz o esboço do documento para as estatísticas de corpus.
+    Com page_terms=True, a análise traz as frequências de termos por página para o índice invertido.
+    """
+    options = (
+        keep_text, cache, min_image_size, image_threads, use_page_cache, extract_images, corpus_sketch, page_terms
+    )
+    if not profile:
+        return _analyze_document(pdf_path, output_path, *options)
+
+    profiler = Profiler()
+    with profiler.activate():
+        result = _analyze_document(pdf_path, output_path, *options)
+    result["profile"] = profiler.to_dict()
+    return result
+
+def _images_stage(
+    session: DocumentSession,
+    pdf_digest: Optional[str],
+    output_path: pathlib.Path,
+    cache: Optional[ResultCache],
+    min_image_size: int,
+    image_threads: int,
+    page_cache: Optional["PageCache"]
+) -> Dict[str, Any]:
+    with profile_stage("images") as counts:
+        images_results = cached_call(
+            cache, pdf_digest and images_cache_key(pdf_digest, output_path, min_image_size),
+            lambda: run_stage("images", session, output_path, min_image_size, image_threads, page_cache=page_cache),
+            is_valid=images_files_exist,
+            should_store=lambda r: "error" not in r and "budget_exceeded" not in r
+        )
+        counts["images"] = images_results.get("images_extracted", 0)
+    return images_results
+
+def _analyze_document(
+    pdf_path: pathlib.Path,
+    output_path: pathlib.Path,
+    keep_text: bool,
+    cache: Optional[ResultCache],
+    min_image_size: int,
+    image_threads: int,
+    use_page_cache: bool = True,
+    extract_images: bool = True,
+    corpus_sketch: bool = False,
+    page_terms: bool = False
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+
+    # O arquivo é lido uma única vez; hash, análise e imagens usam o mesmo buffer e documento
+    try:
+        with profile_stage("read"):
+            session = DocumentSession.from_path(pdf_path)
+    except OSError as e:
+        error = {"error": "FileNotFound"} if isinstance(e, FileNotFoundError) else {"error": str(e)}
+        return {
+            "file": str(pdf_path),
+            "pdf_digest": None,
+            "analysis": error,
+            "images": dict(error),
+            "elapsed": time.perf_counter() - start,
+        }
+
+    with session:
+        # Sem cache (e sem índice, que reconhece arquivos já indexados pelo hash), o hash não é calculado
+        pdf_digest = session.digest if cache is not None or page_terms else None
+        page_cache = open_page_cache(cache, enabled=use_page_cache)
+        # Num worker isolado, o que já terminou volta como resultado parcial se o worker for encerrado
+        report_partial("pdf_digest", pdf_digest)
+
+        with profile_stage("analysis") as counts:
+            analysis_results = cached_call(
+                cache, pdf_digest and analysis_cache_key(pdf_digest, keep_text, corpus_sketch, page_terms),
+                lambda: run_stage(
+                    "analysis", session, keep_full_text=keep_text, page_cache=page_cache,
+                    corpus_sketch=corpus_sketch, page_terms=page_terms
+                ),
+                # Resultados parciais (orçamento excedido) não vão para o cache
+                should_store=lambda r: "error" not in r and "budget_exceeded" not in r
+            )
+            counts["pages"] = analysis_results.get("total_pages", 0)
+            counts["tokens"] = analysis_results.get("total_words", 0)
+
+        images_results = None
+        if extract_images:
+            # Sem os dados do índice e do corpus, que não são usados de documentos interrompidos
+            report_partial("analysis", {
+                key: value for key, value in analysis_results.items() if key not in ("page_terms", "corpus_sketch")
+            })
+            images_results = _images_stage(
+                session, pdf_digest, output_path, cache, min_image_size, image_threads, page_cache
+            )
+
+    result = {
+        "file": str(pdf_path),
+        "pdf_digest": pdf_digest,
+        "analysis": analysis_results,
+        "elapsed": time.perf_counter() - start,
+    }
+    if images_results is not None:
+        result["images"] = images_results
+    budget_exceeded = analysis_results.get("budget_exceeded") or (images_results or {}).get("budget_exceeded")
+    if budget_exceeded:
+        result["budget_exceeded"] = budget_exceeded
+    if page_cache is not None and page_cache.stats:
+        result["page_cache"] = page_cache.stats
+    return result
+
+def failed_result(pdf_path: pathlib.Path, error: Exception) -> Dict[str, Any]:
+    """
+    Resultado de um documento cujo worker falhou. Com orçamento excedido (worker encerrado),
+    traz o motivo e as etapas que já tinham terminado (ex.: a análise, se o limite estourou nas imagens).
+    """
+    if not isinstance(error, BudgetExceeded):
+        return {"file": str(pdf_path), "analysis": {"error": str(error)}, "images": {}, "elapsed": 0.0}
+
+    message = {"error": f"Orçamento excedido: {format_budget_reason(error.reason)}"}
+    return {
+        "file": str(pdf_path),
+        "pdf_digest": error.partial.get("pdf_digest"),
+        "analysis": error.partial.get("analysis") or dict(message),
+        "images": dict(message),
+        "budget_exceeded": error.reason,
+        "elapsed": error.reason.get("elapsed", 0.0),
+    }
+
+def create_executor(args) -> Executor:
+    """
+    Pool de processos do lote; com orçamento por documento (--timeout, --max-rss-mb, ...),
+    workers isolados que são encerrados e substituídos quando o documento excede o orçamento.
+    """
+    budget = budget_from_args(args)
+    if budget is None:
+        return ProcessPoolExecutor(max_workers=args.jobs)
+    from pipeline.isolation import IsolatedExecutor
+    return IsolatedExecutor(args.jobs, budget)
+
+def extract_document_images(
+    result: Dict[str, Any],
+    output_path: pathlib.Path,
+    cache: Optional[ResultCache] = None,
+    min_image_size: int = 0,
+    image_threads: int = 4,
+    use_page_cache: bool = True
+) -> None:
+    """
+    Extrai as imagens de um documento já analisado (resultado de analyze_document com
+    extract_images=False), preenchendo result["images"] e somando as contagens do cache de páginas.
+    """
+    start = time.perf_counter()
+    pdf_path = pathlib.Path(result["file"])
+    try:
+        session = DocumentSession.from_path(pdf_path)
+    except OSError as e:
+        result["images"] = {"error": "FileNotFound"} if isinstance(e, FileNotFoundError) else {"error": str(e)}
+        result["elapsed"] += time.perf_counter() - start
+        return
+
+    with session:
+        page_cache = open_page_cache(cache, enabled=use_page_cache)
+        result["images"] = _images_stage(
+            session, result.get("pdf_digest"), output_path, cache, min_image_size, image_threads, page_cache
+        )
+    if page_cache is not None and page_cache.stats:
+        result.setdefault("page_cache", {}).update(page_cache.stats)
+    result["elapsed"] += time.perf_counter() - start
+
+def summarize_document(
+    result: Dict[str, Any],
+    model: Any,
+    tokenizer: Any,
+    args,
+    cache: Optional[ResultCache] = None
+) -> None:
+    """
+    Gera o resumo com o modelo residente (o relatório Markdown é gravado depois, pelo MarkdownSink).
+    Uma falha no resumo vira o resumo "Erro: ..."; não lança.
+    Se o documento foi medido no worker ("profile"), as etapas do resumo entram no mesmo perfil.
+    """
+    if "profile" not in result:
+        _summarize_document(result, model, tokenizer, args, cache)
+        return
+
+    profiler = Profiler()
+    with profiler.activate():
+        _summarize_document(result, model, tokenizer, args, cache)
+    result["profile"].update(profiler.to_dict())
+
+def _summarize_document(
+    result: Dict[str, Any],
+    model: Any,
+    tokenizer: Any,
+    args,
+    cache: Optional[ResultCache]
+) -> None:
+    start = time.perf_counter()
+    analysis_results = result["analysis"]
+    full_text = analysis_results.get("full_text", "")
+
+    # Sem modelo (falha no carregamento) e sem servidor, o relatório sai sem resumo
+    summary = ""
+    if full_text and (model is not None or args.llm_server):
+        pdf_digest = result.get("pdf_digest")
+        inference = inference_from_args(args)
+        config = summary_config(args.long_document, args.batch_size, args.max_chunk_tokens, inference)
+        with profile_stage("summary"):
+            try:
+                summary = cached_call(
+                    cache, pdf_digest and summary_cache_key(pdf_digest, config),
+                    lambda: {"summary": run_stage(
+                        "summary", full_text, model, tokenizer,
+                        long_document=args.long_document,
+                        batch_size=args.batch_size,
+                        max_chunk_tokens=args.max_chunk_tokens,
+                        server_url=args.llm_server,
+                        inference=inference
+                    )},
+                    should_store=lambda r: not r["summary"].startswith("Erro:")
+                )["summary"]
+            except Exception as e:
+                # Como no pipeline assíncrono: a análise e as imagens são mantidas e o relatório
+                # sai com o erro no lugar do resumo
+                summary = f"Erro: Falha ao gerar o resumo: {e}"
+
+    result["summary"] = summary
+    result["elapsed"] += time.perf_counter() - start
+
+def format_status_line(result: Dict[str, Any]) -> str:
+    """
+    Linha de status de um documento. Falhas seguem o formato de main.format_analysis_output.
+    """
+    name = pathlib.Path(result["file"]).name
+    analysis_results = result["analysis"]
+    if "error" in analysis_results:
+        return f"[ERRO NA ANÁLISE]: {name}: {analysis_results['error']}"
+
+    # Análise interrompida por orçamento: páginas analisadas / total do documento
+    pages = f"{analysis_results['total_pages']}"
+    if "pages_analyzed" in analysis_results:
+        pages = f"{analysis_results['pages_analyzed']}/{pages}"
+    line = f"[OK] {name}: {pages} páginas, {analysis_results['total_words']:,} palavras"
+    images_results = result["images"]
+    if "error" in images_results:
+        line += f" | [AVISO/ERRO IMAGENS]: {images_results['error']}"
+    else:
+        line += f", {images_results['images_extracted']} imagens"
+
+    page_counts = result.get("page_cache", {}).get("analysis")
+    if page_counts:
+        line += f" [páginas: {page_counts['reused']} reaproveitadas, {page_counts['parsed']} reprocessadas]"
+
+    if "budget_exceeded" in result:
+        line += f" | [ORÇAMENTO]: {format_budget_reason(result['budget_exceeded'])}"
+    return line + f" ({result['elapsed']:.2f}s)"
+
+def write_outputs(result: Dict[str, Any], sinks: Optional[OutputSinks]) -> None:
+    """
+    Entrega o documento concluído aos sinks de saída (relatório Markdown, --json, --jsonl).
+    """
+    if sinks:
+        error = sinks.write(result)
+        if error:
+            print(f"[ERRO SAÍDA]: {pathlib.Path(result['file']).name}: {error}")
+
+def print_batch_summary(results: List[Dict[str, Any]], elapsed: float) -> None:
+    """
+    Imprime o resumo agregado do lote.
+    """
+    succeeded = [r for r in results if "error" not in r["analysis"]]
+    failed = len(results) - len(succeeded)
+    total_pages = sum(r["analysis"].get("pages_analyzed", r["analysis"]["total_pages"]) for r in succeeded)
+    total_words = sum(r["analysis"]["total_words"] for r in succeeded)
+    total_images = sum(r["images"].get("images_extracted", 0) for r in succeeded)
+    over_budget = sum("budget_exceeded" in r for r in results)
+    docs_per_minute = len(results) / elapsed * 60 if elapsed > 0 else 0.0
+
+    print("\n================== RESUMO DO LOTE ==================")
+    print(f"Documentos Processados: {len(results)}")
+    print(f"Sucesso: {len(succeeded)} | Falhas: {failed}")
+    if over_budget:
+        print(f"Orçamento Excedido: {over_budget} (resultados parciais)")
+    print(f"Páginas: {total_pages:,} | Palavras: {total_words:,} | Imagens: {total_images:,}")
+    print(f"Tempo Total: {elapsed:.2f}s ({docs_per_minute:.1f} documentos/minuto)")
+    print("====================================================")
+
+def _run_pool_batch(
+    args,
+    pdf_paths: List[pathlib.Path],
+    output_path: pathlib.Path,
+    cache: Optional[ResultCache],
+    model: Any,
+    tokenizer: Any,
+    profile: bool,
+    corpus: Optional[CorpusSketch] = None,
+    index: Optional["IndexWriter"] = None,
+    sinks: Optional[OutputSinks] = None
+) -> List[Dict[str, Any]]:
+    # 2b. Análise e imagens no pool; resumo no processo principal, conforme os documentos terminam
+    start = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    with create_executor(args) as executor:
+        futures = {
+            executor.submit(
+                analyze_document, pdf_path, output_path, args.summarize, cache,
+                args.min_image_size, args.image_threads, profile, not args.no_page_cache,
+                True, corpus is not None, index is not None
+            ): pdf_path
+            for pdf_path in pdf_paths
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # Falha do worker (ex.: processo encerrado): registra e segue com o lote
+                result = failed_result(futures[future], e)
+
+            if args.summarize and "error" not in result["analysis"]:
+                # Uma falha no resumo fica no próprio documento (ver _summarize_document)
+                summarize_document(result, model, tokenizer, args, cache)
+
+            absorb_corpus_sketch(result, corpus)
+            absorb_page_terms(result, index)
+            print(format_status_line(result))
+            write_outputs(result, sinks)
+            results.append(result)
+
+    print_batch_summary(results, time.perf_counter() - start)
+    return results
+
+def run_batch(args) -> int:
+    """
+    Processa vários PDFs com um pool de workers e um único modelo residente.
+    Retorna o código de saída: 0 se todos os documentos foram processados por completo, 1 caso
+    contrário (falhas ou orçamento excedido).
+    """
+    output_path = pathlib.Path(args.output)
+    pdf_paths = resolve_inputs(args.inputs, args.manifest)
+    if not pdf_paths:
+        print("Erro: Nenhum arquivo PDF encontrado nas entradas informadas.")
+        return 1
+
+    mode = ", pipeline assíncrono" if args.pipeline else ""
+    print(f"\n--- Iniciando Processamento em Lote: {len(pdf_paths)} arquivos ({args.jobs} workers{mode}) ---\n")
+
+    # 1. Carregar o modelo uma única vez para todo o lote (ou usar o servidor de resumo)
+    model = tokenizer = None
+    if args.summarize and not args.llm_server:
+        from llm.model import get_model
+        model, tokenizer = get_model(quantize=inference_from_args(args)["quantize"])
+
+    cache = open_cache(args.cache_dir, args.cache_max_mb, enabled=not args.no_cache)
+    profile = args.profile or bool(args.profile_output)
+    # Estatísticas de corpus: os esboços dos documentos são combinados conforme chegam
+    corpus = CorpusSketch() if args.corpus_stats else None
+    # Índice invertido: as postings de cada documento são gravadas conforme ele chega
+    try:
+        index = open_index_writer(args)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"[ERRO ÍNDICE]: {e}")
+        return 1
+
+    # Sinks de saída legíveis por máquina: cada documento é gravado assim que termina
+    try:
+        sinks = open_sinks(args, output_path)
+    except OSError as e:
+        print(f"[ERRO SAÍDA]: {e}")
+        if index is not None:
+            index.close()
+        return 1
+
+    try:
+        # 2a. Pipeline assíncrono: análise, imagens, resumo e relatório sobrepostos entre documentos
+        if args.pipeline:
+            from pipeline.streaming import run_streaming_batch
+            results = run_streaming_batch(args, pdf_paths, output_path, cache, model, tokenizer, corpus, index, sinks)
+        else:
+            results = _run_pool_batch(
+                args, pdf_paths, output_path, cache, model, tokenizer, profile, corpus, index, sinks
+            )
+    finally:
+        sinks.close()
+        if index is not None:
+            index.close()
+
+    if index is not None:
+        print(f"\n[ÍNDICE]: {index.manifest['documents']:,} documentos ({index.manifest['pages']:,} páginas) "
+              f"no índice: {index.index_dir}")
+
+    if corpus is not None:
+        print("\n================ ESTATÍSTICAS DO CORPUS ================")
+        print(format_corpus_summary(corpus))
+        save_corpus_sketch(args.corpus_stats, corpus)
+        print(f"[CORPUS]: Esboço do corpus salvo em: {args.corpus_stats}")
+
+    if profile:
+        aggregated = aggregate_profiles(r["profile"] for r in results if "profile" in r)
+        print("\n============ PERFIL POR ETAPA (PERCENTIS) ============")
+        print(format_aggregate_table(aggregated))
+        if args.profile_output:
+            atomic_write_text(args.profile_output, json.dumps(aggregated, indent=2, ensure_ascii=False))
+            print(f"[PERFIL]: Percentis salvos em: {args.profile_output}")
+    return 0 if all("error" not in r["analysis"] and "budget_exceeded" not in r for r in results) else 1
@@ -0,0 +1,70 @@
+import json
+import pathlib
+from typing import Any, Dict, List, Optional
+
+from utils.budget import is_truncated
+from utils.files import atomic_write_text
+from utils.sketches import CorpusSketch
+
+def absorb_corpus_sketch(result: Dict[str, Any], corpus: Optional[CorpusSketch]) -> None:
+    """
+    Combina o esboço do documento (analysis["corpus_sketch"]) no acumulado do corpus e o remove
+    do resultado, para que a memória do lote não cresça com o número de documentos.
+    Documentos interrompidos por orçamento ficam de fora das estatísticas.
+    """
+    sketch = result["analysis"].pop("corpus_sketch", None)
+    if corpus is not None and sketch is not None and not is_truncated(result):
+        corpus.merge(CorpusSketch.from_dict(sketch))
+
+def save_corpus_sketch(path: str, sketch: CorpusSketch) -> None:
+    atomic_write_text(path, json.dumps(sketch.to_dict(), ensure_ascii=False))
+
+def load_corpus_sketch(path: str) -> CorpusSketch:
+    with open(path, 'r', encoding='utf-8') as f:
+        return CorpusSketch.from_dict(json.load(f))
+
+def format_corpus_summary(sketch: CorpusSketch, n: int = 10) -> str:
+    """
+    Resumo legível: documentos, palavras, vocabulário estimado e as n palavras mais comuns,
+    cada uma com o intervalo garantido da contagem real.
+    """
+    error_bound = int(sketch.heavy_hitters.error_bound)
+    vocabulary_error = sketch.vocabulary.relative_error
+    lines = [
+        f"Documentos: {sketch.documents:,} | Palavras: {sketch.total_words:,}",
+        f"Vocabulário (Distinto, estimado): ~{sketch.vocabulary_size:,} (erro padrão {vocabulary_error:.1%})",
+        f"Top {n} Palavras-Chave (contagem mínima garantida; a real é no máximo +{error_bound:,}):",
+    ]
+    for rank, (word, count) in enumerate(sketch.top_n_words(n), 1):
+        lines.append(f"{rank}. {word:<15} - {count:,} vezes")
+    return "\n".join(lines)
+
+def run_corpus(args) -> int:
+    """
+    Subcomando 'corpus': combina esboços (de documentos ou de shards processados em outras máquinas),
+    imprime as estatísticas do corpus e, com -o, salva o esboço combinado.
+    """
+    merged: Optional[CorpusSketch] = None
+    failures: List[str] = []
+    for path in args.sketches:
+        try:
+            sketch = load_corpus_sketch(path)
+            if merged is None:
+                merged = sketch
+            else:
+                merged.merge(sketch)
+        except (OSError, ValueError, KeyError) as e:
+            failures.append(f"{path}: {e}")
+
+    for failure in failures:
+        print(f"[ERRO CORPUS]: {failure}")
+    if merged is None:
+        print("Erro: Nenhum esboço válido nas entradas informadas.")
+        return 1
+
+    print("\n================ ESTATÍSTICAS DO CORPUS ================")
+    print(format_corpus_summary(merged, args.top))
+    if args.output:
+        save_corpus_sketch(args.output, merged)
+        print(f"[CORPUS]: Esboço combinado salvo em: {pathlib.Path(args.output)}")
+    return 1 if failures else 0
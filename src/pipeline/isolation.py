@@ -0,0 +1,197 @@
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Optional
+
+from utils.budget import BudgetExceeded, DocumentBudget, activate_budget, budget_reason, process_rss_mb
+
+# Tolerância além dos limites de tempo antes de encerrar o worker: dá à verificação cooperativa
+# (ao final de cada página) a chance de parar o documento com os resultados parciais
+KILL_GRACE_S = 1.0
+# Intervalo de supervisão (mensagens do worker, relógio e RSS)
+POLL_INTERVAL_S = 0.05
+# Um worker cuja memória residente passa desta fração do limite é substituído após o documento
+RECYCLE_RSS_FRACTION = 0.8
+
+class WorkerCrashed(RuntimeError):
+    """
+    O processo worker terminou sem devolver o resultado (ex.: falha de segmentação no MuPDF).
+    """
+
+def _worker_main(conn, budget: DocumentBudget) -> None:
+    # Processo worker: executa um documento por vez sob o orçamento, relatando o progresso
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args, kwargs = task
+        try:
+            with activate_budget(budget, conn.send):
+                value = fn(*args, **kwargs)
+            conn.send(("done", value))
+        except Exception as e:
+            try:
+                conn.send(("error", e))
+            except Exception:
+                # Exceção que não pode ser serializada
+                conn.send(("error", RuntimeError(repr(e))))
+
+class _Worker:
+    """
+    Um processo worker e a conexão com ele, no processo principal.
+    """
+
+    def __init__(self, context, budget: DocumentBudget):
+        self.budget = budget
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, budget), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def run(self, fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        """
+        Executa fn no worker, supervisionando tempo total, tempo da página em andamento e RSS.
+        Se o worker não parar sozinho dentro dos limites, é encerrado e BudgetExceeded é lançada
+        com os resultados parciais já relatados (ver utils/budget.report_partial).
+        """
+        budget = self.budget
+        partial: Dict[str, Any] = {}
+        stage, page, page_start = "open", None, None
+        start = time.monotonic()
+        self.conn.send((fn, args, kwargs))
+        while True:
+            if self.conn.poll(POLL_INTERVAL_S):
+                try:
+                    message = self.conn.recv()
+                except EOFError:
+                    self.process.join()
+                    raise WorkerCrashed(f"Worker encerrado inesperadamente (código {self.process.exitcode}).")
+                kind = message[0]
+                if kind == "done":
+                    return message[1]
+                if kind == "error":
+                    raise message[1]
+                if kind == "page":
+                    stage, page, page_start = message[1], message[2] + 1, time.monotonic()
+                elif kind == "partial":
+                    partial[message[1]] = message[2]
+
+            now = time.monotonic()
+            reason = None
+            if budget.timeout_s is not None and now - start > budget.timeout_s + KILL_GRACE_S:
+                reason = budget_reason("timeout", stage, now - start, budget.timeout_s, page, "killed")
+            elif budget.page_timeout_s is not None and page_start is not None \
+                    and now - page_start > budget.page_timeout_s + KILL_GRACE_S:
+                reason = budget_reason("page_time", stage, now - page_start, budget.page_timeout_s, page, "killed")
+            elif budget.max_rss_mb is not None:
+                rss = process_rss_mb(self.process.pid)
+                if rss is not None and rss > budget.max_rss_mb:
+                    reason = budget_reason("rss", stage, rss, budget.max_rss_mb, page, "killed")
+            if reason is not None:
+                self.kill()
+                reason["elapsed"] = round(now - start, 3)
+                raise BudgetExceeded(reason, partial)
+
+    def over_memory(self) -> bool:
+        if self.budget.max_rss_mb is None:
+            return False
+        rss = process_rss_mb(self.process.pid)
+        return rss is not None and rss > self.budget.max_rss_mb * RECYCLE_RSS_FRACTION
+
+    def kill(self) -> None:
+        if self.process.exitcode is None:
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class IsolatedExecutor(Executor):
+    """
+    Pool de processos com orçamento por documento (batch --timeout, --max-rss-mb, ...). Cada worker
+    é supervisionado por uma thread do processo principal; um documento que excede o orçamento e
+    não para sozinho tem o worker encerrado (SIGKILL) e substituído, e o futuro recebe
+    BudgetExceeded com o motivo e os resultados parciais. Documentos que param sozinhos (verificação
+    cooperativa entre páginas) voltam normalmente, com "budget_exceeded" nos resultados.
+    Compatível com ProcessPoolExecutor (submit, as_completed, loop.run_in_executor).
+    """
+
+    def __init__(self, max_workers: int, budget: DocumentBudget):
+        self.budget = budget
+        # spawn: os workers são substituídos enquanto as threads de supervisão estão ativas
+        self._context = multiprocessing.get_context("spawn")
+        self._tasks: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self.recycled = 0
+        self._threads = [
+            threading.Thread(target=self._supervise, name=f"isolated-worker-{i}", daemon=True)
+            for i in range(max(1, max_workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        future: Future = Future()
+        self._tasks.put((future, fn, args, kwargs))
+        return future
+
+    def _supervise(self) -> None:
+        worker: Optional[_Worker] = _Worker(self._context, self.budget)
+        while (task := self._tasks.get()) is not None:
+            future, fn, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            if worker is None:
+                worker = _Worker(self._context, self.budget)
+            try:
+                value = worker.run(fn, args, kwargs)
+            except (BudgetExceeded, WorkerCrashed) as e:
+                # O processo também pode ter relatado a exceção e continuar vivo: encerra-o de
+                # qualquer forma (idempotente se já foi encerrado) e o próximo documento recebe um novo
+                worker.kill()
+                worker = None
+                with self._lock:
+                    self.recycled += 1
+                future.set_exception(e)
+                continue
+            except BaseException as e:
+                future.set_exception(e)
+                continue
+            future.set_result(value)
+            # A memória de um documento pesado não volta ao sistema: substitui o worker
+            if worker.over_memory():
+                worker.stop()
+                worker = None
+                with self._lock:
+                    self.recycled += 1
+        if worker is not None:
+            worker.stop()
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        if cancel_futures:
+            while True:
+                try:
+                    task = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not None:
+                    task[0].cancel()
+        for _ in self._threads:
+            self._tasks.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,95 @@
+import json
+import pathlib
+import time
+from typing import Any, Dict, Optional
+
+from utils.budget import is_truncated
+from utils.inverted_index import IndexWriter, InvertedIndex
+
+# Subdiretório do diretório de saída usado quando --index-dir não é informado; o ponto evita
+# colisão com o diretório de saída de um PDF chamado "index.pdf" (<saída>/<nome do PDF>)
+DEFAULT_INDEX_SUBDIR = ".index"
+
+def resolve_index_dir(index_dir: Optional[str], output: str) -> pathlib.Path:
+    return pathlib.Path(index_dir) if index_dir else pathlib.Path(output) / DEFAULT_INDEX_SUBDIR
+
+def open_index_writer(args) -> Optional[IndexWriter]:
+    """
+    Escritor do índice a partir das opções da CLI; None sem --index.
+    """
+    if not args.index:
+        return None
+    return IndexWriter(resolve_index_dir(args.index_dir, args.output))
+
+def absorb_page_terms(result: Dict[str, Any], index: Optional[IndexWriter]) -> None:
+    """
+    Grava as frequências de termos por página (analysis["page_terms"]) no índice e as remove do
+    resultado, para que a memória do lote não cresça com o número de documentos.
+    Documentos interrompidos por orçamento não são indexados: o índice ignora reprocessamentos
+    com o mesmo hash, então a versão truncada ficaria no índice em definitivo.
+    """
+    page_terms = result["analysis"].pop("page_terms", None)
+    if index is not None and page_terms is not None and not is_truncated(result):
+        index.add_document(result["file"], result.get("pdf_digest"), page_terms)
+
+def format_hits(found: Dict[str, Any], elapsed: float) -> str:
+    """
+    Resultado legível da consulta: documentos em ordem de relevância, com as melhores páginas.
+    """
+    lines = [
+        f"Termos: {', '.join(found['terms'])} | {found['matched_documents']:,} documentos, "
+        f"{found['matched_pages']:,} páginas ({elapsed * 1000:.1f} ms)"
+    ]
+    for rank, hit in enumerate(found["hits"], 1):
+        pages = ", ".join(f"p. {page['page']}" for page in hit["pages"])
+        lines.append(f"{rank:02}. {hit['name']:<30} - {hit['score']:.2f} ({hit['matched_pages']} páginas: {pages})")
+        lines.append(f"    {hit['file']}")
+    return "\n".join(lines)
+
+def run_query(args) -> int:
+    """
+    Subcomando 'query': busca por palavras-chave no índice invertido, sem abrir nenhum PDF.
+    """
+    start = time.perf_counter()
+    try:
+        with InvertedIndex(pathlib.Path(args.index_dir)) as index:
+            found = index.search(" ".join(args.terms), args.top, require_all=args.all, pages_per_document=args.pages)
+    except (OSError, ValueError) as e:
+        print(f"[ERRO ÍNDICE]: {e}")
+        return 1
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(dict(found, elapsed_ms=round(elapsed * 1000, 3)), ensure_ascii=False, indent=2))
+    elif not found["terms"]:
+        print("Nenhum termo pesquisável na consulta (apenas stopwords, números ou letras isoladas).")
+    else:
+        print(format_hits(found, elapsed))
+    return 0 if found["hits"] else 1
+
+def run_index(args) -> int:
+    """
+    Subcomando 'index': manutenção do índice (estatísticas, remoção de documentos e compactação).
+    """
+    index_dir = pathlib.Path(args.index_dir)
+    try:
+        if args.action == "stats":
+            with InvertedIndex(index_dir) as index:
+                manifest = index.manifest
+                print(f"Documentos: {index.document_count:,} | Páginas: {index.page_count:,} | "
+                      f"Segmentos: {len(manifest['segments'])} | Removidos a compactar: {len(manifest['deleted'])}")
+            return 0
+
+        with IndexWriter(index_dir) as writer:
+            if args.action == "remove":
+                missing = [path for path in args.paths if not writer.remove_document(path)]
+                for path in missing:
+                    print(f"[AVISO ÍNDICE]: Documento não indexado: {path}")
+                print(f"[ÍNDICE]: {len(args.paths) - len(missing)} documentos removidos.")
+                return 1 if missing else 0
+            writer.compact()
+            print(f"[ÍNDICE]: Compactado em {len(writer.manifest['segments'])} segmento(s).")
+            return 0
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"[ERRO ÍNDICE]: {e}")
+        return 1
@@ -0,0 +1,33 @@
+import importlib
+from typing import Any, Callable, Dict, Tuple
+
+# Registro das etapas do pipeline: nome -> (módulo, função). O relatório Markdown é gravado
+# pelos sinks de saída (utils/sinks.MarkdownSink).
+# Os módulos só são importados na primeira vez que a etapa é usada, de modo que uma execução
+# sem --summarize nunca carrega torch/transformers (e sem PDF, nem o PyMuPDF).
+STAGES: Dict[str, Tuple[str, str]] = {
+    "analysis": ("pdf.extractor", "extract_pdf_analysis"),
+    "images": ("pdf.images", "extract_pdf_images"),
+    "summary": ("llm.summarize", "generate_llm_summary"),
+}
+
+_LOADED: Dict[str, Callable[..., Any]] = {}
+
+def load_stage(name: str) -> Callable[..., Any]:
+    """
+    Retorna a função da etapa, importando seu módulo na primeira chamada.
+    """
+    stage = _LOADED.get(name)
+    if stage is None:
+        if name not in STAGES:
+            raise KeyError(f"Etapa desconhecida: '{name}'. Etapas disponíveis: {', '.join(STAGES)}")
+        module_name, function_name = STAGES[name]
+        stage = getattr(importlib.import_module(module_name), function_name)
+        _LOADED[name] = stage
+    return stage
+
+def run_stage(name: str, *args: Any, **kwargs: Any) -> Any:
+    """
+    Executa a etapa pelo nome (atalho para load_stage(name)(*args, **kwargs)).
+    """
+    return load_stage(name)(*args, **kwargs)
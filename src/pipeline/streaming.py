@@ -0,0 +1,377 @@
+import asyncio
+import contextlib
+import pathlib
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pipeline.batch import (
+    analyze_document, create_executor, extract_document_images, failed_result, format_status_line,
+    print_batch_summary, write_outputs
+)
+from pipeline.corpus import absorb_corpus_sketch
+from pipeline.search import absorb_page_terms
+from pipeline.stages import run_stage
+from llm.config import summary_config
+from cli.arguments import budget_from_args, inference_from_args
+from utils.profiling import Profiler
+from utils.cache import ResultCache, summary_cache_key
+from utils.sketches import CorpusSketch
+from utils.sinks import OutputSinks
+
+# Marca de fim de fluxo entre as etapas
+_DONE = None
+
+class DocumentState:
+    """
+    Documento em trânsito no pipeline: o resultado (mesmo formato do modo em lote) e,
+    com --profile, o profiler das etapas executadas no processo principal.
+    """
+
+    def __init__(self, result: Dict[str, Any], profile: bool):
+        self.result = result
+        self.profiler = Profiler() if profile else None
+
+    def stage(self, name: str):
+        # As etapas do processo principal rodam em threads concorrentes, então cada documento
+        # registra no próprio profiler (sem o profiler ativo global, que é um por processo)
+        return self.profiler.stage(name) if self.profiler is not None else contextlib.nullcontext({})
+
+    def finish(self) -> Dict[str, Any]:
+        if self.profiler is not None:
+            self.result.setdefault("profile", {}).update(self.profiler.to_dict())
+        return self.result
+
+class BoundedStage:
+    """
+    Fila limitada de entrada de uma etapa. put() bloqueia quando a fila está cheia, propagando a
+    contrapressão até a etapa anterior; o pico de ocupação é registrado para o relatório final.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.queue: "asyncio.Queue[Optional[DocumentState]]" = asyncio.Queue(maxsize)
+        self.high_water = 0
+
+    async def put(self, item: Optional[DocumentState]) -> None:
+        await self.queue.put(item)
+        # A marca de fim de fluxo não é um documento: não entra no pico de ocupação
+        if item is not _DONE:
+            self.high_water = max(self.high_water, self.queue.qsize())
+
+    async def get(self) -> Optional[DocumentState]:
+        return await self.queue.get()
+
+def _prestart_workers(executor: Executor) -> None:
+    # Com fork, o primeiro envio cria todos os workers: isso acontece antes de qualquer thread
+    # do pipeline começar a rodar (fork com threads ativas pode travar o processo filho)
+    executor.submit(abs, 0).result()
+
+def summarize_documents(
+    states: List[DocumentState],
+    model: Any,
+    tokenizer: Any,
+    args,
+    cache: Optional[ResultCache]
+) -> None:
+    """
+    Resume um micro-lote de documentos com o modelo residente. Documentos simples sem resumo em
+    cache compartilham uma única chamada a model.generate (summarize_batch); documentos longos e o
+    modo servidor seguem por generate_llm_summary, um documento por vez.
+    """
+    inference = inference_from_args(args)
+    config = summary_config(args.long_document, args.batch_size, args.max_chunk_tokens, inference)
+
+    pending: List[DocumentState] = []
+    for state in states:
+        full_text = state.result["analysis"].get("full_text", "")
+        state.result["summary"] = ""
+        # Sem modelo (falha no carregamento) e sem servidor, o relatório sai sem resumo
+        if not full_text or (model is None and not args.llm_server):
+            continue
+        pdf_digest = state.result.get("pdf_digest")
+        cached = cache.get(summary_cache_key(pdf_digest, config)) if cache is not None and pdf_digest else None
+        if cached is not None:
+            state.result["summary"] = cached["summary"]
+        else:
+            pending.append(state)
+
+    if not pending:
+        return
+
+    if args.llm_server or args.long_document or len(pending) == 1:
+        for state in pending:
+            start = time.perf_counter()
+            with state.stage("summary"):
+                try:
+                    state.result["summary"] = run_stage(
+                        "summary", state.result["analysis"]["full_text"], model, tokenizer,
+                        long_document=args.long_document,
+                        batch_size=args.batch_size,
+                        max_chunk_tokens=args.max_chunk_tokens,
+                        server_url=args.llm_server,
+                        inference=inference
+                    )
+                except Exception as e:
+                    # Falha de um documento não interrompe o micro-lote nem o pipeline
+                    state.result["summary"] = f"Erro: Falha ao gerar o resumo: {e}"
+            state.result["elapsed"] += time.perf_counter() - start
+    else:
+        from llm.model import set_inference_threads
+        from llm.summarize import context_token_budget, summarize_batch
+        set_inference_threads(inference["num_threads"])
+        start = time.perf_counter()
+        # Cada documento do micro-lote registra a chamada inteira como a sua etapa de resumo
+        with contextlib.ExitStack() as stack:
+            for state in pending:
+                stack.enter_context(state.stage("summary"))["batch_docs"] = len(pending)
+            try:
+                summaries, _, _ = summarize_batch(
+                    [state.result["analysis"]["full_text"] for state in pending],
+                    model, tokenizer, context_token_budget(tokenizer, model=model), inference["generation"]
+                )
+            except Exception as e:
+                summaries = [f"Erro: Falha ao gerar o resumo: {e}"] * len(pending)
+        elapsed = time.perf_counter() - start
+        for state, summary in zip(pending, summaries):
+            state.result["summary"] = summary
+            state.result["elapsed"] += elapsed
+
+    for state in pending:
+        summary = state.result["summary"]
+        pdf_digest = state.result.get("pdf_digest")
+        if cache is not None and pdf_digest and not summary.startswith("Erro:"):
+            cache.put(summary_cache_key(pdf_digest, config), {"summary": summary})
+
+class StreamingPipeline:
+    """
+    Pipeline assíncrono (asyncio) do modo em lote, com filas limitadas entre as etapas:
+
+        análise (pool de processos) -> imagens (thread) -> resumo (modelo residente, micro-lotes) -> relatório
+
+    Enquanto o modelo gera um resumo, os workers já analisam os próximos documentos e a thread de
+    imagens grava os arquivos. Um worker só recebe um novo documento depois de entregar o anterior à
+    fila seguinte, então, se o modelo for o gargalo, as filas enchem e a análise pausa: o número de
+    documentos em memória fica limitado a jobs + as capacidades das filas.
+    """
+
+    def __init__(
+        self,
+        args,
+        output_path: pathlib.Path,
+        cache: Optional[ResultCache],
+        model: Any,
+        tokenizer: Any,
+        corpus: Optional[CorpusSketch] = None,
+        index: Optional["IndexWriter"] = None,
+        sinks: Optional[OutputSinks] = None
+    ):
+        self.args = args
+        self.corpus = corpus
+        self.index = index
+        self.sinks = sinks
+        self.output_path = output_path
+        self.cache = cache
+        self.model = model
+        self.tokenizer = tokenizer
+        self.profile = args.profile or bool(args.profile_output)
+        # Com orçamento por documento, as imagens também são extraídas no worker isolado
+        self.isolated_images = budget_from_args(args) is not None
+        self.results: List[Dict[str, Any]] = []
+        self.completion_times: List[float] = []
+        self.stages: List[BoundedStage] = []
+
+    async def run(self, pdf_paths: List[pathlib.Path], executor: Executor) -> List[Dict[str, Any]]:
+        args = self.args
+        images = BoundedStage("imagens", args.queue_size)
+        self.stages = [images]
+        summary = report = None
+        if args.summarize:
+            summary = BoundedStage("resumo", args.queue_size)
+            report = BoundedStage("relatório", args.queue_size)
+            self.stages += [summary, report]
+
+        # fitz não é seguro entre threads: toda a extração de imagens roda numa única thread
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="images") as image_executor, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary") as summary_executor, \
+                ThreadPoolExecutor(max_workers=2, thread_name_prefix="report") as report_executor:
+            consumers = [asyncio.create_task(self._images(images, summary, image_executor))]
+            if args.summarize:
+                consumers.append(asyncio.create_task(self._summaries(summary, report, summary_executor)))
+                consumers.append(asyncio.create_task(self._reports(report, report_executor)))
+
+            await self._produce(pdf_paths, executor, images)
+            await asyncio.gather(*consumers)
+        return self.results
+
+    async def _produce(self, pdf_paths: List[pathlib.Path], executor: Executor, images: BoundedStage) -> None:
+        loop = asyncio.get_running_loop()
+        args = self.args
+        slots = asyncio.Semaphore(max(1, args.jobs))
+
+        async def analyze(pdf_path: pathlib.Path) -> None:
+            try:
+                result = await loop.run_in_executor(
+                    executor, analyze_document, pdf_path, self.output_path, args.summarize, self.cache,
+                    args.min_image_size, args.image_threads, self.profile, not args.no_page_cache,
+                    self.isolated_images, self.corpus is not None, self.index is not None
+                )
+            except Exception as e:
+                # Falha do worker (ex.: processo encerrado): registra e segue com o lote
+                result = failed_result(pdf_path, e)
+            # O esboço e as postings saem do resultado já aqui, para não atravessar as filas
+            absorb_corpus_sketch(result, self.corpus)
+            absorb_page_terms(result, self.index)
+            try:
+                # A vaga do worker só é liberada quando a fila seguinte aceita o documento
+                await images.put(DocumentState(result, self.profile))
+            finally:
+                slots.release()
+
+        tasks = []
+        for pdf_path in pdf_paths:
+            await slots.acquire()
+            tasks.append(asyncio.create_task(analyze(pdf_path)))
+        await asyncio.gather(*tasks)
+        await images.put(_DONE)
+
+    async def _images(self, images: BoundedStage, summary: Optional[BoundedStage], executor: ThreadPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        args = self.args
+        while (state := await images.get()) is not _DONE:
+            # Documentos que nem puderam ser lidos já voltam do worker com o erro em "images"
+            if "images" not in state.result:
+                def extract(state=state):
+                    with state.stage("images"):
+                        extract_document_images(
+                            state.result, self.output_path, self.cache,
+                            args.min_image_size, args.image_threads, not args.no_page_cache
+                        )
+                try:
+                    await loop.run_in_executor(executor, extract)
+                except Exception as e:
+                    # Registra a falha no documento e segue drenando a fila (senão o produtor trava)
+                    state.result["images"] = {"error": f"Erro fatal durante a extração de imagens: {e}"}
+
+            if summary is not None and "error" not in state.result["analysis"]:
+                await summary.put(state)
+            else:
+                self._complete(state)
+        if summary is not None:
+            await summary.put(_DONE)
+
+    async def _summaries(self, summary: BoundedStage, report: BoundedStage, executor: ThreadPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        args = self.args
+        max_wait = args.summary_wait_ms / 1000.0
+        done = False
+        while not done:
+            first = await summary.get()
+            if first is _DONE:
+                break
+
+            # Micro-lote: espera até summary_wait_ms por mais documentos prontos
+            batch = [first]
+            deadline = loop.time() + max_wait
+            while len(batch) < args.summary_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    state = await asyncio.wait_for(summary.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if state is _DONE:
+                    done = True
+                    break
+                batch.append(state)
+
+            try:
+                await loop.run_in_executor(
+                    executor, summarize_documents, batch, self.model, self.tokenizer, args, self.cache
+                )
+            except Exception as e:
+                # Falha fora do resumo de um documento (ex.: cache): os documentos sem resumo seguem com o erro
+                for state in batch:
+                    if not state.result.get("summary"):
+                        state.result["summary"] = f"Erro: Falha ao gerar o resumo: {e}"
+            for state in batch:
+                await report.put(state)
+        await report.put(_DONE)
+
+    async def _reports(self, report: BoundedStage, executor: ThreadPoolExecutor) -> None:
+        # Etapa final: grava o documento nos sinks (relatório Markdown, --json, --jsonl)
+        loop = asyncio.get_running_loop()
+        pending = set()
+
+        def write(state: DocumentState) -> Optional[str]:
+            # O relatório Markdown é um dos sinks: a gravação roda fora do loop, como as demais etapas
+            with state.stage("outputs"):
+                return self.sinks.write(state.finish()) if self.sinks else None
+
+        async def finish(state: DocumentState) -> None:
+            try:
+                error = await loop.run_in_executor(executor, write, state)
+            except Exception as e:
+                error = f"Erro ao gravar as saídas: {e}"
+            self._complete(state, written=True, output_error=error)
+
+        while (state := await report.get()) is not _DONE:
+            task = asyncio.create_task(finish(state))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+
+    def _complete(self, state: DocumentState, written: bool = False, output_error: Optional[str] = None) -> None:
+        result = state.finish()
+        print(format_status_line(result))
+        if not written:
+            write_outputs(result, self.sinks)
+        elif output_error:
+            print(f"[ERRO SAÍDA]: {pathlib.Path(result['file']).name}: {output_error}")
+        self.results.append(result)
+        self.completion_times.append(time.perf_counter())
+
+    def steady_docs_per_minute(self) -> Optional[float]:
+        """
+        Vazão em regime, excluindo o aquecimento do pipeline: os documentos concluídos depois do
+        primeiro micro-lote (que termina de uma vez), divididos pelo intervalo entre a conclusão
+        desse lote e a última conclusão. None se não houver documentos suficientes depois dele.
+        """
+        warmup = min(max(1, self.args.summary_batch if self.args.summarize else 1), len(self.completion_times))
+        if len(self.completion_times) <= warmup:
+            return None
+        interval = self.completion_times[-1] - self.completion_times[warmup - 1]
+        return (len(self.completion_times) - warmup) / interval * 60 if interval > 0 else None
+
+    def format_queue_stats(self) -> str:
+        return ", ".join(f"{stage.name} {stage.high_water}/{stage.maxsize}" for stage in self.stages)
+
+def run_streaming_batch(
+    args,
+    pdf_paths: List[pathlib.Path],
+    output_path: pathlib.Path,
+    cache: Optional[ResultCache],
+    model: Any,
+    tokenizer: Any,
+    corpus: Optional[CorpusSketch] = None,
+    index: Optional["IndexWriter"] = None,
+    sinks: Optional[OutputSinks] = None
+) -> List[Dict[str, Any]]:
+    """
+    Executa o lote pelo pipeline assíncrono (batch --pipeline) e imprime o resumo do lote com a
+    vazão total e em regime (documentos/minuto) e o pico de ocupação de cada fila.
+    """
+    pipeline = StreamingPipeline(args, output_path, cache, model, tokenizer, corpus, index, sinks)
+    start = time.perf_counter()
+    with create_executor(args) as executor:
+        _prestart_workers(executor)
+        results = asyncio.run(pipeline.run(pdf_paths, executor))
+
+    print_batch_summary(results, time.perf_counter() - start)
+    steady = pipeline.steady_docs_per_minute()
+    if steady is not None:
+        print(f"[PIPELINE]: Vazão em regime: {steady:.1f} documentos/minuto")
+    print(f"[PIPELINE]: Pico das filas (ocupação/limite): {pipeline.format_queue_stats()}")
+    return results
@@ -0,0 +1,190 @@
+import contextlib
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional
+
+# Orçamento ativo no processo (um por vez); as etapas consultam via budget_page/budget_text/budget_image
+_ACTIVE_GUARD: Optional["BudgetGuard"] = None
+
+LIMIT_LABELS = {
+    "timeout": "tempo total",
+    "page_time": "tempo por página",
+    "rss": "memória (RSS)",
+    "images": "imagens",
+    "text_bytes": "texto",
+}
+LIMIT_UNITS = {"timeout": "s", "page_time": "s", "rss": "MB", "images": "", "text_bytes": "bytes"}
+STAGE_LABELS = {"open": "abertura", "analysis": "análise", "images": "imagens"}
+
+class DocumentBudget(NamedTuple):
+    """
+    Limites de processamento de um documento; None = sem limite.
+    """
+    timeout_s: Optional[float] = None # Tempo de parede total do documento
+    page_timeout_s: Optional[float] = None # Tempo de parede de cada página (análise ou imagens)
+    max_rss_mb: Optional[float] = None # Memória residente do processo worker
+    max_images: Optional[int] = None # Imagens extraídas (arquivos distintos)
+    max_text_bytes: Optional[int] = None # Texto extraído (UTF-8)
+
+    @property
+    def enabled(self) -> bool:
+        return any(value is not None for value in self)
+
+def budget_reason(
+    limit: str,
+    stage: str,
+    value: float,
+    budget: float,
+    page: Optional[int] = None,
+    action: str = "stopped"
+) -> Dict[str, Any]:
+    """
+    Motivo estruturado de um orçamento excedido. page é o número da página (1 = primeira);
+    action é "stopped" (parada cooperativa, com resultados parciais) ou "killed" (worker encerrado).
+    """
+    return {
+        "limit": limit,
+        "stage": stage,
+        "page": page,
+        "value": round(value, 3) if isinstance(value, float) else value,
+        "budget": budget,
+        "action": action,
+    }
+
+def format_budget_reason(reason: Dict[str, Any]) -> str:
+    unit = LIMIT_UNITS.get(reason["limit"], "")
+    where = STAGE_LABELS.get(reason["stage"], reason["stage"])
+    if reason.get("page"):
+        where += f", página {reason['page']}"
+    action = "worker encerrado" if reason.get("action") == "killed" else "interrompido"
+    return (
+        f"{LIMIT_LABELS.get(reason['limit'], reason['limit'])} excedido ({where}): "
+        f"{reason['value']} {unit} > {reason['budget']} {unit} ({action})"
+    ).replace("  ", " ")
+
+class BudgetExceeded(Exception):
+    """
+    Orçamento excedido. partial traz os resultados já concluídos quando o worker é encerrado.
+    """
+
+    def __init__(self, reason: Dict[str, Any], partial: Optional[Dict[str, Any]] = None):
+        super().__init__(format_budget_reason(reason))
+        self.reason = reason
+        self.partial = partial or {}
+
+    def __reduce__(self):
+        return (BudgetExceeded, (self.reason, self.partial))
+
+def is_truncated(result: Dict[str, Any]) -> bool:
+    """
+    Resultado de documento interrompido por orçamento (parada cooperativa ou worker encerrado).
+    Seus dados parciais não devem alimentar estruturas que reconhecem o documento pelo hash
+    (índice invertido) nem as estatísticas do corpus.
+    """
+    return "budget_exceeded" in result or "budget_exceeded" in result.get("analysis", {})
+
+def process_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """
+    Memória residente atual do processo (não o pico), lida de /proc; None onde não há /proc.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm", 'rb') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+class BudgetGuard:
+    """
+    Verificações cooperativas feitas pelas etapas entre páginas e antes de cada imagem. Um limite
+    excedido lança BudgetExceeded, que a etapa captura para devolver o resultado parcial.
+    Com reporter, o progresso (página em andamento) e os resultados parciais são enviados ao
+    processo supervisor (ver pipeline/isolation.py), que encerra o worker se ele não parar a tempo.
+    """
+
+    def __init__(self, budget: DocumentBudget, reporter: Optional[Callable[[tuple], None]] = None):
+        self.budget = budget
+        self.reporter = reporter
+        self.start = time.monotonic()
+        self.text_bytes = 0
+        self.images = 0
+
+    def report(self, *message: Any) -> None:
+        if self.reporter is not None:
+            self.reporter(message)
+
+    @contextlib.contextmanager
+    def page(self, stage: str, page_number: int) -> Iterator[None]:
+        self.report("page", stage, page_number)
+        start = time.monotonic()
+        yield
+        self.check(stage, page_number, time.monotonic() - start)
+
+    def check(self, stage: str, page_number: Optional[int] = None, page_elapsed: Optional[float] = None) -> None:
+        budget = self.budget
+        page = page_number + 1 if page_number is not None else None
+        if budget.page_timeout_s is not None and page_elapsed is not None and page_elapsed > budget.page_timeout_s:
+            raise BudgetExceeded(budget_reason("page_time", stage, page_elapsed, budget.page_timeout_s, page))
+        elapsed = time.monotonic() - self.start
+        if budget.timeout_s is not None and elapsed > budget.timeout_s:
+            raise BudgetExceeded(budget_reason("timeout", stage, elapsed, budget.timeout_s, page))
+        if budget.max_rss_mb is not None:
+            rss = process_rss_mb()
+            if rss is not None and rss > budget.max_rss_mb:
+                raise BudgetExceeded(budget_reason("rss", stage, rss, budget.max_rss_mb, page))
+
+    def add_text(self, stage: str, page_number: int, text: str) -> None:
+        if self.budget.max_text_bytes is None:
+            return
+        total = self.text_bytes + len(text.encode('utf-8'))
+        if total > self.budget.max_text_bytes:
+            raise BudgetExceeded(budget_reason("text_bytes", stage, total, self.budget.max_text_bytes, page_number + 1))
+        self.text_bytes = total
+
+    def add_image(self, stage: str, page_number: int) -> None:
+        if self.budget.max_images is None:
+            return
+        if self.images >= self.budget.max_images:
+            raise BudgetExceeded(budget_reason("images", stage, self.images + 1, self.budget.max_images, page_number + 1))
+        self.images += 1
+
+@contextlib.contextmanager
+def activate_budget(budget: DocumentBudget, reporter: Optional[Callable[[tuple], None]] = None) -> Iterator[BudgetGuard]:
+    """
+    Torna o orçamento o ativo do processo enquanto o bloco (o processamento de um documento) executa.
+    """
+    global _ACTIVE_GUARD
+    previous = _ACTIVE_GUARD
+    _ACTIVE_GUARD = BudgetGuard(budget, reporter)
+    try:
+        yield _ACTIVE_GUARD
+    finally:
+        _ACTIVE_GUARD = previous
+
+def budget_page(stage: str, page_number: int):
+    """
+    Delimita o processamento de uma página (page_number começa em 0); sem orçamento ativo,
+    é um contexto vazio de custo mínimo. Ao final da página, verifica tempo da página, tempo total e RSS.
+    """
+    guard = _ACTIVE_GUARD
+    if guard is None:
+        return contextlib.nullcontext()
+    return guard.page(stage, page_number)
+
+def budget_text(stage: str, page_number: int, text: str) -> None:
+    # Antes de acumular o texto da página: a página que estoura o limite fica de fora
+    if _ACTIVE_GUARD is not None:
+        _ACTIVE_GUARD.add_text(stage, page_number, text)
+
+def budget_image(stage: str, page_number: int) -> None:
+    # Antes de decodificar uma nova imagem
+    if _ACTIVE_GUARD is not None:
+        _ACTIVE_GUARD.add_image(stage, page_number)
+
+def report_partial(key: str, value: Any) -> None:
+    """
+    Envia ao supervisor um resultado já concluído (ex.: a análise, antes das imagens), devolvido
+    como resultado parcial se o worker for encerrado depois.
+    """
+    if _ACTIVE_GUARD is not None:
+        _ACTIVE_GUARD.report("partial", key, value)
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import pathlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.files import atomic_write_bytes
+from utils.text import STOPWORDS_PT
+
+# Versão do formato das entradas; mudar invalida todo o cache existente
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = pathlib.Path.home() / ".cache" / "pdf-processor-llm"
+DEFAULT_CACHE_MAX_MB = 512
+
+def make_cache_key(pdf_digest: str, stage: str, config: Dict[str, Any]) -> str:
+    """
+    Chave endereçada por conteúdo: hash do PDF + etapa + configuração que afeta o resultado.
+    """
+    material = json.dumps(
+        {"version": CACHE_VERSION, "pdf": pdf_digest, "stage": stage, "config": config},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+def stopwords_fingerprint() -> str:
+    """
+    Hash do conjunto de stopwords (afeta as palavras mais comuns).
+    """
+    return hashlib.sha256("\n".join(sorted(STOPWORDS_PT)).encode('utf-8')).hexdigest()[:16]
+
+def analysis_cache_key(
+    pdf_digest: str,
+    with_full_text: bool = True,
+    corpus_sketch: bool = False,
+    page_terms: bool = False
+) -> str:
+    # O texto completo só é guardado quando o resumo vai precisar dele;
+    # "outline" distingue as entradas que já trazem a hierarquia de títulos (title_outline);
+    # "text_flags", as analisadas com as flags padrão do get_text() (ver pdf/extractor.parse_page)
+    config: Dict[str, Any] = {
+        "stopwords": stopwords_fingerprint(), "full_text": with_full_text, "outline": True, "text_flags": True
+    }
+    if corpus_sketch:
+        # O esboço depende da capacidade e da precisão; entradas sem esboço mantêm a chave anterior
+        from utils.sketches import SKETCH_VERSION, DEFAULT_HEAVY_HITTERS, DEFAULT_HLL_PRECISION
+        config["corpus_sketch"] = [SKETCH_VERSION, DEFAULT_HEAVY_HITTERS, DEFAULT_HLL_PRECISION]
+    if page_terms:
+        # As frequências por página para o índice invertido só são guardadas quando pedidas
+        config["page_terms"] = True
+    return make_cache_key(pdf_digest, "analysis", config)
+
+def images_cache_key(pdf_digest: str, output_dir_base: pathlib.Path, min_size: int = 0) -> str:
+    # O manifesto aponta para arquivos dentro do diretório de saída
+    return make_cache_key(
+        pdf_digest, "images",
+        {"output_directory": str(pathlib.Path(output_dir_base).resolve()), "min_size": min_size}
+    )
+
+def summary_cache_key(pdf_digest: str, summary_config: Dict[str, Any]) -> str:
+    # summary_config: modelo, parâmetros de geração e modo (ver llm.config.summary_config)
+    return make_cache_key(pdf_digest, "summary", summary_config)
+
+def images_files_exist(images_results: Dict[str, Any]) -> bool:
+    """
+    Um manifesto de imagens em cache só é válido se os arquivos ainda existirem no disco.
+    """
+    return all(pathlib.Path(p).exists() for p in images_results.get("image_files", []))
+
+def open_cache(cache_dir: Optional[str], max_mb: int = DEFAULT_CACHE_MAX_MB, enabled: bool = True) -> Optional["ResultCache"]:
+    """
+    Cria o cache a partir das opções da CLI; retorna None se desativado (--no-cache).
+    """
+    if not enabled:
+        return None
+    return ResultCache(pathlib.Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR, max_mb * 1024 * 1024)
+
+class ResultCache:
+    """
+    Cache em disco de resultados JSON, com política LRU limitada por tamanho.
+    Cada entrada é um arquivo gravado atomicamente; o mtime marca o último uso.
+    O tamanho total é lido do disco uma vez, ao abrir, e depois mantido a cada gravação; o
+    diretório só é percorrido de novo quando esse total passa de max_bytes.
+    """
+
+    def __init__(self, cache_dir: pathlib.Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.total_bytes = sum(size for _, size, _ in self._scan())
+
+    def _entry_path(self, key: str) -> pathlib.Path:
+        # Subdiretórios por prefixo evitam diretórios com milhares de arquivos
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def contains(self, key: str) -> bool:
+        return self._entry_path(key).exists()
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            # Marca o uso recente para a política LRU
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # Ausente, removido por outro processo ou corrompido: trata como falta
+            return None
+        return value
+
+    def put(self, key: str, value: Any, evict: bool = True) -> None:
+        """
+        Grava a entrada. Com evict=False, a limpeza LRU fica para uma chamada posterior a evict()
+        (útil para gravar muitas entradas pequenas, como as do cache de páginas).
+        """
+        path = self._entry_path(key)
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        try:
+            # Uma entrada regravada substitui o tamanho anterior
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        atomic_write_bytes(path, data)
+        self.total_bytes += len(data) - replaced
+        if evict:
+            self.evict()
+
+    def _scan(self) -> List[Tuple[float, int, pathlib.Path]]:
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> None:
+        """
+        Remove as entradas menos usadas recentemente até o cache caber em max_bytes. Só percorre
+        o diretório se o total mantido passou do limite; a varredura também corrige o total
+        (outros processos gravam e removem entradas no mesmo diretório).
+        """
+        if self.total_bytes <= self.max_bytes:
+            return
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.total_bytes = total
+
+def cached_call(
+    cache: Optional[ResultCache],
+    key: Optional[str],
+    compute: Callable[[], Any],
+    is_valid: Callable[[Any], bool] = lambda value: True,
+    should_store: Callable[[Any], bool] = lambda value: True
+) -> Any:
+    """
+    Retorna o valor do cache se existir e for válido; caso contrário, calcula e armazena.
+    Sem cache (cache=None), apenas calcula.
+    """
+    if cache is None or key is None:
+        return compute()
+
+    value = cache.get(key)
+    if value is not None and is_valid(value):
+        return value
+
+    value = compute()
+    if should_store(value):
+        cache.put(key, value)
+    return value
@@ -1,23 +1,48 @@
+import contextlib
+import os
 import pathlib
-from typing import Optional
+import tempfile
+from typing import IO, Iterator, Optional
 
-def get_file_size_bytes(file_path: pathlib.Path) -> Optional[int]:
+# Permissões dos arquivos gravados atomicamente (as de um open() comum com a umask usual 022).
+# A umask do processo não é consultada: os.umask só pode ser lida trocando o valor, o que afetaria
+# arquivos criados por outras threads nesse intervalo
+ATOMIC_FILE_MODE = 0o644
+
+@contextlib.contextmanager
+def atomic_open(file_path: pathlib.Path, mode: str = 'w', encoding: Optional[str] = 'utf-8') -> Iterator[IO]:
     """
-    Retorna o tamanho do arquivo em bytes.
-    
-    Lança FileNotFoundError se o arquivo não existir.
+    Abre um arquivo para escrita atômica: o conteúdo vai para um temporário no mesmo diretório,
+    renomeado sobre o destino só quando o bloco termina sem erro. Permite escrever em partes
+    (streaming) sem que leitores concorrentes vejam um arquivo parcialmente escrito.
     """
-    if not isinstance(file_path, pathlib.Path):
-        # Converte para Path se for uma string 
-        file_path = pathlib.Path(file_path)
+    file_path = pathlib.Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
     try:
-        # Usando o método .stat() para obter informações sobre o arquivo, incluindo o tamanho
-        file_size = file_path.stat().st_size
-        return file_size
-    except FileNotFoundError:
-        print(f"ERRO: Arquivo não encontrado no caminho: {file_path}")
-        return None
-    except Exception as e:
-        # Captura outros erros, como permissão negada
-        print(f"ERRO inesperado ao acessar o arquivo {file_path}: {e}")
-        return None
\ No newline at end of file
+        # mkstemp cria o arquivo só para o dono (0600); o destino recebe as permissões fixas
+        os.fchmod(fd, ATOMIC_FILE_MODE)
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+        os.replace(tmp_name, file_path)
+    except BaseException:
+        # Remove o temporário se a escrita ou a renomeação falhar
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+def atomic_write_bytes(file_path: pathlib.Path, data: bytes) -> None:
+    """
+    Grava o arquivo de forma atômica: escreve num temporário no mesmo diretório e renomeia.
+    Leitores concorrentes nunca veem um arquivo parcialmente escrito.
+    """
+    with atomic_open(file_path, 'wb') as f:
+        f.write(data)
+
+def atomic_write_text(file_path: pathlib.Path, text: str, encoding: str = 'utf-8') -> None:
+    """
+    Versão texto de atomic_write_bytes.
+    """
+    atomic_write_bytes(file_path, text.encode(encoding))
@@ -0,0 +1,538 @@
+import fcntl
+import json
+import math
+import mmap
+import pathlib
+from array import array
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.cache import stopwords_fingerprint
+from utils.files import atomic_write_bytes, atomic_write_text
+from utils.text import clean_and_tokenize, is_counted_word
+
+# Versão do formato em disco; índices de versões diferentes precisam ser reconstruídos
+INDEX_VERSION = 1
+
+# Postings acumuladas em memória antes de gravar um novo segmento
+DEFAULT_FLUSH_POSTINGS = 1_000_000
+
+# Saturação da frequência do termo no BM25 (sem normalização pelo tamanho da página)
+BM25_K1 = 1.2
+
+MANIFEST_FILE = "manifest.json"
+DOCUMENTS_FILE = "documents.jsonl"
+OFFSETS_FILE = "documents.offsets"
+LOCK_FILE = "index.lock"
+SEGMENT_SUFFIXES = (".terms", ".table", ".postings")
+
+Postings = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def normalize_query(text: str) -> List[str]:
+    """
+    Termos da consulta com a mesma normalização das palavras indexadas (clean_and_tokenize +
+    is_counted_word), sem repetição e na ordem da consulta.
+    """
+    return [token for token in dict.fromkeys(clean_and_tokenize(text)) if is_counted_word(token)]
+
+def encode_varints(values: np.ndarray) -> Tuple[bytes, np.ndarray]:
+    """
+    Codifica inteiros não negativos em varint (7 bits por byte, bit alto = continua), de forma vetorizada.
+    Retorna os bytes e o comprimento de cada valor.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        lengths += values >= np.uint64(1 << shift)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max(initial=0))):
+        mask = lengths > k
+        chunk = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        continues = (lengths[mask] - 1 > k).astype(np.uint64) << np.uint64(7)
+        out[starts[mask] + k] = chunk | continues
+    return out.tobytes(), lengths
+
+def decode_varints(data: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Inverso de encode_varints: retorna os valores (int64) e o byte inicial de cada um.
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)) * 7
+    values = np.add.reduceat((raw & 0x7F).astype(np.uint64) << shifts.astype(np.uint64), starts)
+    return values.astype(np.int64), starts
+
+def _segmented_cumsum(values: np.ndarray, group_starts: np.ndarray) -> np.ndarray:
+    # Soma acumulada que recomeça em cada posição marcada em group_starts (a primeira deve estar marcada)
+    total = np.cumsum(values)
+    base = (total - values)[group_starts]
+    return total - base[np.cumsum(group_starts) - 1]
+
+def encode_postings(terms: np.ndarray, docs: np.ndarray, pages: np.ndarray, freqs: np.ndarray) -> Tuple[bytes, np.ndarray]:
+    """
+    Codifica postings ordenadas por (termo, documento, página) como triplas varint
+    (salto de documento, página ou salto de página, frequência). O salto de documento parte de -1
+    no início de cada termo; salto 0 = mesmo documento, e aí a página também vem como salto.
+    Retorna os bytes e o deslocamento de cada termo (com sentinela no final).
+    """
+    first_of_term = np.ones(len(terms), dtype=bool)
+    first_of_term[1:] = terms[1:] != terms[:-1]
+    previous_doc = np.concatenate(([-1], docs[:-1]))
+    previous_doc[first_of_term] = -1
+    doc_gaps = docs - previous_doc
+    previous_page = np.concatenate(([0], pages[:-1]))
+    page_values = np.where(doc_gaps == 0, pages - previous_page, pages)
+
+    data, lengths = encode_varints(np.stack([doc_gaps, page_values, freqs], axis=1).ravel())
+    posting_ends = np.cumsum(lengths.reshape(-1, 3).sum(axis=1))
+    posting_starts = np.concatenate(([0], posting_ends))
+    offsets = np.concatenate((posting_starts[np.flatnonzero(first_of_term)], [posting_starts[-1]]))
+    return data, offsets
+
+def _decode_triples(values: np.ndarray, term_starts: np.ndarray) -> Postings:
+    triples = values.reshape(-1, 3)
+    doc_gaps, page_values, freqs = triples[:, 0], triples[:, 1], triples[:, 2]
+    docs = _segmented_cumsum(doc_gaps, term_starts) - 1
+    pages = _segmented_cumsum(page_values, doc_gaps > 0)
+    return docs, pages, freqs
+
+def decode_postings(data: Any) -> Postings:
+    """
+    Inverso de encode_postings para as postings de um único termo: (documentos, páginas, frequências).
+    """
+    values, _ = decode_varints(data)
+    term_starts = np.zeros(len(values) // 3, dtype=bool)
+    term_starts[:1] = True
+    return _decode_triples(values, term_starts)
+
+def decode_segment(data: Any, term_offsets: np.ndarray) -> Tuple[np.ndarray, Postings]:
+    """
+    Decodifica as postings de um segmento inteiro; term_offsets são os deslocamentos em bytes do
+    início de cada termo. Retorna o índice do termo de cada posting e as postings.
+    """
+    values, starts = decode_varints(data)
+    term_starts = np.isin(starts[0::3], term_offsets)
+    return np.cumsum(term_starts) - 1, _decode_triples(values, term_starts)
+
+class _Segment:
+    """
+    Segmento imutável, lido por mmap: termos ordenados (bytes UTF-8 concatenados), tabela
+    uint64 (deslocamento do termo, deslocamento das postings, frequência de documento por página)
+    com uma linha sentinela, e as postings codificadas.
+    """
+
+    def __init__(self, prefix: pathlib.Path):
+        self._maps = []
+        terms, table, postings = (self._map(prefix.with_suffix(suffix)) for suffix in SEGMENT_SUFFIXES)
+        self.terms = terms
+        self.postings = postings
+        self.table = np.frombuffer(table, dtype=np.uint64).reshape(-1, 3)
+
+    def _map(self, path: pathlib.Path) -> mmap.mmap:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def __len__(self) -> int:
+        return len(self.table) - 1
+
+    def term(self, i: int) -> bytes:
+        return self.terms[int(self.table[i, 0]):int(self.table[i + 1, 0])]
+
+    def find(self, term: bytes) -> Optional[int]:
+        # Busca binária sobre os termos ordenados, sem carregar o dicionário
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self) and self.term(lo) == term else None
+
+    def term_postings(self, i: int) -> Postings:
+        return decode_postings(self.postings[int(self.table[i, 1]):int(self.table[i + 1, 1])])
+
+    def all_terms(self) -> List[str]:
+        blob = self.terms[:]
+        offsets = self.table[:, 0].tolist()
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(self))]
+
+    def all_postings(self) -> Tuple[np.ndarray, Postings]:
+        """
+        Todas as postings do segmento, com o índice do termo de cada uma (para a compactação).
+        """
+        return decode_segment(self.postings[:], self.table[:-1, 1].astype(np.int64))
+
+    def close(self) -> None:
+        self.table = None
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+def _read_manifest(index_dir: pathlib.Path) -> Dict[str, Any]:
+    path = index_dir / MANIFEST_FILE
+    if not path.exists():
+        return {
+            "version": INDEX_VERSION, "stopwords": stopwords_fingerprint(), "segments": [], "next_segment": 1,
+            "next_doc_id": 0, "deleted": [], "documents": 0, "pages": 0,
+        }
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("version") != INDEX_VERSION:
+        raise ValueError(f"Versão de índice não suportada: {manifest.get('version')} (reconstrua o índice).")
+    if manifest.get("stopwords") != stopwords_fingerprint():
+        raise ValueError("As stopwords mudaram desde a criação do índice (reconstrua o índice).")
+    return manifest
+
+class InvertedIndex:
+    """
+    Leitura do índice invertido termo -> (documento, página, frequência), sem abrir nenhum PDF.
+    Os segmentos são mapeados em memória; uma consulta decodifica só as postings dos seus termos.
+    """
+
+    def __init__(self, index_dir: pathlib.Path):
+        self.index_dir = pathlib.Path(index_dir)
+        if not (self.index_dir / MANIFEST_FILE).exists():
+            raise FileNotFoundError(f"Índice não encontrado em: {self.index_dir}")
+        try:
+            self._open_segments()
+        except FileNotFoundError:
+            # Uma compactação concorrente trocou os segmentos entre a leitura do manifesto e a abertura
+            self._open_segments()
+        self.deleted = np.array(self.manifest["deleted"], dtype=np.int64)
+
+    def _open_segments(self) -> None:
+        self.manifest = _read_manifest(self.index_dir)
+        self.segments = []
+        for name in self.manifest["segments"]:
+            self.segments.append(_Segment(self.index_dir / name))
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    def __enter__(self) -> "InvertedIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def document_count(self) -> int:
+        return self.manifest["documents"]
+
+    @property
+    def page_count(self) -> int:
+        return self.manifest["pages"]
+
+    def postings(self, term: str) -> Postings:
+        """
+        Postings do termo em todos os segmentos (ordenadas por documento e página), sem os documentos removidos.
+        """
+        key = term.encode('utf-8')
+        parts = []
+        for segment in self.segments:
+            i = segment.find(key)
+            if i is not None:
+                parts.append(segment.term_postings(i))
+        if not parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        docs, pages, freqs = (np.concatenate(column) for column in zip(*parts))
+        if len(self.deleted):
+            live = ~np.isin(docs, self.deleted)
+            docs, pages, freqs = docs[live], pages[live], freqs[live]
+        return docs, pages, freqs
+
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        # A tabela de deslocamentos dá acesso direto à linha do documento, sem ler o arquivo todo
+        offsets = np.fromfile(self.index_dir / OFFSETS_FILE, dtype=np.uint64, count=2, offset=8 * doc_id)
+        with open(self.index_dir / DOCUMENTS_FILE, 'rb') as f:
+            f.seek(int(offsets[0]))
+            return json.loads(f.read(int(offsets[1] - offsets[0])))
+
+    def search(self, text: str, limit: int = 10, require_all: bool = False, pages_per_document: int = 3) -> Dict[str, Any]:
+        """
+        Consulta por palavras-chave. Cada página recebe a soma, sobre os termos, de
+        idf * tf * (k1 + 1) / (tf + k1) (BM25 sem normalização de comprimento, com as páginas como
+        unidades); o documento soma as pontuações das suas páginas. Com require_all, só contam as
+        páginas que têm todos os termos.
+        """
+        terms = normalize_query(text)
+        result: Dict[str, Any] = {"terms": terms, "hits": [], "matched_documents": 0, "matched_pages": 0}
+        if not terms:
+            return result
+
+        keys, scores = [], []
+        total_pages = max(1, self.page_count)
+        for term in terms:
+            docs, pages, freqs = self.postings(term)
+            if not len(docs):
+                if require_all:
+                    return result
+                continue
+            df = len(docs)
+            idf = math.log(1 + (total_pages - df + 0.5) / (df + 0.5))
+            keys.append((docs << 32) | pages)
+            scores.append(idf * freqs * (BM25_K1 + 1) / (freqs + BM25_K1))
+        if not keys:
+            return result
+
+        page_keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        page_scores = np.bincount(inverse, weights=np.concatenate(scores))
+        if require_all:
+            # Um termo aparece no máximo uma vez por página
+            matched = np.bincount(inverse) == len(terms)
+            page_keys, page_scores = page_keys[matched], page_scores[matched]
+
+        page_docs = page_keys >> 32
+        doc_ids, doc_of_page = np.unique(page_docs, return_inverse=True)
+        doc_scores = np.bincount(doc_of_page, weights=page_scores, minlength=len(doc_ids))
+        result["matched_documents"] = len(doc_ids)
+        result["matched_pages"] = len(page_keys)
+
+        # Desempate estável: documentos mais antigos no índice primeiro; páginas em ordem
+        for rank in np.argsort(-doc_scores, kind='stable')[:limit]:
+            in_doc = np.flatnonzero(doc_of_page == rank)
+            best = in_doc[np.argsort(-page_scores[in_doc], kind='stable')[:pages_per_document]]
+            document = self.document(int(doc_ids[rank]))
+            result["hits"].append({
+                "file": document["path"],
+                "name": document["name"],
+                "score": round(float(doc_scores[rank]), 4),
+                "matched_pages": len(in_doc),
+                "pages": [
+                    {"page": int(page_keys[i] & 0xFFFFFFFF) + 1, "score": round(float(page_scores[i]), 4)}
+                    for i in best
+                ],
+            })
+        return result
+
+class IndexWriter:
+    """
+    Escrita incremental do índice (um escritor por vez, com trava de arquivo). Cada flush grava
+    um novo segmento imutável com as postings acumuladas e só então troca o manifesto
+    atomicamente; leitores sempre veem um estado completo. Documentos removidos (ou substituídos
+    por uma nova versão do arquivo) viram lápides até a compactação, que reescreve tudo num só segmento.
+    """
+
+    def __init__(self, index_dir: pathlib.Path, flush_postings: int = DEFAULT_FLUSH_POSTINGS):
+        self.index_dir = pathlib.Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_postings = flush_postings
+        self._lock = open(self.index_dir / LOCK_FILE, 'a+b')
+        try:
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self.manifest = _read_manifest(self.index_dir)
+        except BlockingIOError:
+            self._lock.close()
+            raise RuntimeError(f"Índice em uso por outro processo: {self.index_dir}")
+        except BaseException:
+            self._lock.close()
+            raise
+        self._load_documents()
+        self._reset_buffer()
+        self._dirty = False
+
+    def _load_documents(self) -> None:
+        # Linhas além de next_doc_id vêm de um flush interrompido e são descartadas
+        count = self.manifest["next_doc_id"]
+        offsets_path = self.index_dir / OFFSETS_FILE
+        offsets = np.fromfile(offsets_path, dtype=np.uint64).tolist() if offsets_path.exists() else []
+        self._offsets = offsets[:count + 1] if offsets else [0]
+        deleted = set(self.manifest["deleted"])
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        documents_path = self.index_dir / DOCUMENTS_FILE
+        with open(documents_path, 'a+b') as f:
+            f.truncate(self._offsets[-1])
+            f.seek(0)
+            for doc_id in range(count):
+                # Documentos removidos e já compactados ficam como "null" (os ids são estáveis)
+                document = json.loads(f.readline())
+                if document is not None and doc_id not in deleted:
+                    self._documents[document["path"]] = dict(document, id=doc_id)
+        self._remove_orphan_segments()
+
+    def _remove_orphan_segments(self) -> None:
+        # Segmentos fora do manifesto vêm de um flush ou compactação interrompidos
+        live = set(self.manifest["segments"])
+        for path in self.index_dir.glob("seg-*"):
+            if path.stem not in live:
+                path.unlink(missing_ok=True)
+
+    def _reset_buffer(self) -> None:
+        self._term_ids: Dict[str, int] = {}
+        self._terms = array('q')
+        self._docs = array('q')
+        self._pages = array('q')
+        self._freqs = array('q')
+        self._pending_documents: List[bytes] = []
+
+    def __enter__(self) -> "IndexWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def contains(self, path: str, digest: Optional[str] = None) -> bool:
+        """
+        Verdadeiro se o arquivo já está indexado (com digest, na mesma versão do conteúdo).
+        """
+        document = self._documents.get(str(pathlib.Path(path).resolve()))
+        return document is not None and (digest is None or document["digest"] == digest)
+
+    def add_document(self, path: str, digest: Optional[str], page_terms: Sequence[Mapping[str, int]]) -> bool:
+        """
+        Indexa as frequências de termos de cada página (analysis["page_terms"]). Um arquivo já
+        indexado com o mesmo conteúdo é mantido; com conteúdo diferente (ou sem digest), a versão
+        anterior é removida. Retorna False se nada mudou.
+        """
+        key = str(pathlib.Path(path).resolve())
+        if digest is not None and self.contains(key, digest):
+            return False
+        self.remove_document(key)
+
+        doc_id = self.manifest["next_doc_id"]
+        self.manifest["next_doc_id"] += 1
+        document = {"path": key, "name": pathlib.Path(path).name, "digest": digest, "pages": len(page_terms)}
+        self._pending_documents.append((json.dumps(document, ensure_ascii=False) + "\n").encode('utf-8'))
+        self._documents[key] = dict(document, id=doc_id)
+        self.manifest["documents"] += 1
+        self.manifest["pages"] += len(page_terms)
+
+        term_ids = self._term_ids
+        for page_num, terms in enumerate(page_terms):
+            for term, freq in terms.items():
+                self._terms.append(term_ids.setdefault(term, len(term_ids)))
+                self._docs.append(doc_id)
+                self._pages.append(page_num)
+                self._freqs.append(freq)
+        self._dirty = True
+
+        if len(self._docs) >= self.flush_postings:
+            self.flush()
+        return True
+
+    def remove_document(self, path: str) -> bool:
+        """
+        Remove o arquivo do índice (lápide: as postings somem das consultas e da próxima compactação).
+        """
+        document = self._documents.pop(str(pathlib.Path(path).resolve()), None)
+        if document is None:
+            return False
+        self.manifest["deleted"].append(document["id"])
+        self.manifest["documents"] -= 1
+        self.manifest["pages"] -= document["pages"]
+        self._dirty = True
+        return True
+
+    def _write_segment(self, terms: List[str], term_ids: np.ndarray, docs: np.ndarray, pages: np.ndarray, freqs: np.ndarray) -> str:
+        # Termos em ordem de bytes UTF-8 (a mesma da busca binária); postings por (termo, documento, página)
+        encoded = [term.encode('utf-8') for term in terms]
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        term_ranks = rank[term_ids]
+        sort = np.lexsort((pages, docs, term_ranks))
+        data, posting_offsets = encode_postings(term_ranks[sort], docs[sort], pages[sort], freqs[sort])
+
+        sorted_terms = [encoded[i] for i in order]
+        term_offsets = np.concatenate(([0], np.cumsum([len(term) for term in sorted_terms], dtype=np.int64)))
+        table = np.zeros((len(sorted_terms) + 1, 3), dtype=np.uint64)
+        table[:, 0] = term_offsets
+        table[:, 1] = posting_offsets
+        table[:-1, 2] = np.diff(np.flatnonzero(np.concatenate((
+            [True], term_ranks[sort][1:] != term_ranks[sort][:-1], [True]
+        ))))
+
+        name = f"seg-{self.manifest['next_segment']:06d}"
+        self.manifest["next_segment"] += 1
+        prefix = self.index_dir / name
+        for suffix, content in zip(SEGMENT_SUFFIXES, (b"".join(sorted_terms), table.tobytes(), data)):
+            atomic_write_bytes(prefix.with_suffix(suffix), content)
+        return name
+
+    def flush(self) -> None:
+        """
+        Grava os documentos e as postings pendentes e publica o novo manifesto.
+        """
+        if not self._dirty:
+            return
+        if self._pending_documents:
+            with open(self.index_dir / DOCUMENTS_FILE, 'ab') as f:
+                for line in self._pending_documents:
+                    f.write(line)
+                    self._offsets.append(self._offsets[-1] + len(line))
+            atomic_write_bytes(self.index_dir / OFFSETS_FILE, np.array(self._offsets, dtype=np.uint64).tobytes())
+        if len(self._docs):
+            terms = list(self._term_ids)
+            columns = (np.frombuffer(column, dtype=np.int64) for column in (self._terms, self._docs, self._pages, self._freqs))
+            self.manifest["segments"].append(self._write_segment(terms, *columns))
+        atomic_write_text(self.index_dir / MANIFEST_FILE, json.dumps(self.manifest))
+        self._reset_buffer()
+        self._dirty = False
+
+    def compact(self) -> None:
+        """
+        Reescreve todos os segmentos num só, sem as postings dos documentos removidos.
+        As postings do índice inteiro passam pela memória durante a compactação.
+        """
+        self.flush()
+        old_segments = list(self.manifest["segments"])
+        if len(old_segments) <= 1 and not self.manifest["deleted"]:
+            return
+
+        vocabulary: Dict[str, int] = {}
+        parts = []
+        deleted = np.array(self.manifest["deleted"], dtype=np.int64)
+        for name in old_segments:
+            segment = _Segment(self.index_dir / name)
+            try:
+                local_ids = np.array([vocabulary.setdefault(term, len(vocabulary)) for term in segment.all_terms()], dtype=np.int64)
+                term_index, (docs, pages, freqs) = segment.all_postings()
+            finally:
+                segment.close()
+            live = ~np.isin(docs, deleted)
+            parts.append((local_ids[term_index[live]], docs[live], pages[live], freqs[live]))
+
+        self.manifest["segments"] = []
+        if any(len(part[0]) for part in parts):
+            columns = [np.concatenate(column) for column in zip(*parts)]
+            # Só os termos que ainda têm postings
+            used, columns[0] = np.unique(columns[0], return_inverse=True)
+            terms = list(vocabulary)
+            self.manifest["segments"].append(self._write_segment([terms[i] for i in used], *columns))
+        self._purge_documents(set(self.manifest["deleted"]))
+        self.manifest["deleted"] = []
+        atomic_write_text(self.index_dir / MANIFEST_FILE, json.dumps(self.manifest))
+        for name in old_segments:
+            for suffix in SEGMENT_SUFFIXES:
+                (self.index_dir / name).with_suffix(suffix).unlink(missing_ok=True)
+
+    def _purge_documents(self, deleted: set) -> None:
+        # Troca as linhas dos documentos removidos por "null", mantendo os ids das demais
+        with open(self.index_dir / DOCUMENTS_FILE, 'rb') as f:
+            lines = [f.readline() for _ in range(self.manifest["next_doc_id"])]
+        lines = [b"null\n" if doc_id in deleted else line for doc_id, line in enumerate(lines)]
+        self._offsets = [0]
+        for line in lines:
+            self._offsets.append(self._offsets[-1] + len(line))
+        atomic_write_bytes(self.index_dir / DOCUMENTS_FILE, b"".join(lines))
+        atomic_write_bytes(self.index_dir / OFFSETS_FILE, np.array(self._offsets, dtype=np.uint64).tobytes())
+
+    def close(self) -> None:
+        if self._lock.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            fcntl.flock(self._lock, fcntl.LOCK_UN)
+            self._lock.close()
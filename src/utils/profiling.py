@@ -0,0 +1,266 @@
+import contextlib
+import json
+import os
+import resource
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from utils.budget import process_rss_mb
+from utils.files import atomic_write_text
+
+# Profiler ativo no processo (um por vez); as funções das etapas registram nele via profile_stage
+_ACTIVE_PROFILER: Optional["Profiler"] = None
+
+# Intervalo de amostragem da memória residente enquanto há etapas abertas
+RSS_SAMPLE_INTERVAL_S = 0.005
+
+def _rss_kb() -> int:
+    # Memória residente atual do processo; 0 onde não há /proc
+    rss = process_rss_mb()
+    return int(rss * 1024) if rss is not None else 0
+
+def _process_cpu_s() -> float:
+    # CPU de todas as threads do processo mais a dos processos filhos já encerrados (pool de workers)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+class _PeakSampler:
+    """
+    Thread única do processo que amostra a memória residente enquanto há etapas abertas (de
+    qualquer profiler) e atualiza o pico de cada uma. O pico do processo (ru_maxrss) não serve:
+    nunca diminui, então uma etapa herdaria o pico das anteriores.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._peaks: Dict[int, List[int]] = {}
+        self._running = False
+
+    def open(self) -> List[int]:
+        peak = [_rss_kb()]
+        with self._lock:
+            self._peaks[id(peak)] = peak
+            if not self._running:
+                self._running = True
+                threading.Thread(target=self._run, name="profiler-rss", daemon=True).start()
+        return peak
+
+    def close(self, peak: List[int]) -> int:
+        rss = _rss_kb()
+        with self._lock:
+            self._peaks.pop(id(peak), None)
+        return max(peak[0], rss)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._peaks:
+                    self._running = False
+                    return
+                peaks = list(self._peaks.values())
+            rss = _rss_kb()
+            for peak in peaks:
+                if rss > peak[0]:
+                    peak[0] = rss
+            time.sleep(RSS_SAMPLE_INTERVAL_S)
+
+    def reset(self) -> None:
+        # Processo filho criado por fork: a thread de amostragem não existe nele
+        self._lock = threading.Lock()
+        self._peaks = {}
+        self._running = False
+
+_SAMPLER = _PeakSampler()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_SAMPLER.reset)
+
+class Profiler:
+    """
+    Registra, para cada etapa executada, tempo de parede, tempo de CPU, pico de RSS e contagens
+    (páginas, spans, tokens, imagens, tokens gerados). Etapas com o mesmo nome são somadas na tabela;
+    nomes com '/' indicam subetapas (ex.: 'analysis/parse').
+    Duas medidas de CPU: cpu_s, da thread que executa a etapa (não soma etapas simultâneas em
+    outras threads), e process_cpu_s, do processo inteiro mais os workers encerrados durante a etapa,
+    que inclui as threads do torch no resumo e o pool de --workers na análise paralela.
+    peak_rss_kb é o maior RSS do processo amostrado durante a etapa (workers não incluídos).
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, int]]:
+        """
+        Mede o bloco como uma etapa. O dicionário retornado recebe as contagens da etapa.
+        """
+        counts: Dict[str, int] = {}
+        peak = _SAMPLER.open()
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        start_process_cpu = _process_cpu_s()
+        try:
+            yield counts
+        finally:
+            event = {
+                "name": name,
+                "start_s": start_wall - self._origin,
+                "wall_s": time.perf_counter() - start_wall,
+                "cpu_s": time.thread_time() - start_cpu,
+                "process_cpu_s": _process_cpu_s() - start_process_cpu,
+                "peak_rss_kb": _SAMPLER.close(peak),
+                "thread": threading.get_ident(),
+                "counts": counts,
+            }
+            with self._lock:
+                self.events.append(event)
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["Profiler"]:
+        """
+        Torna este profiler o ativo do processo enquanto o bloco executa.
+        """
+        global _ACTIVE_PROFILER
+        previous = _ACTIVE_PROFILER
+        _ACTIVE_PROFILER = self
+        try:
+            yield self
+        finally:
+            _ACTIVE_PROFILER = previous
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Soma os eventos por nome de etapa, na ordem da primeira execução.
+        """
+        stages: Dict[str, Dict[str, Any]] = {}
+        for event in sorted(self.events, key=lambda e: e["start_s"]):
+            stage = stages.setdefault(
+                event["name"], {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "process_cpu_s": 0.0, "peak_rss_kb": 0, "counts": {}}
+            )
+            stage["calls"] += 1
+            stage["wall_s"] += event["wall_s"]
+            stage["cpu_s"] += event["cpu_s"]
+            stage["process_cpu_s"] += event["process_cpu_s"]
+            stage["peak_rss_kb"] = max(stage["peak_rss_kb"], event["peak_rss_kb"])
+            for key, value in event["counts"].items():
+                stage["counts"][key] = stage["counts"].get(key, 0) + value
+        return stages
+
+    def format_table(self) -> str:
+        lines = [
+            f"{'Etapa':<28} | {'Chamadas':>8} | {'Parede (s)':>10} | {'CPU thread (s)':>14} | "
+            f"{'CPU processo (s)':>16} | {'Pico RSS (MB)':>13} | Contagens",
+            "-" * 124,
+        ]
+        for name, stage in self.summary().items():
+            # Subetapas são indentadas pelo nível de '/'
+            label = "  " * name.count("/") + name.rsplit("/", 1)[-1]
+            counts = ", ".join(f"{key}={value:,}" for key, value in stage["counts"].items())
+            lines.append(
+                f"{label:<28} | {stage['calls']:>8} | {stage['wall_s']:>10.3f} | {stage['cpu_s']:>14.3f} | "
+                f"{stage['process_cpu_s']:>16.3f} | {stage['peak_rss_kb'] / 1024:>13.1f} | {counts}"
+            )
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Eventos no formato Chrome Trace (aberto em chrome://tracing ou ui.perfetto.dev).
+        """
+        pid = os.getpid()
+        trace_events = [
+            {
+                "name": event["name"],
+                "cat": event["name"].split("/", 1)[0],
+                "ph": "X",
+                "ts": event["start_s"] * 1e6,
+                "dur": event["wall_s"] * 1e6,
+                "pid": pid,
+                "tid": event["thread"],
+                "args": {
+                    "cpu_s": event["cpu_s"], "process_cpu_s": event["process_cpu_s"],
+                    "peak_rss_kb": event["peak_rss_kb"], **event["counts"]
+                },
+            }
+            for event in self.events
+        ]
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, file_path: str) -> None:
+        atomic_write_text(file_path, json.dumps(self.to_chrome_trace()))
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Resumo serializável (ex.: devolvido por processos worker para agregação).
+        """
+        return self.summary()
+
+def active_profiler() -> Optional[Profiler]:
+    return _ACTIVE_PROFILER
+
+def profile_stage(name: str):
+    """
+    Mede o bloco no profiler ativo; sem profiler ativo, é um contexto vazio de custo mínimo.
+    Uso: with profile_stage("images/write") as counts: ...; counts["images"] = 1
+    """
+    profiler = _ACTIVE_PROFILER
+    if profiler is None:
+        return contextlib.nullcontext({})
+    return profiler.stage(name)
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    # Interpolação linear entre os vizinhos mais próximos
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def aggregate_profiles(profiles: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Agrega os resumos por documento (Profiler.to_dict) em percentis por etapa.
+    """
+    samples: Dict[str, Dict[str, List[float]]] = {}
+    for profile in profiles:
+        for name, stage in profile.items():
+            values = samples.setdefault(name, {"wall_s": [], "cpu_s": [], "process_cpu_s": [], "peak_rss_kb": []})
+            for key in values:
+                values[key].append(stage[key])
+
+    # Subetapas logo abaixo da etapa principal, na ordem da primeira aparição
+    first_seen = {name: i for i, name in enumerate(samples)}
+    ordered = sorted(samples, key=lambda name: (first_seen.get(name.split("/", 1)[0], first_seen[name]), first_seen[name]))
+
+    aggregated: Dict[str, Dict[str, Any]] = {}
+    for name in ordered:
+        values = samples[name]
+        wall = sorted(values["wall_s"])
+        cpu = sorted(values["cpu_s"])
+        process_cpu = sorted(values["process_cpu_s"])
+        aggregated[name] = {
+            "documents": len(wall),
+            "wall_total_s": sum(wall),
+            "wall_p50_s": _percentile(wall, 0.50),
+            "wall_p90_s": _percentile(wall, 0.90),
+            "wall_p99_s": _percentile(wall, 0.99),
+            "wall_max_s": wall[-1],
+            "cpu_p50_s": _percentile(cpu, 0.50),
+            "process_cpu_p50_s": _percentile(process_cpu, 0.50),
+            "peak_rss_max_kb": max(values["peak_rss_kb"]),
+        }
+    return aggregated
+
+def format_aggregate_table(aggregated: Dict[str, Dict[str, Any]]) -> str:
+    lines = [
+        f"{'Etapa':<28} | {'Docs':>6} | {'p50 (s)':>8} | {'p90 (s)':>8} | {'p99 (s)':>8} | {'Máx (s)':>8} | {'Total (s)':>9}",
+        "-" * 94,
+    ]
+    for name, stage in aggregated.items():
+        label = "  " * name.count("/") + name.rsplit("/", 1)[-1]
+        lines.append(
+            f"{label:<28} | {stage['documents']:>6} | {stage['wall_p50_s']:>8.3f} | {stage['wall_p90_s']:>8.3f} | "
+            f"{stage['wall_p99_s']:>8.3f} | {stage['wall_max_s']:>8.3f} | {stage['wall_total_s']:>9.3f}"
+        )
+    return "\n".join(lines)
@@ -1,66 +1,91 @@
 import pathlib
-from typing import Dict, Any
+from typing import Dict, Any, List, TextIO
 
-def create_markdown_report(
-    analysis_results: Dict[str, Any], 
-    summary_text: str, 
-    base_output_path: pathlib.Path, 
-    pdf_path: pathlib.Path        
-) -> Dict[str, Any]:
+from utils.files import atomic_open
+
+# Nome do relatório dentro do subdiretório do documento
+REPORT_FILE_NAME = "relatorio_analise.md"
+
+def format_title_outline(outline: List[Dict[str, Any]]) -> str:
     """
-    Gera um relatório final em formato Markdown com todas as análises e resumo,
-    salvando em um subdiretório nomeado após o arquivo PDF.
+    Lista aninhada em Markdown a partir dos títulos com nível (1 = H1) e página.
+    A indentação nunca salta mais de um nível em relação ao título anterior,
+    para que a lista continue válida quando o documento pula níveis (ex.: H1 seguido de H3).
     """
-    
-    # 1. Montar o Conteúdo do Relatório 
-    report_content = f"# Relatório de Análise do PDF\n\n"
-    report_content += f"**Arquivo Processado:** `{pdf_path.name}`\n\n" 
-    
+    lines = []
+    depth = 0
+    for heading in outline:
+        depth = min(heading["level"], depth + 1)
+        lines.append(f"{'  ' * (depth - 1)}- **{heading['text']}** (p. {heading['page']})")
+    return "\n".join(lines) + "\n"
+
+def write_markdown_report(f: TextIO, analysis_results: Dict[str, Any], summary_text: str, pdf_path: pathlib.Path) -> None:
+    """
+    Escreve o relatório em Markdown no arquivo aberto, seção por seção (sem montar o texto inteiro em memória).
+    """
+    f.write("# Relatório de Análise do PDF\n\n")
+    f.write(f"**Arquivo Processado:** `{pdf_path.name}`\n\n")
+
     # --- Seção 1: Análise Estrutural ---
-    report_content += "## 1. Análise Estrutural\n\n"
-    report_content += "| Métrica | Valor |\n"
-    report_content += "| :--- | :--- |\n"
-    report_content += f"| Páginas | {analysis_results['total_pages']} |\n"
-    report_content += f"| Palavras (Total) | {analysis_results['total_words']:,} |\n"
-    report_content += f"| Vocabulário (Distinto) | {analysis_results['vocabulary_size']:,} |\n"
-    report_content += f"| Tamanho (Bytes) | {analysis_results['file_size_bytes']:,} |\n\n"
-    
+    f.write("## 1. Análise Estrutural\n\n")
+    f.write("| Métrica | Valor |\n")
+    f.write("| :--- | :--- |\n")
+    f.write(f"| Páginas | {analysis_results['total_pages']} |\n")
+    f.write(f"| Palavras (Total) | {analysis_results['total_words']:,} |\n")
+    f.write(f"| Vocabulário (Distinto) | {analysis_results['vocabulary_size']:,} |\n")
+    f.write(f"| Tamanho (Bytes) | {analysis_results['file_size_bytes']:,} |\n\n")
+
     # --- Seção 2: Detecção de Títulos ---
     titles = analysis_results.get("detected_titles", [])
+    outline = analysis_results.get("title_outline")
     if titles:
-        report_content += "## 2. Detecção de Títulos e Seções\n\n"
-        report_content += "### Títulos Detectados\n"
-        for title in titles:
-            report_content += f"- **{title}**\n"
-        report_content += "\n"
+        f.write("## 2. Detecção de Títulos e Seções\n\n")
+        if outline:
+            # Estrutura hierárquica (H1/H2/H3 pelo agrupamento dos tamanhos de fonte)
+            f.write("### Estrutura do Documento\n")
+            f.write(format_title_outline(outline))
+        else:
+            f.write("### Títulos Detectados\n")
+            for title in titles:
+                f.write(f"- **{title}**\n")
+        f.write("\n")
 
     # --- Seção 3: Palavras-Chave ---
-    report_content += "## 3. Top 10 Palavras-Chave\n\n"
+    f.write("## 3. Top 10 Palavras-Chave\n\n")
     for rank, (word, count) in enumerate(analysis_results['top_10_words'], 1):
-        report_content += f"{rank}. **{word}** ({count:,} vezes)\n"
-    report_content += "\n"
+        f.write(f"{rank}. **{word}** ({count:,} vezes)\n")
+    f.write("\n")
 
     # --- Seção 4: Resumo LLM ---
-    report_content += "## 4. Resumo (LLM Local)\n\n"
+    f.write("## 4. Resumo (LLM Local)\n\n")
     formatted_summary = summary_text.replace('\n', '\n> ')
-    report_content += f"> {formatted_summary}\n\n"
-    
-    # 2. Salvar o Arquivo
-    
-    # Define o subdiretório baseado no nome do PDF 
-    pdf_name_without_extension = pdf_path.stem 
-    report_directory = base_output_path / pdf_name_without_extension
-    
-    # Garante que o subdiretório de saída existe (igual ao que a extração de imagens faz)
-    report_directory.mkdir(parents=True, exist_ok=True)
-    
-    # Define o nome do arquivo de saída dentro do novo diretório
-    report_file = report_directory / "relatorio_analise.md"
+    f.write(f"> {formatted_summary}\n\n")
+
+def report_directory(base_output_path: pathlib.Path, pdf_path: pathlib.Path) -> pathlib.Path:
+    """
+    Subdiretório de saída do documento, nomeado após o arquivo PDF (o mesmo das imagens).
+    """
+    return base_output_path / pdf_path.stem
+
+def create_markdown_report(
+    analysis_results: Dict[str, Any], 
+    summary_text: str, 
+    base_output_path: pathlib.Path, 
+    pdf_path: pathlib.Path        
+) -> Dict[str, Any]:
+    """
+    Gera um relatório final em formato Markdown com todas as análises e resumo,
+    salvando em um subdiretório nomeado após o arquivo PDF.
+    O relatório é escrito num temporário e renomeado ao final: uma falha no meio da escrita
+    não deixa um relatório truncado nem apaga o anterior.
+    """
+    # Define o nome do arquivo de saída dentro do subdiretório do documento
+    report_file = report_directory(base_output_path, pdf_path) / REPORT_FILE_NAME
     
     try:
-        with open(report_file, 'w', encoding='utf-8') as f:
-            f.write(report_content)
+        with atomic_open(report_file, 'w') as f:
+            write_markdown_report(f, analysis_results, summary_text, pdf_path)
         # Retorna o caminho completo e correto
         return {"status": "success", "file_path": str(report_file)}
     except Exception as e:
-        return {"status": "error", "message": f"Falha ao salvar relatório: {e}"}
\ No newline at end of file
+        return {"status": "error", "message": f"Falha ao salvar relatório: {e}"}
@@ -0,0 +1,223 @@
+import abc
+import json
+import os
+import pathlib
+import threading
+from typing import Any, Dict, List, Optional
+
+from utils.files import atomic_open
+from utils.report import REPORT_FILE_NAME, create_markdown_report, report_directory
+
+# Versão do formato dos registros (JSON por documento e linhas do JSONL); a 2 não traz mais
+# "report" (o relatório Markdown passou a ser um sink, como o JSON e o JSONL)
+RECORD_VERSION = 2
+
+# Campos da análise que não entram nos registros: o texto completo (só serve ao resumo) e os
+# dados intermediários já consumidos pelo lote (esboço do corpus e frequências por página)
+OMITTED_ANALYSIS_FIELDS = ("full_text", "corpus_sketch", "page_terms")
+
+def document_record(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Registro legível por máquina de um documento processado (mesmo formato nos dois modos e nos
+    sinks): análise com títulos e hierarquia, manifesto das imagens, resumo e tempos.
+    Um documento interrompido por orçamento (batch --timeout, ...) tem status "partial" e o motivo
+    em "budget_exceeded".
+    """
+    analysis = result["analysis"]
+    record: Dict[str, Any] = {
+        "version": RECORD_VERSION,
+        "file": result["file"],
+        "name": pathlib.Path(result["file"]).name,
+        "pdf_digest": result.get("pdf_digest"),
+        "status": "error" if "error" in analysis else "partial" if "budget_exceeded" in result else "success",
+        "analysis": {key: value for key, value in analysis.items() if key not in OMITTED_ANALYSIS_FIELDS},
+        "images": result.get("images"),
+    }
+    if "budget_exceeded" in result:
+        record["budget_exceeded"] = result["budget_exceeded"]
+    if "summary" in result:
+        record["summary"] = result["summary"]
+    timings: Dict[str, Any] = {"elapsed": round(result.get("elapsed", 0.0), 6)}
+    if "profile" in result:
+        timings["stages"] = result["profile"]
+    record["timings"] = timings
+    if "page_cache" in result:
+        record["page_cache"] = result["page_cache"]
+    return record
+
+class OutputSink(abc.ABC):
+    """
+    Destino dos resultados por documento. write() é chamado uma vez por documento, assim que ele
+    termina; close() ao final do processamento.
+    """
+
+    @abc.abstractmethod
+    def write(self, record: Dict[str, Any]) -> None:
+        ...
+
+    @abc.abstractmethod
+    def destination(self, pdf_path: pathlib.Path) -> str:
+        """
+        Onde o registro do documento foi gravado (para as mensagens da CLI).
+        """
+
+    def accepts(self, record: Dict[str, Any]) -> bool:
+        """
+        Se o sink grava este registro (por padrão, todos).
+        """
+        return True
+
+    def close(self) -> None:
+        pass
+
+class MarkdownSink(OutputSink):
+    """
+    Relatório Markdown por documento (<saída>/<nome do PDF>/relatorio_analise.md), escrito seção
+    por seção num temporário (ver utils/report.create_markdown_report). Documentos cuja análise
+    falhou não têm relatório.
+    """
+
+    def __init__(self, base_output_path: pathlib.Path):
+        self.base_output_path = pathlib.Path(base_output_path)
+
+    def path_for(self, pdf_path: pathlib.Path) -> pathlib.Path:
+        return report_directory(self.base_output_path, pathlib.Path(pdf_path)) / REPORT_FILE_NAME
+
+    def accepts(self, record: Dict[str, Any]) -> bool:
+        return record["status"] != "error"
+
+    def write(self, record: Dict[str, Any]) -> None:
+        report = create_markdown_report(
+            record["analysis"], record.get("summary", ""), self.base_output_path, pathlib.Path(record["file"])
+        )
+        if report["status"] != "success":
+            raise OSError(report["message"])
+
+    def destination(self, pdf_path: pathlib.Path) -> str:
+        return str(self.path_for(pdf_path))
+
+class JsonDocumentSink(OutputSink):
+    """
+    Um arquivo JSON por documento (<saída>/<nome do PDF>/analise.json), gravado atomicamente.
+    """
+
+    file_name = "analise.json"
+
+    def __init__(self, base_output_path: pathlib.Path):
+        self.base_output_path = pathlib.Path(base_output_path)
+
+    def path_for(self, pdf_path: pathlib.Path) -> pathlib.Path:
+        return report_directory(self.base_output_path, pathlib.Path(pdf_path)) / self.file_name
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with atomic_open(self.path_for(record["file"]), 'w') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+
+    def destination(self, pdf_path: pathlib.Path) -> str:
+        return str(self.path_for(pdf_path))
+
+class JsonlSink(OutputSink):
+    """
+    Fluxo JSONL: um registro por linha, acrescentado ao arquivo e descarregado (flush) assim que
+    o documento termina, para que a ingestão possa acompanhar o lote em andamento. Uma linha
+    incompleta no final (execução interrompida) é descartada ao reabrir o arquivo.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a+b')
+        self._discard_partial_line()
+
+    def _discard_partial_line(self) -> None:
+        size = self._file.seek(0, os.SEEK_END)
+        if not size:
+            return
+        self._file.seek(size - 1)
+        if self._file.read(1) == b"\n":
+            return
+        # Procura o último fim de linha de trás para frente, em blocos
+        position = size
+        while position > 0:
+            start = max(0, position - 65536)
+            self._file.seek(start)
+            newline = self._file.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                self._file.truncate(start + newline + 1)
+                return
+            position = start
+        self._file.truncate(0)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        # Uma única escrita por registro; a trava serializa threads que terminam documentos ao mesmo tempo
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def destination(self, pdf_path: pathlib.Path) -> str:
+        return str(self.path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+class OutputSinks:
+    """
+    Conjunto dos sinks ativos: cada resultado vira um registro (document_record) entregue a todos.
+    Uma falha de gravação é reportada e não interrompe o processamento.
+    """
+
+    def __init__(self, sinks: List[OutputSink]):
+        self.sinks = sinks
+
+    def __bool__(self) -> bool:
+        return bool(self.sinks)
+
+    def write(self, result: Dict[str, Any]) -> Optional[str]:
+        """
+        Entrega o documento aos sinks; retorna a mensagem de erro, se alguma gravação falhar.
+        """
+        if not self.sinks:
+            return None
+        record = document_record(result)
+        errors = []
+        for sink in self.sinks:
+            if not sink.accepts(record):
+                continue
+            try:
+                sink.write(record)
+            except (OSError, TypeError, ValueError) as e:
+                errors.append(f"{type(sink).__name__}: {e}")
+        return "; ".join(errors) or None
+
+    def destinations(self, result: Dict[str, Any]) -> List[str]:
+        """
+        Onde o documento foi gravado, nos sinks que aceitam o seu registro.
+        """
+        record = document_record(result)
+        return [sink.destination(result["file"]) for sink in self.sinks if sink.accepts(record)]
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self) -> "OutputSinks":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def open_sinks(args, output_path: pathlib.Path) -> OutputSinks:
+    """
+    Cria os sinks a partir das opções da CLI: o relatório Markdown (com --summarize), --json e --jsonl.
+    """
+    sinks: List[OutputSink] = []
+    if getattr(args, "summarize", False):
+        sinks.append(MarkdownSink(output_path))
+    if args.json:
+        sinks.append(JsonDocumentSink(output_path))
+    if args.jsonl:
+        sinks.append(JsonlSink(pathlib.Path(args.jsonl)))
+    return OutputSinks(sinks)
@@ -0,0 +1,212 @@
+import base64
+import hashlib
+import heapq
+import math
+import zlib
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+from utils.text import TextStatistics
+
+# Versão do formato serializado dos esboços; esboços de versões diferentes não são combinados
+SKETCH_VERSION = 1
+
+# Contadores mantidos pelo resumo de palavras frequentes (memória: O(capacidade))
+DEFAULT_HEAVY_HITTERS = 1024
+
+# Precisão do HyperLogLog: 2^14 registradores de 1 byte (16 KB), erro padrão de ~0,8%
+DEFAULT_HLL_PRECISION = 14
+
+class HeavyHitters:
+    """
+    Resumo de palavras frequentes (Misra-Gries) com memória limitada e combinável.
+    Cada contador subestima a frequência real em no máximo error_bound = (N - soma dos contadores) / (k + 1),
+    onde N é o total de palavras contadas e k a capacidade; a garantia se mantém após qualquer
+    sequência de combinações (merge), em qualquer ordem.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HEAVY_HITTERS):
+        self.capacity = capacity
+        self.counters: Dict[str, int] = {}
+        self.total = 0
+
+    def update(self, counts: Mapping[str, int]) -> None:
+        """
+        Adiciona contagens exatas (ex.: as frequências de um documento).
+        """
+        for word, count in counts.items():
+            self.counters[word] = self.counters.get(word, 0) + count
+            self.total += count
+        self._reduce()
+
+    def merge(self, other: "HeavyHitters") -> None:
+        if other.capacity != self.capacity:
+            raise ValueError(f"Capacidades diferentes: {self.capacity} e {other.capacity}.")
+        for word, count in other.counters.items():
+            self.counters[word] = self.counters.get(word, 0) + count
+        self.total += other.total
+        self._reduce()
+
+    def _reduce(self) -> None:
+        # Subtrai o (k+1)-ésimo maior contador de todos e descarta os que não ficam positivos
+        if len(self.counters) <= self.capacity:
+            return
+        threshold = heapq.nlargest(self.capacity + 1, self.counters.values())[-1]
+        self.counters = {word: count - threshold for word, count in self.counters.items() if count > threshold}
+
+    @property
+    def error_bound(self) -> float:
+        return (self.total - sum(self.counters.values())) / (self.capacity + 1)
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        """
+        As n palavras com os maiores contadores (desempate alfabético, independente da ordem das combinações).
+        """
+        return heapq.nsmallest(n, self.counters.items(), key=lambda item: (-item[1], item[0]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "total": self.total, "counters": self.counters}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HeavyHitters":
+        heavy_hitters = cls(data["capacity"])
+        heavy_hitters.total = data["total"]
+        heavy_hitters.counters = dict(data["counters"])
+        return heavy_hitters
+
+def _hash64(items: Iterable[str]) -> np.ndarray:
+    # Hash de 64 bits estável entre processos e máquinas (o hash() do Python é aleatorizado)
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little') for item in items),
+        dtype=np.uint64
+    )
+
+class HyperLogLog:
+    """
+    Estimador de cardinalidade (vocabulário distinto) com memória fixa de 2^precision bytes.
+    Combinar dois esboços (máximo registrador a registrador) equivale a esboçar a união dos conjuntos.
+    """
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"Precisão do HyperLogLog fora do intervalo 4-18: {precision}.")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_many(self, items: Iterable[str]) -> None:
+        hashes = _hash64(items)
+        if not len(hashes):
+            return
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+        # Posição do primeiro bit 1 no sufixo: frexp dá o comprimento em bits (exato até 53 bits)
+        _, bit_length = np.frexp(suffix.astype(np.float64))
+        ranks = (suffix_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, ranks)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError(f"Precisões diferentes: {self.precision} e {other.precision}.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Correção para cardinalidades pequenas (contagem linear)
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+    @property
+    def relative_error(self) -> float:
+        # Erro padrão relativo da estimativa
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Registradores comprimidos: esboços de documentos pequenos são quase todos zero
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(zlib.compress(self.registers.tobytes())).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        hll = cls(data["precision"])
+        registers = np.frombuffer(zlib.decompress(base64.b64decode(data["registers"])), dtype=np.uint8)
+        if len(registers) != len(hll.registers):
+            raise ValueError("Registradores do HyperLogLog com tamanho inválido.")
+        hll.registers = registers.copy()
+        return hll
+
+class CorpusSketch:
+    """
+    Estatísticas de corpus com memória limitada: documentos, total de palavras (exato), palavras
+    mais comuns (HeavyHitters) e tamanho do vocabulário (HyperLogLog). Um esboço por documento é
+    serializável em JSON, e esboços de documentos ou de shards inteiros (de outras máquinas)
+    podem ser combinados em qualquer ordem.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HEAVY_HITTERS, precision: int = DEFAULT_HLL_PRECISION):
+        self.documents = 0
+        self.total_words = 0
+        self.heavy_hitters = HeavyHitters(capacity)
+        self.vocabulary = HyperLogLog(precision)
+
+    @classmethod
+    def from_text_statistics(
+        cls,
+        stats: TextStatistics,
+        capacity: int = DEFAULT_HEAVY_HITTERS,
+        precision: int = DEFAULT_HLL_PRECISION
+    ) -> "CorpusSketch":
+        """
+        Esboço de um documento a partir das suas estatísticas exatas (mesmos critérios de
+        top_10_words e vocabulary_size).
+        """
+        sketch = cls(capacity, precision)
+        sketch.documents = 1
+        sketch.total_words = stats.total_words
+        sketch.heavy_hitters.update(stats.word_frequencies)
+        sketch.vocabulary.add_many(stats.vocabulary)
+        return sketch
+
+    def merge(self, other: "CorpusSketch") -> None:
+        self.documents += other.documents
+        self.total_words += other.total_words
+        self.heavy_hitters.merge(other.heavy_hitters)
+        self.vocabulary.merge(other.vocabulary)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return self.vocabulary.estimate()
+
+    def top_n_words(self, n: int = 10) -> List[Tuple[str, int]]:
+        """
+        Palavras mais comuns com a contagem mínima garantida; a real está entre ela e
+        ela + heavy_hitters.error_bound.
+        """
+        return self.heavy_hitters.top(n)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": SKETCH_VERSION,
+            "documents": self.documents,
+            "total_words": self.total_words,
+            "heavy_hitters": self.heavy_hitters.to_dict(),
+            "vocabulary": self.vocabulary.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CorpusSketch":
+        if data.get("version") != SKETCH_VERSION:
+            raise ValueError(f"Versão de esboço não suportada: {data.get('version')}.")
+        sketch = cls.__new__(cls)
+        sketch.documents = data["documents"]
+        sketch.total_words = data["total_words"]
+        sketch.heavy_hitters = HeavyHitters.from_dict(data["heavy_hitters"])
+        sketch.vocabulary = HyperLogLog.from_dict(data["vocabulary"])
+        return sketch
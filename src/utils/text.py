@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import Any, List, Dict, Iterable
 from collections import Counter
 import re
 
@@ -17,25 +17,23 @@ STOPWORDS_PT = {
     'seus', 'suas', 'meus', 'minhas', 'teus', 'tuas'
 }
 
+# Token = sequência de caracteres de palavra (letras, números e '_').
+# Equivale a trocar pontuação por espaço e dividir nos espaços, em uma única passada.
+_TOKEN_PATTERN = re.compile(r'\w+')
+
 def clean_and_tokenize(text: str) -> List[str]:
     #Limpa o texto, remove pontuações, converte para minúsculas e tokeniza.
     if not text:
         return []
-        
-    # 1. Converte para minúsculas
-    text = text.lower()
-    
-    # 2. Remove pontuações e caracteres especiais, mantendo apenas letras e números
-    # e substituindo por espaço para não juntar palavras
-    text = re.sub(r'[^\w\s]', ' ', text)
-    
-    # 3. Remove múltiplos espaços e quebras de linha
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # 4. Tokeniza (divide em palavras)
-    tokens = text.split()
-    
-    return tokens
+
+    # Minúsculas primeiro: a conversão pode gerar caracteres que não são de palavra (ex.: 'İ')
+    return _TOKEN_PATTERN.findall(text.lower())
+
+def is_counted_word(token: str) -> bool:
+    """
+    Critério das palavras mais comuns: sem stopwords, sem números e com mais de um caractere.
+    """
+    return token not in STOPWORDS_PT and not token.isdigit() and len(token) > 1
 
 def count_word_frequencies(tokens: List[str]) -> Dict[str, int]:
     """
@@ -43,10 +41,7 @@ def count_word_frequencies(tokens: List[str]) -> Dict[str, int]:
     Esta função é usada para a 'Lista das 10 palavras mais comuns (que não sejam stopwords)'.
     """
     # 1. Filtra stopwords e palavras que são apenas números
-    filtered_tokens = [
-        token for token in tokens
-        if token not in STOPWORDS_PT and not token.isdigit() and len(token) > 1
-    ]
+    filtered_tokens = [token for token in tokens if is_counted_word(token)]
     
     # 2. Conta a frequência
     word_counts = Counter(filtered_tokens)
@@ -70,4 +65,67 @@ def get_top_n_words(word_frequencies: Dict[str, int], n: int = 10) -> List[tuple
     counter = Counter(word_frequencies)
     
     # Retorna as 10 palavras mais comuns 
-    return counter.most_common(n)
\ No newline at end of file
+    return counter.most_common(n)
+
+class TextStatistics:
+    """
+    Acumulador incremental das estatísticas de texto, alimentado página a página.
+    Produz exatamente os mesmos valores que clean_and_tokenize + count_word_frequencies +
+    calculate_vocabulary_size sobre o texto completo, sem manter o texto ou a lista de tokens.
+    """
+
+    def __init__(self):
+        self.total_words = 0
+        self.word_frequencies: Counter = Counter() # Ordem de inserção = primeira aparição (desempates)
+        self.vocabulary = set()
+
+    def update(self, text: str) -> None:
+        """
+        Adiciona um trecho de texto. Os trechos devem ser separados por espaço no documento original.
+        """
+        tokens = clean_and_tokenize(text)
+        self.total_words += len(tokens)
+        self.vocabulary.update(token for token in tokens if len(token) > 1)
+        self.word_frequencies.update(token for token in tokens if is_counted_word(token))
+
+    def merge(self, other: "TextStatistics") -> None:
+        """
+        Combina as estatísticas de um trecho posterior do documento (ex.: outro shard de páginas).
+        """
+        self.total_words += other.total_words
+        self.vocabulary |= other.vocabulary
+        self.word_frequencies.update(other.word_frequencies)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self.vocabulary)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Forma serializável em JSON (a ordem das frequências é preservada).
+        """
+        return {
+            "total_words": self.total_words,
+            "word_frequencies": dict(self.word_frequencies),
+            "vocabulary": sorted(self.vocabulary),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TextStatistics":
+        stats = cls()
+        stats.total_words = data["total_words"]
+        stats.word_frequencies = Counter(data["word_frequencies"])
+        stats.vocabulary = set(data["vocabulary"])
+        return stats
+
+    def top_n_words(self, n: int = 10) -> List[tuple[str, int]]:
+        return self.word_frequencies.most_common(n)
+
+def compute_text_statistics(texts: Iterable[str]) -> TextStatistics:
+    """
+    Acumula as estatísticas de uma sequência de trechos (ex.: textos das páginas).
+    """
+    stats = TextStatistics()
+    for text in texts:
+        stats.update(text)
+    return stats
@@ -0,0 +1,35 @@
+"""
+Configuração comum dos testes: os módulos do projeto são importados a partir de src/ (como em
+src/main.py) e os PDFs de teste vêm do gerador sintético dos benchmarks (benchmarks/corpus.py).
+"""
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import pytest
+
+from corpus import CorpusSpec, generate_pdf
+
+# Documento pequeno com títulos e imagens (inclusive repetidas)
+SMALL_SPEC = CorpusSpec(
+    pages=6, lines_per_page=20, words_per_line=10, font_mix=((10.0, 10), (16.0, 1)),
+    images_per_page=2, image_size=32, duplicate_ratio=0.5
+)
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """
+    Gera um PDF sintético em tmp_path: make_pdf("nome.pdf", spec=..., seed=...).
+    """
+    def make(name: str = "documento.pdf", spec: CorpusSpec = SMALL_SPEC, seed: int = 0) -> pathlib.Path:
+        path = tmp_path / name
+        generate_pdf(path, spec, seed)
+        return path
+    return make
+
+@pytest.fixture
+def small_pdf(make_pdf) -> pathlib.Path:
+    return make_pdf()
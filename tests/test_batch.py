@@ -0,0 +1,42 @@
+import json
+
+import pipeline.batch as batch
+from cli.arguments import parse_batch_arguments
+from pdf.extractor import extract_pdf_analysis
+
+def test_summary_failure_does_not_stop_the_batch(make_pdf, tmp_path, monkeypatch, capsys):
+    pdfs = [make_pdf(f"doc{i}.pdf", seed=i) for i in range(3)]
+    failing_text = extract_pdf_analysis(pdfs[1])["full_text"]
+    run_stage = batch.run_stage
+
+    def failing_summary(stage, *args, **kwargs):
+        if stage == "summary" and args[0] == failing_text:
+            raise RuntimeError("modelo indisponível")
+        return run_stage(stage, *args, **kwargs)
+
+    monkeypatch.setattr(batch, "run_stage", failing_summary)
+    jsonl = tmp_path / "docs.jsonl"
+    output = tmp_path / "saida"
+    args = parse_batch_arguments([
+        *map(str, pdfs), "-o", str(output), "--summarize", "--no-cache",
+        "--llm-server", "http://127.0.0.1:9", "--jsonl", str(jsonl)
+    ])
+    assert batch.run_batch(args) == 0
+
+    records = {record["name"]: record for record in map(json.loads, jsonl.read_text().splitlines())}
+    assert set(records) == {"doc0.pdf", "doc1.pdf", "doc2.pdf"}
+    # A análise e as imagens do documento são mantidas; o relatório sai com o erro no lugar do resumo
+    failed = records["doc1.pdf"]
+    assert failed["status"] == "success" and "error" not in failed["analysis"]
+    assert failed["images"]["images_extracted"] > 0
+    assert failed["summary"] == "Erro: Falha ao gerar o resumo: modelo indisponível"
+    report = output / "doc1" / "relatorio_analise.md"
+    assert "modelo indisponível" in report.read_text(encoding="utf-8")
+    assert "Falhas: 0" in capsys.readouterr().out
+
+def test_resolve_inputs_expands_directories_and_manifest(make_pdf, tmp_path):
+    first, second = make_pdf("a.pdf"), make_pdf("b.pdf", seed=1)
+    manifest = tmp_path / "lista.txt"
+    manifest.write_text(f"# comentário\n{second}\n\n{tmp_path / 'ausente.pdf'}\n", encoding="utf-8")
+    paths = batch.resolve_inputs([str(tmp_path), str(first)], str(manifest))
+    assert paths == [first, second, tmp_path / "ausente.pdf"]
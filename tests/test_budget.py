@@ -0,0 +1,133 @@
+import os
+import time
+
+import pytest
+
+from pdf.extractor import AnalysisPartial, PageRecord, extract_pdf_analysis
+from pdf.images import extract_pdf_images
+from pdf.parallel import extract_shard, merge_shards, plan_shards
+from pipeline.batch import analyze_document, failed_result
+from pipeline.isolation import IsolatedExecutor, WorkerCrashed
+from pipeline.search import absorb_page_terms
+from utils.budget import (
+    BudgetExceeded, DocumentBudget, activate_budget, budget_page, is_truncated, report_partial
+)
+from utils.inverted_index import IndexWriter
+
+# Funções executadas nos workers isolados (importadas pelo processo filho a partir deste módulo)
+
+def sleep_without_pages(seconds: float) -> str:
+    time.sleep(seconds)
+    return "fim"
+
+def hang_on_page(seconds: float) -> str:
+    report_partial("analysis", {"total_pages": 1})
+    with budget_page("analysis", 2):
+        time.sleep(seconds)
+    return "fim"
+
+def crash() -> None:
+    os._exit(3)
+
+def echo(value):
+    return value
+
+# Verificações cooperativas (no próprio processo, determinísticas)
+
+def test_text_budget_returns_partial_analysis(small_pdf):
+    full = extract_pdf_analysis(small_pdf)
+    with activate_budget(DocumentBudget(max_text_bytes=1500)):
+        partial = extract_pdf_analysis(small_pdf)
+    reason = partial["budget_exceeded"]
+    assert reason["limit"] == "text_bytes" and reason["action"] == "stopped"
+    assert 0 < partial["pages_analyzed"] < full["total_pages"]
+    assert reason["page"] == partial["pages_analyzed"] + 1
+    assert partial["total_words"] < full["total_words"]
+
+def test_page_time_budget_stops_at_first_page(small_pdf):
+    with activate_budget(DocumentBudget(page_timeout_s=0.0)):
+        result = extract_pdf_analysis(small_pdf)
+    assert "error" in result
+    assert result["budget_exceeded"]["limit"] == "page_time"
+    assert result["budget_exceeded"]["page"] == 1
+
+def test_image_budget_limits_extracted_files(small_pdf, tmp_path):
+    unlimited = extract_pdf_images(small_pdf, tmp_path / "todas")
+    with activate_budget(DocumentBudget(max_images=1)):
+        result = extract_pdf_images(small_pdf, tmp_path / "imagens")
+    assert unlimited["images_extracted"] > 1 and result["images_extracted"] == 1
+    assert result["budget_exceeded"]["limit"] == "images"
+    assert all(os.path.exists(path) for path in result["image_files"])
+
+def test_without_budget_results_are_unchanged(small_pdf):
+    result = extract_pdf_analysis(small_pdf)
+    assert "budget_exceeded" not in result and "pages_analyzed" not in result
+
+def test_interrupted_shard_ends_merge(small_pdf):
+    with activate_budget(DocumentBudget(max_text_bytes=1500)):
+        shards = [extract_shard(small_pdf, start, stop) for start, stop in plan_shards(6, 3)]
+    merged = merge_shards(shards)
+    assert merged.budget_exceeded is not None
+    assert merged.budget_exceeded == next(s.budget_exceeded for s in shards if s.budget_exceeded)
+    assert merged.page_count == merged.budget_exceeded["page"] - 1
+
+def test_merge_keeps_first_reason():
+    first, second = AnalysisPartial(), AnalysisPartial()
+    first.add_page(PageRecord(0, "primeira página", []))
+    first.budget_exceeded = {"limit": "timeout"}
+    second.add_page(PageRecord(1, "segunda página", []))
+    first.merge(second)
+    assert first.page_count == 1 and first.budget_exceeded == {"limit": "timeout"}
+
+def test_truncated_documents_are_not_indexed(small_pdf, tmp_path):
+    with activate_budget(DocumentBudget(max_text_bytes=1500)):
+        analysis = extract_pdf_analysis(small_pdf, page_terms=True)
+    result = {"file": str(small_pdf), "pdf_digest": "abc", "analysis": analysis}
+    assert is_truncated(result)
+    with IndexWriter(tmp_path / "indice") as index:
+        absorb_page_terms(result, index)
+        assert not index.contains(str(small_pdf), "abc")
+    assert "page_terms" not in analysis
+
+# Workers isolados: encerramento e substituição
+
+def test_worker_killed_on_timeout_and_replaced():
+    with IsolatedExecutor(1, DocumentBudget(timeout_s=0.2)) as executor:
+        start = time.monotonic()
+        with pytest.raises(BudgetExceeded) as raised:
+            executor.submit(sleep_without_pages, 60).result()
+        assert time.monotonic() - start < 10
+        assert raised.value.reason["limit"] == "timeout"
+        assert raised.value.reason["action"] == "killed"
+        assert raised.value.reason["stage"] == "open"
+        # O documento seguinte roda num worker novo
+        assert executor.submit(echo, 42).result() == 42
+        assert executor.recycled == 1
+
+def test_worker_killed_on_page_time_keeps_partial():
+    with IsolatedExecutor(1, DocumentBudget(page_timeout_s=0.2)) as executor:
+        with pytest.raises(BudgetExceeded) as raised:
+            executor.submit(hang_on_page, 60).result()
+    reason = raised.value.reason
+    assert (reason["limit"], reason["stage"], reason["page"], reason["action"]) == ("page_time", "analysis", 3, "killed")
+    assert raised.value.partial == {"analysis": {"total_pages": 1}}
+
+def test_crashed_worker_is_replaced():
+    with IsolatedExecutor(1, DocumentBudget(timeout_s=30)) as executor:
+        with pytest.raises(WorkerCrashed):
+            executor.submit(crash).result()
+        assert executor.submit(echo, "ok").result() == "ok"
+
+def test_isolated_document_with_cooperative_stop(small_pdf, tmp_path):
+    with IsolatedExecutor(1, DocumentBudget(max_text_bytes=1500, max_images=1)) as executor:
+        result = executor.submit(analyze_document, small_pdf, tmp_path, False).result()
+    assert result["budget_exceeded"]["limit"] == "text_bytes"
+    assert result["analysis"]["pages_analyzed"] < result["analysis"]["total_pages"]
+
+def test_failed_result_keeps_finished_stages(tmp_path):
+    reason = {"limit": "rss", "stage": "images", "page": 1, "value": 900.0, "budget": 500, "action": "killed", "elapsed": 1.5}
+    analysis = {"total_pages": 3, "total_words": 10}
+    result = failed_result(tmp_path / "a.pdf", BudgetExceeded(reason, {"analysis": analysis, "pdf_digest": "d"}))
+    assert result["analysis"] == analysis and result["pdf_digest"] == "d"
+    assert "error" in result["images"] and result["budget_exceeded"] == reason
+    assert is_truncated(result)
@@ -0,0 +1,34 @@
+import os
+
+from utils.cache import ResultCache
+
+def _sizes(cache):
+    return sum(path.stat().st_size for path in cache.cache_dir.glob("*/*.json"))
+
+def test_total_is_read_once_and_kept_on_put(tmp_path, monkeypatch):
+    ResultCache(tmp_path).put("aa01", {"texto": "existente"})
+    cache = ResultCache(tmp_path, max_bytes=10_000)
+    assert cache.total_bytes == _sizes(cache)
+
+    scans = []
+    scan = cache._scan
+    monkeypatch.setattr(cache, "_scan", lambda: scans.append(1) or scan())
+    cache.put("bb02", {"texto": "novo"})
+    cache.put("aa01", {"texto": "regravado, agora mais longo"})
+    assert cache.total_bytes == _sizes(cache)
+    # Abaixo do limite, nenhuma gravação percorre o diretório
+    assert scans == []
+
+def test_evicts_least_recently_used_when_over_limit(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=10_000)
+    for i, key in enumerate(["aa01", "bb02", "cc03"]):
+        cache.put(key, {"dados": "x" * 100})
+        os.utime(cache._entry_path(key), (i, i))
+    cache.get("aa01")
+
+    entry_size = cache._entry_path("aa01").stat().st_size
+    cache.max_bytes = 3 * entry_size
+    cache.put("dd04", {"dados": "x" * 100})
+    assert not cache.contains("bb02")
+    assert all(cache.contains(key) for key in ["aa01", "cc03", "dd04"])
+    assert cache.total_bytes == _sizes(cache) <= cache.max_bytes
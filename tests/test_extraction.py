@@ -0,0 +1,85 @@
+import fitz
+import pytest
+
+from corpus import CorpusSpec
+from pdf.extractor import extract_pdf_analysis, parse_page
+from pdf.incremental import open_page_cache
+from pdf.session import DocumentSession
+from utils.cache import ResultCache
+
+OPTIONS = {"corpus_sketch": True, "page_terms": True}
+
+@pytest.fixture
+def serial(small_pdf):
+    result = extract_pdf_analysis(small_pdf, **OPTIONS)
+    assert "error" not in result
+    return result
+
+def test_parallel_matches_serial(small_pdf, serial):
+    assert extract_pdf_analysis(small_pdf, workers=2, **OPTIONS) == serial
+
+def test_bytes_and_session_match_serial(small_pdf, serial):
+    assert extract_pdf_analysis(small_pdf.read_bytes(), **OPTIONS) == serial
+    with DocumentSession.from_path(small_pdf) as session:
+        assert extract_pdf_analysis(session, **OPTIONS) == serial
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_page_cache_matches_serial(small_pdf, serial, tmp_path, workers):
+    page_cache = open_page_cache(ResultCache(tmp_path / "cache"))
+    # Primeira execução preenche o cache; a segunda reaproveita todas as páginas
+    assert extract_pdf_analysis(small_pdf, workers=workers, page_cache=page_cache, **OPTIONS) == serial
+    assert extract_pdf_analysis(small_pdf, workers=workers, page_cache=page_cache, **OPTIONS) == serial
+    assert page_cache.stats["analysis"]["reused"] == serial["total_pages"]
+
+def test_page_cache_reuses_unchanged_pages(make_pdf, tmp_path):
+    page_cache = open_page_cache(ResultCache(tmp_path / "cache"))
+    first = make_pdf("a.pdf", seed=1)
+    extract_pdf_analysis(first, page_cache=page_cache, **OPTIONS)
+    # Outro documento com o mesmo conteúdo nas páginas iniciais
+    longer = make_pdf("b.pdf", spec=CorpusSpec(
+        pages=8, lines_per_page=20, words_per_line=10, font_mix=((10.0, 10), (16.0, 1)),
+        images_per_page=2, image_size=32, duplicate_ratio=0.5
+    ), seed=1)
+    assert extract_pdf_analysis(longer, page_cache=page_cache, **OPTIONS) == extract_pdf_analysis(longer, **OPTIONS)
+    assert page_cache.stats["analysis"] == {"reused": 6, "parsed": 6 + 2}
+
+def test_without_full_text(small_pdf, serial):
+    result = extract_pdf_analysis(small_pdf, workers=2, keep_full_text=False)
+    assert "full_text" not in result
+    assert result["top_10_words"] == serial["top_10_words"]
+    assert result["detected_titles"] == serial["detected_titles"]
+
+@pytest.fixture
+def tab_pdf(tmp_path):
+    # Tabulação entre as palavras do título, espaços duplos e uma imagem no corpo
+    path = tmp_path / "tabulacao.pdf"
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((40, 60), "Título\tGrande Principal", fontsize=20)
+    for i in range(12):
+        page.insert_text((40, 100 + 14 * i), f"Texto  do corpo\tcom tabulação, linha {i}.", fontsize=10)
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 16, 16), False)
+    pixmap.clear_with(128)
+    page.insert_image(fitz.Rect(300, 400, 340, 440), pixmap=pixmap)
+    doc.save(path)
+    doc.close()
+    return path
+
+def test_parse_page_matches_default_text_extraction(tab_pdf):
+    # Mesmo texto e spans de page.get_text() e page.get_text("dict") com as flags padrão
+    with fitz.open(tab_pdf) as doc:
+        page = doc[0]
+        record = parse_page(page)
+        spans = [
+            span["text"]
+            for block in page.get_text("dict")["blocks"] if block["type"] == 0
+            for line in block["lines"] for span in line["spans"]
+        ]
+        assert record.text == page.get_text()
+        assert [span[3] for span in record.spans] == spans
+    assert "\ufffd" not in record.text
+
+def test_tab_separates_titles(tab_pdf):
+    result = extract_pdf_analysis(tab_pdf)
+    assert result["detected_titles"] == ["Título", "Grande Principal"]
+    assert "\ufffd" not in result["full_text"]
@@ -0,0 +1,91 @@
+import random
+
+import numpy as np
+import pytest
+
+from pipeline.search import DEFAULT_INDEX_SUBDIR, resolve_index_dir
+from utils.inverted_index import IndexWriter, InvertedIndex, decode_varints, encode_varints
+
+# Termos com acentos: a ordem dos segmentos é a dos bytes UTF-8
+VOCABULARY = ["alfa", "beta", "gama", "delta", "ação", "índice", "página", "zeta", "ômega", "xis"]
+
+def random_document(rng: random.Random, pages: int):
+    return [
+        {term: rng.randint(1, 9) for term in rng.sample(VOCABULARY, rng.randint(1, 5))}
+        for _ in range(pages)
+    ]
+
+def brute_force_postings(documents, term):
+    # documents: {doc_id: page_terms} dos documentos vivos
+    return [
+        (doc_id, page, terms[term])
+        for doc_id, page_terms in sorted(documents.items())
+        for page, terms in enumerate(page_terms)
+        if term in terms
+    ]
+
+def assert_matches(index_dir, documents):
+    with InvertedIndex(index_dir) as index:
+        assert index.document_count == len(documents)
+        assert index.page_count == sum(len(page_terms) for page_terms in documents.values())
+        for term in VOCABULARY + ["ausente"]:
+            docs, pages, freqs = index.postings(term)
+            assert list(zip(docs.tolist(), pages.tolist(), freqs.tolist())) == brute_force_postings(documents, term)
+
+@pytest.mark.parametrize("values", [[], [0], [127, 128, 16383, 16384], [0, 1, 2**35, 2**63 - 1]])
+def test_varint_round_trip(values):
+    data, lengths = encode_varints(np.array(values, dtype=np.uint64))
+    decoded, starts = decode_varints(data)
+    assert decoded.tolist() == values
+    assert len(data) == int(lengths.sum())
+    assert starts.tolist() == (np.cumsum(lengths) - lengths).tolist()
+
+def test_index_matches_brute_force(tmp_path):
+    rng = random.Random(7)
+    documents = {}
+    # flush_postings pequeno: vários segmentos, com termos repetidos entre eles
+    with IndexWriter(tmp_path, flush_postings=20) as writer:
+        for doc_id in range(12):
+            page_terms = random_document(rng, rng.randint(1, 6))
+            writer.add_document(str(tmp_path / f"doc{doc_id}.pdf"), f"hash{doc_id}", page_terms)
+            documents[doc_id] = page_terms
+    assert_matches(tmp_path, documents)
+
+    with IndexWriter(tmp_path, flush_postings=20) as writer:
+        # Mesmo conteúdo: nada muda; conteúdo novo: substitui a versão anterior; remoção: lápide
+        assert not writer.add_document(str(tmp_path / "doc0.pdf"), "hash0", documents[0])
+        replacement = random_document(rng, 3)
+        assert writer.add_document(str(tmp_path / "doc1.pdf"), "novo", replacement)
+        assert writer.remove_document(str(tmp_path / "doc2.pdf"))
+        assert not writer.remove_document(str(tmp_path / "inexistente.pdf"))
+    del documents[1], documents[2]
+    documents[12] = replacement
+    assert_matches(tmp_path, documents)
+
+    with IndexWriter(tmp_path) as writer:
+        writer.compact()
+    assert_matches(tmp_path, documents)
+    with InvertedIndex(tmp_path) as index:
+        assert len(index.segments) == 1 and not len(index.deleted)
+        assert index.document(12)["name"] == "doc1.pdf"
+
+def test_search_ranks_pages(tmp_path):
+    with IndexWriter(tmp_path) as writer:
+        writer.add_document(str(tmp_path / "a.pdf"), "a", [{"alfa": 1}, {"alfa": 5, "beta": 1}])
+        writer.add_document(str(tmp_path / "b.pdf"), "b", [{"beta": 2}, {"gama": 1}])
+    with InvertedIndex(tmp_path) as index:
+        result = index.search("Alfa e beta")
+        assert result["terms"] == ["alfa", "beta"]
+        assert [hit["name"] for hit in result["hits"]] == ["a.pdf", "b.pdf"]
+        assert [page["page"] for page in result["hits"][0]["pages"]] == [2, 1]
+        assert result["matched_pages"] == 3
+
+        strict = index.search("alfa beta", require_all=True)
+        assert [(hit["name"], [page["page"] for page in hit["pages"]]) for hit in strict["hits"]] == [("a.pdf", [2])]
+        assert index.search("alfa ausente", require_all=True)["hits"] == []
+
+def test_default_index_dir_does_not_collide_with_document_output(tmp_path):
+    # A saída de "index.pdf" vai para <saída>/index
+    assert resolve_index_dir(None, str(tmp_path)) != tmp_path / "index"
+    assert resolve_index_dir(None, str(tmp_path)) == tmp_path / DEFAULT_INDEX_SUBDIR
+    assert resolve_index_dir(str(tmp_path / "outro"), str(tmp_path)) == tmp_path / "outro"
@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("transformers")
+
+import llm.model as llm_model
+from tiny_model import build_tiny_model
+
+NAME = "modelo-de-teste"
+
+@pytest.fixture
+def tiny():
+    model, tokenizer = build_tiny_model(["Texto de teste para o vocabulário do modelo."] * 4)
+    yield model, tokenizer
+    llm_model.unload_model(NAME)
+
+def test_quantized_load_keeps_only_int8(tiny, monkeypatch):
+    loads = []
+
+    def load_model(model_name):
+        loads.append(model_name)
+        return tiny
+
+    monkeypatch.setattr(llm_model, "load_model", load_model)
+    model, _ = llm_model.get_model(NAME, quantize=True)
+    assert model is not tiny[0]
+    assert llm_model.is_model_loaded(NAME, quantize=True)
+    assert not llm_model.is_model_loaded(NAME)
+    assert llm_model.get_model(NAME, quantize=True)[0] is model and loads == [NAME]
+
+def test_quantized_variant_reuses_resident_fp32(tiny, monkeypatch):
+    monkeypatch.setattr(llm_model, "load_model", lambda model_name: pytest.fail("fp32 já residente"))
+    llm_model.register_model(*tiny, NAME)
+    quantized, _ = llm_model.get_model(NAME, quantize=True)
+    assert quantized is not tiny[0]
+    assert llm_model.get_model(NAME)[0] is tiny[0]
+
+def test_register_quantized_model(tiny):
+    llm_model.register_model(*tiny, NAME, quantize=True)
+    assert llm_model.is_model_loaded(NAME, quantize=True)
+    assert not llm_model.is_model_loaded(NAME)
+
+def test_context_budget_follows_model_config(tiny):
+    from llm.config import DEFAULT_CONTEXT_TOKENS
+    from llm.summarize import context_token_budget
+    model, tokenizer = tiny
+    special = tokenizer.num_special_tokens_to_add()
+    model.config.max_position_embeddings = 256
+    assert context_token_budget(tokenizer, model=model) == 256 - special
+    assert context_token_budget(tokenizer, 100, model) == 100
+    # Sem limite no tokenizer (valor sentinela) nem modelo, vale o contexto padrão
+    tokenizer.model_max_length = int(1e30)
+    assert context_token_budget(tokenizer) == DEFAULT_CONTEXT_TOKENS - special
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from utils.profiling import Profiler, aggregate_profiles
+
+def _spin(seconds: float) -> None:
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+def test_stage_reports_thread_and_process_cpu():
+    profiler = Profiler()
+    with profiler.stage("espera"):
+        # A etapa só espera enquanto outra thread (como as do torch) consome CPU
+        worker = threading.Thread(target=_spin, args=(0.2,))
+        worker.start()
+        worker.join()
+    stage = profiler.summary()["espera"]
+    assert stage["wall_s"] >= 0.2
+    assert stage["cpu_s"] < 0.1
+    assert stage["process_cpu_s"] >= 0.15
+
+def test_stage_peak_rss_sees_freed_memory():
+    profiler = Profiler()
+    with profiler.stage("aloca"):
+        # Memória alocada e liberada dentro da etapa: o pico a registra, a diferença fim - início não
+        buffer = bytearray(96 << 20)
+        time.sleep(0.05)
+        del buffer
+    with profiler.stage("depois"):
+        time.sleep(0.02)
+    summary = profiler.summary()
+    assert summary["aloca"]["peak_rss_kb"] - summary["depois"]["peak_rss_kb"] > 64 * 1024
+
+def test_aggregate_reports_largest_peak():
+    profiles = [
+        {"etapa": {"calls": 1, "wall_s": wall, "cpu_s": wall, "process_cpu_s": 2 * wall, "peak_rss_kb": rss, "counts": {}}}
+        for wall, rss in ((0.1, 100), (0.3, 50), (0.2, 300))
+    ]
+    aggregated = aggregate_profiles(profiles)["etapa"]
+    assert aggregated["documents"] == 3
+    assert aggregated["wall_max_s"] == 0.3 and aggregated["peak_rss_max_kb"] == 300
+    assert aggregated["process_cpu_p50_s"] == 0.4
@@ -0,0 +1,56 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("transformers")
+
+from llm.config import inference_settings
+from llm.server import SummaryBatcher, SummaryRequestHandler, clamp_inference
+
+SERVER = inference_settings("balanced", num_threads=2)
+
+def test_clamp_inference_limits_to_server_profile():
+    requested = inference_settings("quality", num_beams=8, max_length=2000, quantize=False, num_threads=64)
+    settings = clamp_inference(requested, SERVER)
+    assert settings["generation"]["num_beams"] == SERVER["generation"]["num_beams"]
+    assert settings["generation"]["max_length"] == SERVER["generation"]["max_length"]
+    assert settings["quantize"] is True and settings["num_threads"] == 2
+
+def test_clamp_inference_keeps_cheaper_requests():
+    settings = clamp_inference(inference_settings("fast"), SERVER)
+    assert settings["generation"]["num_beams"] == 1 and settings["generation"]["max_length"] == 200
+    assert "length_penalty" not in settings["generation"]
+
+@pytest.mark.parametrize("requested", [
+    {"generation": {"do_sample": True}},
+    {"generation": {"num_beams": "4"}},
+    {"generation": {"max_length": 0}},
+    {"profile": "turbo"},
+    {"device": "cuda"},
+    [],
+])
+def test_clamp_inference_rejects_unknown_or_invalid_fields(requested):
+    with pytest.raises(ValueError):
+        clamp_inference(requested, SERVER)
+
+def test_invalid_inference_returns_400():
+    batcher = SummaryBatcher(inference=SERVER)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SummaryRequestHandler)
+    server.batcher = batcher
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        body = json.dumps({"text": "texto", "inference": {"generation": {"num_return_sequences": 50}}}).encode()
+        request = urllib.request.Request(f"http://127.0.0.1:{server.server_port}/summarize", data=body)
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request, timeout=10)
+        assert error.value.code == 400
+        assert "num_return_sequences" in json.loads(error.value.read())["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.stop()
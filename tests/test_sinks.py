@@ -0,0 +1,76 @@
+import json
+import os
+import stat
+
+import pytest
+
+from utils.files import ATOMIC_FILE_MODE, atomic_open
+from utils.sinks import JsonDocumentSink, JsonlSink, MarkdownSink, OutputSink, OutputSinks, document_record
+
+RESULT = {
+    "file": "/docs/manual.pdf",
+    "pdf_digest": "abc",
+    "analysis": {"total_pages": 2, "total_words": 10, "full_text": "texto", "page_terms": [{}], "corpus_sketch": {}},
+    "images": {"status": "success", "images_extracted": 0},
+    "elapsed": 0.5,
+}
+
+def test_record_omits_intermediate_fields():
+    record = document_record(RESULT)
+    assert record["name"] == "manual.pdf" and record["status"] == "success"
+    assert not {"full_text", "page_terms", "corpus_sketch"} & set(record["analysis"])
+
+def test_truncated_record_is_partial():
+    record = document_record(dict(RESULT, budget_exceeded={"limit": "timeout"}))
+    assert record["status"] == "partial" and record["budget_exceeded"] == {"limit": "timeout"}
+
+def test_incomplete_sink_fails_at_creation():
+    class OnlyWrite(OutputSink):
+        def write(self, record):
+            pass
+
+    with pytest.raises(TypeError):
+        OnlyWrite()
+
+def test_jsonl_discards_partial_trailing_line(tmp_path):
+    path = tmp_path / "docs.jsonl"
+    path.write_bytes(b'{"name": "a.pdf"}\n{"name": "b.p')
+    with OutputSinks([JsonlSink(path)]) as sinks:
+        assert sinks.write(RESULT) is None
+    names = [json.loads(line)["name"] for line in path.read_text().splitlines()]
+    assert names == ["a.pdf", "manual.pdf"]
+
+def test_json_document_sink_writes_per_document_file(tmp_path):
+    sink = JsonDocumentSink(tmp_path)
+    sink.write(document_record(RESULT))
+    path = tmp_path / "manual" / "analise.json"
+    assert sink.destination("/docs/manual.pdf") == str(path)
+    assert json.loads(path.read_text())["pdf_digest"] == "abc"
+
+def test_markdown_sink_skips_failed_documents(tmp_path):
+    analysis = {
+        "total_pages": 2, "total_words": 10, "vocabulary_size": 8, "file_size_bytes": 100,
+        "top_10_words": [["texto", 3]]
+    }
+    ok = dict(RESULT, file="/docs/ok.pdf", analysis=analysis, summary="Resumo curto.")
+    failed = dict(RESULT, file="/docs/ruim.pdf", analysis={"error": "PDF corrompido"})
+    with OutputSinks([MarkdownSink(tmp_path)]) as sinks:
+        assert sinks.write(ok) is None and sinks.write(failed) is None
+        assert sinks.destinations(failed) == []
+    assert "> Resumo curto." in (tmp_path / "ok" / "relatorio_analise.md").read_text(encoding="utf-8")
+    assert not (tmp_path / "ruim").exists()
+
+def test_atomic_open_leaves_no_file_on_error(tmp_path):
+    path = tmp_path / "relatorio.md"
+    with pytest.raises(RuntimeError):
+        with atomic_open(path) as f:
+            f.write("metade")
+            raise RuntimeError("falha")
+    assert list(tmp_path.iterdir()) == []
+
+def test_atomic_open_sets_fixed_mode(tmp_path):
+    path = tmp_path / "relatorio.md"
+    with atomic_open(path) as f:
+        f.write("conteúdo")
+    assert path.read_text(encoding="utf-8") == "conteúdo"
+    assert stat.S_IMODE(os.stat(path).st_mode) == ATOMIC_FILE_MODE
@@ -0,0 +1,74 @@
+import collections
+import random
+
+import pytest
+
+from utils.sketches import CorpusSketch, HeavyHitters, HyperLogLog
+from utils.text import TextStatistics
+
+def zipf_documents(rng: random.Random, documents: int, vocabulary: int = 2000, words: int = 3000):
+    # Frequências de Zipf: poucas palavras muito comuns e uma cauda longa
+    terms = [f"palavra{i}" for i in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    return [collections.Counter(rng.choices(terms, weights, k=words)) for _ in range(documents)]
+
+def test_heavy_hitters_error_bound_holds_after_merges():
+    rng = random.Random(3)
+    documents = zipf_documents(rng, 12)
+    exact = sum(documents, collections.Counter())
+
+    sketches = []
+    for counts in documents:
+        sketch = HeavyHitters(capacity=64)
+        sketch.update(counts)
+        sketches.append(sketch)
+    # Combinação em árvore, em ordem embaralhada
+    rng.shuffle(sketches)
+    while len(sketches) > 1:
+        left, right = sketches.pop(), sketches.pop()
+        left.merge(right)
+        sketches.insert(0, left)
+    merged = sketches[0]
+
+    assert merged.total == sum(exact.values())
+    assert len(merged.counters) <= merged.capacity
+    for word, count in exact.items():
+        estimate = merged.counters.get(word, 0)
+        assert count - merged.error_bound <= estimate <= count
+    # As mais frequentes sobrevivem à redução
+    assert [word for word, _ in merged.top(3)] == [word for word, _ in exact.most_common(3)]
+
+def test_heavy_hitters_rejects_different_capacity():
+    with pytest.raises(ValueError):
+        HeavyHitters(8).merge(HeavyHitters(16))
+
+def test_hyperloglog_estimate_and_union():
+    left, right = HyperLogLog(), HyperLogLog()
+    left.add_many(f"termo{i}" for i in range(0, 30000))
+    right.add_many(f"termo{i}" for i in range(20000, 50000))
+    assert abs(left.estimate() - 30000) <= 4 * left.relative_error * 30000
+
+    union = HyperLogLog()
+    union.add_many(f"termo{i}" for i in range(50000))
+    left.merge(right)
+    # A combinação é exatamente o esboço da união (máximo dos registradores)
+    assert (left.registers == union.registers).all()
+    assert abs(left.estimate() - 50000) <= 4 * left.relative_error * 50000
+
+def test_hyperloglog_small_cardinality_is_exact_enough():
+    hll = HyperLogLog()
+    hll.add_many(["alfa", "beta", "gama", "alfa"])
+    assert hll.estimate() == 3
+
+def test_corpus_sketch_round_trip_and_merge():
+    first, second = TextStatistics(), TextStatistics()
+    first.update("Manual de instalação do servidor. Servidor instalado.")
+    second.update("Manual do usuário: servidor, cliente e rede.")
+    sketch = CorpusSketch.from_text_statistics(first)
+    restored = CorpusSketch.from_dict(sketch.to_dict())
+    restored.merge(CorpusSketch.from_text_statistics(second))
+
+    assert restored.documents == 2
+    assert restored.total_words == first.total_words + second.total_words
+    assert restored.top_n_words(2) == [("servidor", 3), ("manual", 2)]
+    assert restored.vocabulary_size == len(first.vocabulary | second.vocabulary)
@@ -0,0 +1,59 @@
+import pathlib
+import signal
+
+import pytest
+
+import pipeline.streaming as streaming
+from cli.arguments import parse_batch_arguments
+from utils.sinks import open_sinks
+
+@pytest.fixture
+def alarm():
+    # Um consumidor que morre trava o produtor na fila cheia: falha em vez de travar o teste
+    def fail(signum, frame):
+        raise TimeoutError("pipeline travado")
+    previous = signal.signal(signal.SIGALRM, fail)
+    signal.alarm(120)
+    yield
+    signal.alarm(0)
+    signal.signal(signal.SIGALRM, previous)
+
+def test_stage_errors_are_recorded_per_document(make_pdf, tmp_path, monkeypatch, alarm):
+    pdfs = [make_pdf(f"doc{i}.pdf", seed=i) for i in range(5)]
+    run_stage = streaming.run_stage
+
+    def failing_stage(name, *args, **kwargs):
+        if name == "summary":
+            raise RuntimeError("servidor indisponível")
+        return run_stage(name, *args, **kwargs)
+
+    def failing_images(result, *args, **kwargs):
+        raise RuntimeError("disco cheio")
+
+    monkeypatch.setattr(streaming, "run_stage", failing_stage)
+    monkeypatch.setattr(streaming, "extract_document_images", failing_images)
+    args = parse_batch_arguments([
+        *map(str, pdfs), "-o", str(tmp_path / "saida"), "--pipeline", "--summarize", "--no-cache",
+        "--llm-server", "http://127.0.0.1:9", "--queue-size", "1", "--long-document"
+    ])
+    output = tmp_path / "saida"
+    with open_sinks(args, output) as sinks:
+        results = streaming.run_streaming_batch(args, pdfs, output, None, None, None, sinks=sinks)
+
+    assert len(results) == len(pdfs)
+    for result in results:
+        assert result["summary"].startswith("Erro:") and "servidor indisponível" in result["summary"]
+        assert "disco cheio" in result["images"]["error"]
+        # O relatório Markdown (um dos sinks) sai mesmo com o resumo e as imagens com erro
+        assert "servidor indisponível" in (output / pathlib.Path(result["file"]).stem / "relatorio_analise.md").read_text(encoding="utf-8")
+
+def test_queue_high_water_ignores_end_marker():
+    import asyncio
+
+    async def fill():
+        stage = streaming.BoundedStage("teste", 2)
+        await stage.put(object())
+        await stage.put(streaming._DONE)
+        return stage.high_water
+
+    assert asyncio.run(fill()) == 1